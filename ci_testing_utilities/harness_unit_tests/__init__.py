@@ -2,6 +2,15 @@ __all__ = [
             "harness_unittests_exceptions",
             "harness_unittests_logging",
             "test_runtests",
+            "test_status_file",
+            "test_line_protocol",
+            "test_rgt_database_logger",
+            "test_rgt_influxdb",
+            "test_rgt_sqlite",
+            "test_write_retry",
+            "test_update_databases",
+            "test_system_log",
+            "test_status_database",
             "test_machine_specific_tests",
             "Ascent"
           ]
@@ -0,0 +1,138 @@
+#! /usr/bin/env python3
+""" Test class module verifies the InfluxDB line protocol serialization. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import datetime
+import os
+import tempfile
+import shutil
+
+# My harness package imports
+from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+from libraries.rgt_database_loggers.db_backends import line_protocol
+from libraries.rgt_database_loggers.db_backends.base_db import DatabaseDataError
+from libraries.rgt_database_loggers.db_backends.rgt_influxdb import InfluxDBLogger
+
+class Test_line_protocol_escaping(unittest.TestCase):
+    """ Tests for the escaping of measurements, keys and string fields. """
+
+    # (value, escaped measurement, escaped key, string field)
+    ESCAPES = [
+        ('plain',       'plain',            'plain',            '"plain"'),
+        ('a b',         'a\\ b',            'a\\ b',            '"a b"'),
+        ('a,b',         'a\\,b',            'a\\,b',            '"a,b"'),
+        ('a=b',         'a=b',              'a\\=b',            '"a=b"'),
+        ('say "hi"',    'say\\ "hi"',       'say\\ "hi"',       '"say \\"hi\\""'),
+        ('C:\\dir\\',   'C:\\\\dir\\\\',    'C:\\\\dir\\\\',    '"C:\\\\dir\\\\"'),
+        ('a\nb',        'a\\nb',            'a\\nb',            '"a\nb"'),
+        ('a\r\n\tb',    'a\\r\\n\\tb',      'a\\r\\n\\tb',      '"a\r\n\tb"'),
+        ('x, y=z\\',    'x\\,\\ y=z\\\\',   'x\\,\\ y\\=z\\\\', '"x, y=z\\\\"'),
+        ('',            '',                 '',                 '""'),
+    ]
+
+    def test_escape_measurement(self):
+        """Tests that commas, spaces, backslashes and line breaks are escaped in measurements."""
+        for (value, measurement, key, string) in self.ESCAPES:
+            with self.subTest(value=value):
+                self.assertEqual(line_protocol.escape_measurement(value), measurement)
+
+    def test_escape_key(self):
+        """Tests that commas, equals signs, spaces, backslashes and line breaks are escaped in keys and tag values."""
+        for (value, measurement, key, string) in self.ESCAPES:
+            with self.subTest(value=value):
+                self.assertEqual(line_protocol.escape_key(value), key)
+
+    def test_string_field(self):
+        """Tests that double quotes and backslashes are escaped in string fields, and line breaks kept."""
+        for (value, measurement, key, string) in self.ESCAPES:
+            with self.subTest(value=value):
+                self.assertEqual(line_protocol.string_field(value), string)
+
+    def test_field_value(self):
+        """Tests that booleans and numbers are converted, and strings returned as given."""
+        for (value, expected) in [(True, 'true'), (False, 'false'), (3, '3'), (1.5, '1.5'),
+                                  ('2i', '2i'), ('"text"', '"text"')]:
+            with self.subTest(value=value):
+                self.assertEqual(line_protocol.field_value(value), expected)
+
+    def test_format_line(self):
+        """Tests a record with escaped tags and fields, and an empty tag left out."""
+        line = line_protocol.format_line('my events',
+                                         {'app': 'an app', 'test': 'a,b', 'empty': '', 'path': 'C:\\'},
+                                         {'field key': line_protocol.string_field('line 1\nline "2"'),
+                                          'n': line_protocol.field_value(4)},
+                                         1234)
+        self.assertEqual(line, 'my\\ events,app=an\\ app,test=a\\,b,path=C:\\\\ '
+                               'field\\ key="line 1\nline \\"2\\"",n=4 1234')
+
+    def test_format_batch(self):
+        """Tests that the records of a batch are separated by newlines."""
+        self.assertEqual(line_protocol.format_batch(['a f=1 1', 'b f=2 2']), 'a f=1 1\nb f=2 2')
+
+class Test_line_protocol_timestamp(unittest.TestCase):
+    """ Tests for the conversion of event times to timestamps in each precision. """
+
+    # (event time, precision, microseconds after 2026-03-04T05:06:07 local time in units of precision)
+    TIMESTAMPS = [
+        ('2026-03-04T05:06:07.123456',  'ns',    123456000),
+        ('2026-03-04T05:06:07.123456',  'us',    123456),
+        ('2026-03-04T05:06:07.123456',  'ms',    123),
+        ('2026-03-04T05:06:07.123456',  's',     0),
+        ('2026-03-04T05:06:07.999999',  'ms',    999),
+        ('2026-03-04T05:06:07.999999',  's',     0),
+        ('2026-03-04T05:06:07.123456Z', 'ms',    123),
+        ('2026-03-04T05:06:07',         'ns',    0),
+        ('2026-03-04T05:06:07',         'ms',    0),
+        ('2026-03-04T05:06:07Z',        'us',    0),
+        ('2026-03-04T05:06:07.000001',  'ns',    1000),
+        ('2026-03-04T05:06:07.000001',  'other', 1000),
+    ]
+
+    def setUp(self):
+        """ Creates a dry-run InfluxDB logger in a temporary directory. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__logger = create_rgt_logger(logger_name='test_line_protocol',
+                                          fh_filepath=os.path.join(self.__tmp_dir, 'test_line_protocol.log'),
+                                          logger_threshold_log_level='CRITICAL',
+                                          fh_threshold_log_level='CRITICAL',
+                                          ch_threshold_log_level='CRITICAL')
+        self.__seconds = int(datetime.datetime(2026, 3, 4, 5, 6, 7).timestamp())
+        return
+
+    def tearDown(self):
+        """ Removes the temporary directory. """
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_timestamp(self):
+        """Tests line_protocol.timestamp in each precision."""
+        for (event_time, precision, fraction) in self.TIMESTAMPS:
+            with self.subTest(event_time=event_time, precision=precision):
+                self.assertEqual(line_protocol.timestamp(event_time, precision),
+                                 self.__seconds * self.__units_per_second(precision) + fraction)
+
+    def test_event_time_to_timestamp(self):
+        """Tests that InfluxDBLogger._event_time_to_timestamp uses the precision of the URI."""
+        for (event_time, precision, fraction) in self.TIMESTAMPS:
+            with self.subTest(event_time=event_time, precision=precision):
+                with unittest.mock.patch.object(InfluxDBLogger, '_check_alive', return_value=None):
+                    influxdb_logger = InfluxDBLogger(uri=f'http://localhost:8086?bucket=b&org=o&precision={precision}',
+                                                     logger=self.__logger)
+                self.assertEqual(influxdb_logger._event_time_to_timestamp(event_time),
+                                 self.__seconds * self.__units_per_second(precision) + fraction)
+
+    def test_unrecognized_time_format(self):
+        """Tests that times in other formats are rejected."""
+        for event_time in ['2026-03-04 05:06:07', '2026-03-04T05:06', '2026-03-04T05:06:07.123',
+                           '2026-03-04T05:06:07+00:00', '']:
+            with self.subTest(event_time=event_time):
+                with self.assertRaises(DatabaseDataError):
+                    line_protocol.timestamp(event_time, 'ns')
+
+    def __units_per_second(self, precision):
+        return {'s': 1, 'ms': 1000, 'us': 1000000}.get(precision, 1000000000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+""" Test class module verifies the logging of data to several databases. """
+
+# Python package imports
+import unittest
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+# My harness package imports
+import libraries
+
+class Test_fanout_at_exit(unittest.TestCase):
+    """ Tests for logging to several databases through the event pipeline while the interpreter exits. """
+
+    # Logs an event through the event pipeline from an exit handler. It runs
+    # before the exit handler of the pipeline, which logs the event after the
+    # executors of concurrent.futures are shut down. If log_before_exit is
+    # set, an event is logged first, so that the executor exists at exit.
+    SCRIPT = textwrap.dedent('''
+        import atexit
+        import sys
+
+        from libraries.event_pipeline import get_event_pipeline
+        from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
+        from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+
+        (log_path, run_archive) = sys.argv[1:]
+        logger = create_rgt_logger(logger_name='test_fanout_at_exit', fh_filepath=log_path,
+                                   logger_threshold_log_level='ERROR', fh_threshold_log_level='ERROR',
+                                   ch_threshold_log_level='ERROR')
+        db_logger = create_rgt_db_logger(logger=logger)
+        if len(db_logger.enabled_backends) != 2:
+            sys.exit(2)
+
+        def make_event(test_id):
+            return {{'test_id': test_id, 'app': 'app1', 'test': 'test1', 'runtag': 'tag1', 'machine': 'machine1',
+                     'run_archive': run_archive, 'event_name': 'build_start', 'event_time': '2026-01-01T00:00:00.000000'}}
+
+        pipeline = get_event_pipeline(logger)
+        if {log_before_exit}:
+            pipeline.put(db_logger.log_event, make_event('id0'))
+            pipeline.flush()
+        atexit.register(lambda: pipeline.put(db_logger.log_event, make_event('id1')))
+    ''')
+
+    def setUp(self):
+        """ Creates a temporary directory for the databases and the script. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        return
+
+    def tearDown(self):
+        """ Removes the temporary directory. """
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_log_event_at_exit(self):
+        """Tests that an event logged by the event pipeline at exit is written to both databases."""
+        self.__run_script(log_before_exit=False, expected_test_ids=['id1'])
+
+    def test_log_event_at_exit_after_fanout(self):
+        """Tests that an event logged at exit is written to both databases after the executor was shut down."""
+        self.__run_script(log_before_exit=True, expected_test_ids=['id0', 'id1'])
+
+    def __run_script(self, log_before_exit, expected_test_ids):
+        """Runs SCRIPT, then checks that it exited cleanly and that both databases hold the expected events."""
+        script_path = os.path.join(self.__tmp_dir, 'log_at_exit.py')
+        with open(script_path, 'w') as script_file:
+            script_file.write(self.SCRIPT.format(log_before_exit=log_before_exit))
+
+        database_paths = [os.path.join(self.__tmp_dir, name) for name in ('a.db', 'b.db')]
+        harness_dir = os.path.dirname(os.path.dirname(os.path.abspath(libraries.__file__)))
+        env = dict(os.environ,
+                   PYTHONPATH=os.pathsep.join([harness_dir, os.environ.get('PYTHONPATH', '')]),
+                   RGT_EVENT_PIPELINE='1',
+                   RGT_SQLITE_URI=';'.join('sqlite://' + path for path in database_paths))
+        for envvar in ('RGT_INFLUXDB_URI', 'RGT_DATABASE_BATCH', 'RGT_DATABASE_SPOOL_DIR', 'RGT_SQLITE_DRY_RUN'):
+            env.pop(envvar, None)
+
+        result = subprocess.run([sys.executable, script_path, os.path.join(self.__tmp_dir, 'log.txt'), self.__tmp_dir],
+                                env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True,
+                                timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertNotIn('after shutdown', result.stdout)
+
+        for database_path in database_paths:
+            with self.subTest(database=database_path):
+                db = sqlite3.connect(database_path)
+                try:
+                    rows = db.execute('SELECT test_id, event_name FROM events ORDER BY test_id').fetchall()
+                finally:
+                    db.close()
+                self.assertEqual(rows, [(test_id, 'build_start') for test_id in expected_test_ids])
+
+if __name__ == "__main__":
+    unittest.main()
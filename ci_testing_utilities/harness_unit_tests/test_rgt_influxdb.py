@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+""" Test class module verifies the parsing of InfluxDB query responses. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import csv
+import http.server
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+import requests
+
+# My harness package imports
+from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+from libraries.rgt_database_loggers.db_backends.rgt_influxdb import InfluxDBLogger
+
+# A response of three tables. The first two are annotated, and the second has
+# a #default annotation; the third has a header only.
+FLUX_CSV = ('#datatype,string,long,dateTime:RFC3339,string,string\r\n'
+            '#group,false,false,false,true,false\r\n'
+            '#default,_result,,,,\r\n'
+            ',result,table,_time,test_id,event_name\r\n'
+            ',,0,2026-01-01T00:00:00Z,id1,build_start\r\n'
+            ',,0,2026-01-01T00:00:01Z,id1,"build_end, with a comma"\r\n'
+            '\r\n'
+            '#datatype,string,long,dateTime:RFC3339,string,double\r\n'
+            '#group,false,false,false,true,false\r\n'
+            '#default,_result,,,,0\r\n'
+            ',result,table,_time,test_id,value\r\n'
+            ',,1,2026-01-01T00:00:00Z,id2,1.5\r\n'
+            ',,1,2026-01-01T00:00:00Z,id3,\r\n'
+            '\r\n'
+            ',result,table,test_id,value,comment\r\n'
+            ',_result,2,id4,,text\r\n')
+
+FLUX_RECORDS = [{'test_id': 'id1', 'event_name': 'build_start'},
+                {'test_id': 'id1', 'event_name': 'build_end, with a comma'},
+                {'test_id': 'id2', 'value': '1.5'},
+                {'test_id': 'id3', 'value': '0'},
+                {'test_id': 'id4', 'value': '', 'comment': 'text'}]
+
+class Test_parse_flux_csv(unittest.TestCase):
+    """ Tests for InfluxDBLogger._parse_flux_csv and InfluxDBLogger.iter_query. """
+
+    def setUp(self):
+        """ Creates an InfluxDB logger for a server that does not need to be alive. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__logger = create_rgt_logger(logger_name='test_rgt_influxdb',
+                                          fh_filepath=os.path.join(self.__tmp_dir, 'test_rgt_influxdb.log'),
+                                          logger_threshold_log_level='CRITICAL',
+                                          fh_threshold_log_level='CRITICAL',
+                                          ch_threshold_log_level='CRITICAL')
+        self.__server = None
+        return
+
+    def tearDown(self):
+        """ Stops the HTTP server, if any, and removes the temporary directory. """
+        if self.__server != None:
+            self.__server.shutdown()
+            self.__server.server_close()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_tables(self):
+        """Tests the records of annotated and unannotated tables separated by blank lines."""
+        self.assertEqual(self.__parse(FLUX_CSV), FLUX_RECORDS)
+
+    def test_default_annotation_is_per_table(self):
+        """Tests that the #default annotation of a table does not fill in the empty values of the next."""
+        response = ('#default,_result,,,0\r\n'
+                    ',result,table,test_id,value\r\n'
+                    ',,0,id1,\r\n'
+                    '\r\n'
+                    '#datatype,string,long,string,double\r\n'
+                    ',result,table,test_id,value\r\n'
+                    ',,1,id2,\r\n')
+        self.assertEqual(self.__parse(response), [{'test_id': 'id1', 'value': '0'},
+                                                  {'test_id': 'id2', 'value': ''}])
+
+    def test_error_table(self):
+        """Tests that an error reported by Flux during the query ends the records."""
+        response = (',result,table,test_id\r\n'
+                    ',_result,0,id1\r\n'
+                    '\r\n'
+                    ',error,reference\r\n'
+                    ',runtime error,\r\n'
+                    '\r\n'
+                    ',result,table,test_id\r\n'
+                    ',_result,1,id2\r\n')
+        self.assertEqual(self.__parse(response), [{'test_id': 'id1'}])
+
+    def test_response_that_ends_early(self):
+        """Tests that a row cut short at the end of the response is skipped."""
+        for end in [FLUX_CSV.rindex(',text'), FLUX_CSV.rindex(',,text')]:
+            with self.subTest(response_end=FLUX_CSV[end - 10:end]):
+                self.assertEqual(self.__parse(FLUX_CSV[:end]), FLUX_RECORDS[:-1])
+
+    def test_iter_query(self):
+        """Tests the records of a streamed query response."""
+        influxdb_logger = self.__start_server(FLUX_CSV.encode(), len(FLUX_CSV))
+        self.assertEqual(list(influxdb_logger.iter_query('query')), FLUX_RECORDS)
+
+    def test_iter_query_that_ends_early(self):
+        """Tests that a streamed query response that ends early yields its complete rows, then raises."""
+        end = FLUX_CSV.rindex(',text')
+        influxdb_logger = self.__start_server(FLUX_CSV[:end].encode(), len(FLUX_CSV))
+        records = []
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            for record in influxdb_logger.iter_query('query'):
+                records.append(record)
+        self.assertEqual(records, FLUX_RECORDS[:-1])
+
+    def __make_influxdb_logger(self, port):
+        with unittest.mock.patch.object(InfluxDBLogger, '_check_alive', return_value=None):
+            return InfluxDBLogger(uri=f'http://127.0.0.1:{port}?bucket=bucket&org=org', token='token',
+                                  logger=self.__logger)
+
+    def __parse(self, response):
+        influxdb_logger = self.__make_influxdb_logger(8086)
+        return list(influxdb_logger._parse_flux_csv(csv.reader(io.StringIO(response, newline=''))))
+
+    def __start_server(self, body, content_length):
+        """Starts an HTTP server that answers queries with body, announced as content_length bytes."""
+        class QueryHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.send_header('Content-Length', str(content_length))
+                self.end_headers()
+                self.wfile.write(body)
+                self.close_connection = True
+
+            def log_message(self, *args):
+                return
+
+        self.__server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), QueryHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self.__make_influxdb_logger(self.__server.server_port)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+#! /usr/bin/env python3
+""" Test class module verifies the SQLite database backend. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import os
+import shutil
+import sqlite3
+import tempfile
+
+# My harness package imports
+from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+from libraries.rgt_database_loggers import write_retry
+from libraries.rgt_database_loggers.db_backends import line_protocol
+from libraries.rgt_database_loggers.db_backends.base_db import DatabaseTransientError
+from libraries.rgt_database_loggers.db_backends.rgt_sqlite import SQLiteDBLogger
+
+class Test_sqlite_round_trip(unittest.TestCase):
+    """ Tests for writing to an SQLite database and querying the data back. """
+
+    TEST_INFO = {'test_id': 'id1', 'app': 'app1', 'test': 'test1', 'runtag': 'tag1', 'machine': 'machine1',
+                 'event_time': '2026-01-01T00:00:00.000000'}
+
+    def setUp(self):
+        """ Creates an SQLite database logger in a temporary directory, without batching or spooling. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__environ = unittest.mock.patch.dict(os.environ)
+        self.__environ.start()
+        for envvar in ('RGT_DATABASE_BATCH', 'RGT_DATABASE_SPOOL_DIR', 'RGT_SQLITE_DRY_RUN', 'RGT_NODE_LOCATION_FILE'):
+            os.environ.pop(envvar, None)
+
+        self.__logger = create_rgt_logger(logger_name='test_rgt_sqlite',
+                                          fh_filepath=os.path.join(self.__tmp_dir, 'test_rgt_sqlite.log'),
+                                          logger_threshold_log_level='CRITICAL',
+                                          fh_threshold_log_level='CRITICAL',
+                                          ch_threshold_log_level='CRITICAL')
+        self.__db_path = os.path.join(self.__tmp_dir, 'harness.db')
+        self.__sqlite_logger = SQLiteDBLogger(uri=SQLiteDBLogger.URI_PREFIX + self.__db_path, logger=self.__logger)
+        return
+
+    def tearDown(self):
+        """ Restores the environment and removes the temporary directory. """
+        self.__environ.stop()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_event(self):
+        """Tests that an event and the end of its output file are written and queried back."""
+        with open(os.path.join(self.__tmp_dir, 'output_check.txt'), 'w') as output_file:
+            output_file.write('check output\n')
+        event = dict(self.TEST_INFO, event_name='check_end', event_value='0', run_archive=self.__tmp_dir)
+
+        self.assertTrue(self.__sqlite_logger.send_event(dict(event)))
+
+        rows = self.__sqlite_logger.query('SELECT * FROM events')
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        for field_name in SQLiteDBLogger.TAGS + ['event_name', 'event_value', 'event_time', 'run_archive']:
+            self.assertEqual(row[field_name], event[field_name])
+        self.assertEqual(row['comment'], SQLiteDBLogger.NO_VALUE)
+        self.assertEqual(row['output_txt'], 'check output\n')
+        self.assertEqual(row['time'], line_protocol.timestamp(event['event_time']))
+
+    def test_metrics(self):
+        """Tests that metrics are written one row per metric, with their values converted."""
+        metrics = {'int': 3, 'float': '1.5', 'bool': True, 'string': '"a \\"quoted\\" value"', 'word': 'fast'}
+
+        self.assertTrue(self.__sqlite_logger.send_metrics(dict(self.TEST_INFO), metrics))
+
+        rows = self.__sqlite_logger.query('SELECT * FROM metrics ORDER BY name')
+        self.assertEqual({row['name']: row['value'] for row in rows},
+                         {'int': 3, 'float': 1.5, 'bool': 1, 'string': 'a "quoted" value', 'word': 'fast'})
+        for row in rows:
+            for tag_name in SQLiteDBLogger.TAGS + ['event_time']:
+                self.assertEqual(row[tag_name], self.TEST_INFO[tag_name])
+
+    def test_node_health(self):
+        """Tests that node health results are written one row per node."""
+        node_health = {'node1': {'status': 'HEALTHY', 'message': 'ok'},
+                       'node2': {'status': 'FAILED', 'message': 'gpu 3 missing'}}
+
+        self.assertTrue(self.__sqlite_logger.send_node_health_results(dict(self.TEST_INFO), node_health))
+
+        rows = self.__sqlite_logger.query('SELECT node, status, message, test_id, location FROM node_health ORDER BY node')
+        self.assertEqual(rows, [{'node': 'node1', 'status': 'HEALTHY', 'message': 'ok', 'test_id': 'id1', 'location': None},
+                                {'node': 'node2', 'status': 'FAILED', 'message': 'gpu 3 missing', 'test_id': 'id1', 'location': None}])
+
+    def test_resent_event_replaces_its_row(self):
+        """Tests that an event sent again, as by a replay of the spool, replaces its row."""
+        event = dict(self.TEST_INFO, event_name='build_end', event_value='0', run_archive=self.__tmp_dir)
+        self.assertTrue(self.__sqlite_logger.send_event(dict(event)))
+        self.assertTrue(self.__sqlite_logger.send_event(dict(event, event_value='1')))
+
+        # The same event of another test instance is a row of its own.
+        self.assertTrue(self.__sqlite_logger.send_event(dict(event, test_id='id2')))
+
+        rows = self.__sqlite_logger.query('SELECT test_id, event_value FROM events ORDER BY test_id')
+        self.assertEqual(rows, [{'test_id': 'id1', 'event_value': '1'}, {'test_id': 'id2', 'event_value': '0'}])
+
+    def test_journal_mode(self):
+        """Tests that a database on a local file system is in WAL mode, and the fallback when WAL mode cannot be enabled."""
+        self.assertEqual(self.__sqlite_logger.query('PRAGMA journal_mode'), [{'journal_mode': 'wal'}])
+
+        # Enabling WAL mode fails, or leaves the journal mode unchanged.
+        for wal_result in [sqlite3.OperationalError('disk I/O error'), self.__journal_mode_result('delete')]:
+            with self.subTest(wal_result=wal_result):
+                db = unittest.mock.Mock()
+                db.execute.side_effect = [wal_result, self.__journal_mode_result('delete')]
+                self.assertEqual(SQLiteDBLogger._set_journal_mode(db), 'delete')
+                self.assertEqual(db.execute.call_args_list, [unittest.mock.call('PRAGMA journal_mode=WAL'),
+                                                             unittest.mock.call('PRAGMA journal_mode=DELETE')])
+
+    def test_dry_run(self):
+        """Tests that nothing is written while RGT_SQLITE_DRY_RUN is set, including when it is set after initialization."""
+        event = dict(self.TEST_INFO, event_name='build_start', run_archive=self.__tmp_dir)
+
+        os.environ['RGT_SQLITE_DRY_RUN'] = '1'
+        self.assertTrue(self.__sqlite_logger.send_event(dict(event)))
+        self.assertTrue(self.__sqlite_logger.send_metrics(dict(self.TEST_INFO), {'value': 1}))
+
+        dry_run_logger = SQLiteDBLogger(uri=self.__db_path, logger=self.__logger)
+        self.assertTrue(dry_run_logger.dryrun)
+        self.assertTrue(dry_run_logger.send_event(dict(event)))
+
+        self.assertEqual(self.__sqlite_logger.query('SELECT * FROM events'), [])
+        self.assertEqual(self.__sqlite_logger.query('SELECT * FROM metrics'), [])
+
+    def __journal_mode_result(self, journal_mode):
+        return unittest.mock.Mock(fetchone=unittest.mock.Mock(return_value=(journal_mode,)))
+
+class Test_sqlite_transient_errors(unittest.TestCase):
+    """ Tests that only a locked SQLite database is retried. """
+
+    TEST_INFO = Test_sqlite_round_trip.TEST_INFO
+
+    def setUp(self):
+        """ Creates an SQLite database logger that waits 0.1 seconds for a locked database. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__patches = [unittest.mock.patch.dict(os.environ, {'RGT_DATABASE_RETRIES': '2',
+                                                                'RGT_SQLITE_BUSY_TIMEOUT': '0.1'}),
+                          unittest.mock.patch.object(write_retry.time, 'sleep')]
+        for patch in self.__patches:
+            patch.start()
+        for envvar in ('RGT_DATABASE_BATCH', 'RGT_DATABASE_SPOOL_DIR', 'RGT_SQLITE_DRY_RUN'):
+            os.environ.pop(envvar, None)
+
+        self.__logger = create_rgt_logger(logger_name='test_rgt_sqlite_transient_errors',
+                                          fh_filepath=os.path.join(self.__tmp_dir, 'test_rgt_sqlite.log'),
+                                          logger_threshold_log_level='CRITICAL',
+                                          fh_threshold_log_level='CRITICAL',
+                                          ch_threshold_log_level='CRITICAL')
+        self.__db_path = os.path.join(self.__tmp_dir, 'harness.db')
+        self.__sqlite_logger = SQLiteDBLogger(uri=self.__db_path, logger=self.__logger)
+        self.__other_db = sqlite3.connect(self.__db_path, isolation_level=None)
+        return
+
+    def tearDown(self):
+        """ Removes the patches and the temporary directory. """
+        self.__other_db.close()
+        for patch in reversed(self.__patches):
+            patch.stop()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_locked_database_is_retried(self):
+        """Tests that a database locked by another connection is a transient error, and is retried."""
+        self.__other_db.execute('BEGIN IMMEDIATE')
+        record = self.__sqlite_logger._make_record('metrics', dict(self.TEST_INFO, name='value', value=1, time=1))
+
+        with self.assertRaises(DatabaseTransientError):
+            self.__sqlite_logger._write_batch([record])
+        self.assertIs(self.__sqlite_logger._send_batch([record], self.__logger), write_retry.TRANSIENT_FAILURE)
+        self.assertEqual(write_retry.time.sleep.call_count, 2)
+
+        # The write succeeds once the other connection releases the database.
+        self.__other_db.execute('ROLLBACK')
+        self.assertIs(self.__sqlite_logger._send_batch([record], self.__logger), True)
+
+    def test_other_errors_fail_once(self):
+        """Tests that other operational errors are raised without being retried."""
+        self.__other_db.execute('DROP TABLE metrics')
+
+        with self.assertRaises(sqlite3.OperationalError):
+            self.__sqlite_logger.send_metrics(dict(self.TEST_INFO), {'value': 1})
+        write_retry.time.sleep.assert_not_called()
+
+    def test_is_locked_error(self):
+        """Tests the classification of errors by error code, and by message when there is no error code."""
+        for (message, error_code, locked) in [('database is locked', None, True),
+                                              ('database table is locked', None, True),
+                                              ('database is locked', sqlite3.SQLITE_BUSY, True),
+                                              ('database is locked', 517, True), # SQLITE_BUSY_SNAPSHOT
+                                              ('database table is locked', sqlite3.SQLITE_LOCKED, True),
+                                              ('disk I/O error', 10, False),
+                                              ('no such table: metrics', None, False),
+                                              ('database or disk is full', 13, False)]:
+            with self.subTest(message=message, error_code=error_code):
+                error = sqlite3.OperationalError(message)
+                if error_code != None:
+                    error.sqlite_errorcode = error_code
+                self.assertEqual(self.__sqlite_logger._is_locked_error(error), locked)
+
+    def test_busy_timeout(self):
+        """Tests that RGT_SQLITE_BUSY_TIMEOUT sets the busy timeout, and that an invalid value is ignored."""
+        self.assertEqual(self.__sqlite_logger.busy_timeout, 0.1)
+        for value in ('0', '-1', 'soon'):
+            with self.subTest(value=value):
+                os.environ['RGT_SQLITE_BUSY_TIMEOUT'] = value
+                sqlite_logger = SQLiteDBLogger(uri=self.__db_path, logger=self.__logger)
+                self.assertEqual(sqlite_logger.busy_timeout, SQLiteDBLogger.DEFAULT_BUSY_TIMEOUT)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -217,6 +217,46 @@ class Test_command_line_arguments(unittest.TestCase):
         argv = shlex.split(command_line_arguments)
         self.assertRaises(SystemExit,runtests.parse_commandline_argv,argv)
 
+    def test_max_concurrent_tests_option(self):
+        """Tests the maximum concurrent tests option."""
+
+        # The error message for a failed command line option.
+        frmt_message = ("\n\nError Details\n"
+                        "\tFailure in harness max concurrent tests option:\n"
+                        "\tcommand line: {}\n")
+
+        for max_tests in (1, 8, 64):
+            command_line_arguments = "--mode start --max-concurrent-tests {}".format(max_tests)
+            error_message = frmt_message.format(command_line_arguments)
+            argv = shlex.split(command_line_arguments)
+            harness_arguments = runtests.parse_commandline_argv(argv)
+            self.assertEqual(harness_arguments.max_concurrent_tests,max_tests,msg=error_message)
+
+    def test_max_concurrent_tests_default_option(self):
+        """Tests the maximum concurrent tests default option."""
+
+        # The error message for a failed command line option.
+        frmt_message = ("\n\nError Details\n"
+                        "\tFailure in harness max concurrent tests default option:\n"
+                        "\tcommand line: {}\n")
+
+        command_line_arguments = "--mode start"
+        error_message = frmt_message.format(command_line_arguments)
+        argv = shlex.split(command_line_arguments)
+        harness_arguments = runtests.parse_commandline_argv(argv)
+        self.assertEqual(harness_arguments.max_concurrent_tests,
+                         runtests.DEFAULT_MAX_CONCURRENT_TESTS,
+                         msg=error_message)
+
+    def test_max_concurrent_tests_option_incorrect_value(self):
+        """Tests for an invalid maximum concurrent tests value."""
+
+        # Negative and non-integer values are rejected by the parser.
+        for invalid_value in ("-1", "many"):
+            command_line_arguments = "--mode start --max-concurrent-tests {}".format(invalid_value)
+            argv = shlex.split(command_line_arguments)
+            self.assertRaises(SystemExit,runtests.parse_commandline_argv,argv)
+
     def tearDown(self):
         """ Stud doc for tear down """
         return
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+""" Test class module verifies the cache of harness event files. """
+
+# Python package imports
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+# My harness package imports
+from libraries.status_database import StatusEventCache
+
+class Test_status_event_cache(unittest.TestCase):
+    """ Tests for StatusEventCache on file systems that keep modification times to the second. """
+
+    def setUp(self):
+        """ Creates a status directory with one test instance, and an in-memory cache. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__status_dir = os.path.join(self.__tmp_dir, 'Status')
+        os.mkdir(self.__status_dir)
+        self.__add_event('1.1', 'Event_100_build_start.txt')
+        self.__cache = StatusEventCache()
+        return
+
+    def tearDown(self):
+        """ Closes the cache and removes the temporary directory. """
+        self.__cache.close()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_changes_within_modification_time_granularity(self):
+        """Tests that a test instance and an event added without changing directory modification times are found."""
+        self.assertEqual(self.__read_event_names(), {'1.1': ['build_start']})
+
+        # Added in the same second as the scan, so the modification times
+        # of the directories are unchanged on such file systems.
+        mtimes = {path: os.stat(path).st_mtime_ns for path in self.__dirs()}
+        self.__add_event('1.1', 'Event_170_check_end.txt')
+        self.__add_event('1.2', 'Event_100_build_start.txt')
+        for (path, mtime_ns) in mtimes.items():
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+        self.assertEqual(self.__read_event_names(), {'1.1': ['build_start', 'check_end'], '1.2': ['build_start']})
+
+    def test_older_modification_times_are_cached(self):
+        """Tests that directory modification times are cached once they are older than RECENT_MTIME_NS."""
+        self.__read_event_names()
+        self.assertEqual(self.__cached_mtimes(), {self.__status_dir: None, os.path.join(self.__status_dir, '1.1'): None})
+
+        old_mtime_ns = time.time_ns() - 2 * StatusEventCache.RECENT_MTIME_NS
+        for path in self.__dirs():
+            os.utime(path, ns=(old_mtime_ns, old_mtime_ns))
+        self.assertEqual(self.__read_event_names(), {'1.1': ['build_start']})
+        self.assertEqual(self.__cached_mtimes(), {self.__status_dir: old_mtime_ns,
+                                                  os.path.join(self.__status_dir, '1.1'): old_mtime_ns})
+
+    def __add_event(self, test_id, event_filename):
+        test_id_dir = os.path.join(self.__status_dir, test_id)
+        os.makedirs(test_id_dir, exist_ok=True)
+        event_name = event_filename.split('_', 2)[2][:-len('.txt')]
+        with open(os.path.join(test_id_dir, event_filename), 'w') as event_file:
+            event_file.write(f'event_filename={event_filename}\tevent_name={event_name}\n')
+
+    def __dirs(self):
+        return [self.__status_dir] + [entry.path for entry in os.scandir(self.__status_dir)]
+
+    def __read_event_names(self):
+        """Updates the cache, then returns the names of the cached events of each test instance."""
+        self.__cache.update([self.__status_dir])
+        self.__cache.connection.commit()
+        events = self.__cache.read_events([self.__status_dir])[self.__status_dir]
+        return {test_id: [event['event_name'] for event in test_events] for (test_id, test_events) in events.items()}
+
+    def __cached_mtimes(self):
+        rows = self.__cache.connection.execute('SELECT path, mtime_ns FROM status_dirs UNION ALL '
+                                               'SELECT path, mtime_ns FROM instance_dirs')
+        return dict(rows.fetchall())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+#! /usr/bin/env python3
+""" Test class module verifies the incremental summaries of status files. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+
+# My harness package imports
+from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+from libraries.status_file import StatusFile
+from libraries.status_file import StatusFileCursor
+from libraries.status_file import classify_status_record
+
+class Test_status_file_cursor(unittest.TestCase):
+    """ Tests for StatusFileCursor summaries of a status file that is appended to, updated and rewritten. """
+
+    def setUp(self):
+        """ Creates an empty status file in a temporary directory. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__status_file_path = os.path.join(self.__tmp_dir, StatusFile.FILENAME)
+        logger = create_rgt_logger(logger_name='test_status_file',
+                                   fh_filepath=os.path.join(self.__tmp_dir, 'test_status_file.log'),
+                                   logger_threshold_log_level='CRITICAL',
+                                   fh_threshold_log_level='CRITICAL',
+                                   ch_threshold_log_level='CRITICAL')
+        self.__status_file = StatusFile(logger, self.__status_file_path)
+        (status_dir, status_filename) = os.path.split(self.__status_file_path)
+        self.__changes_path = os.path.join(status_dir, StatusFile.CHANGES_FILENAME_FORMAT.format(status_filename))
+        self.__cursor_path = os.path.join(status_dir, StatusFile.CURSOR_FILENAME_FORMAT.format(status_filename))
+        return
+
+    def tearDown(self):
+        """ Removes the temporary directory. """
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_summary_of_appended_records(self):
+        """Tests the summary of records appended between summaries."""
+        self.__add_instances(['a1', 'a2'])
+        self.__set_results('a1', '0')
+        self.__assert_summary(passed=1, failed=0, inconclusive=0)
+
+        self.__add_instances(['a3', 'a4'])
+        self.__set_results('a3', '1')
+        self.__set_results('a4', '5')
+        self.__assert_summary(passed=1, failed=1, inconclusive=1)
+
+    def test_summary_of_updated_records(self):
+        """Tests the summary of records updated in place, interleaved with appends."""
+        self.__add_instances(['u1', 'u2', 'u3'])
+        self.__assert_summary(passed=0, failed=0, inconclusive=0)
+
+        self.__set_results('u1', '0')
+        self.__set_results('u2', '0')
+        self.__assert_summary(passed=2, failed=0, inconclusive=0)
+
+        # A passed record fails on a rerun, and a new record is appended.
+        self.__update('u2', '1', 'Add_Run_Result')
+        self.__add_instances(['u4'])
+        self.__set_results('u4', '17')
+        self.__assert_summary(passed=1, failed=1, inconclusive=1)
+
+        # An in progress record is checked.
+        self.__update('u4', '0', 'Add_Run_Result')
+        self.__assert_summary(passed=2, failed=1, inconclusive=0)
+
+    def test_summary_of_updated_last_record(self):
+        """Tests that updating the last parsed record keeps the saved cursor, rather than parsing the status file again."""
+        self.__add_instances(['l1', 'l2'])
+        self.__assert_summary(passed=0, failed=0, inconclusive=0)
+
+        with unittest.mock.patch.object(StatusFileCursor, '_StatusFileCursor__new_cursor',
+                                        autospec=True, side_effect=StatusFileCursor._StatusFileCursor__new_cursor) as new_cursor:
+            self.__set_results('l2', '0')
+            self.__assert_summary(passed=1, failed=0, inconclusive=0)
+            self.__set_results('l1', '1')
+            self.__update('l2', '1', 'Add_Run_Result')
+            self.__assert_summary(passed=0, failed=2, inconclusive=0)
+            new_cursor.assert_not_called()
+
+    def test_summary_of_rewritten_status_file(self):
+        """Tests the summary after a value that does not fit its column rewrites the status file."""
+        self.__add_instances(['r1', 'r2', 'r3'])
+        self.__set_results('r1', '0')
+        self.__set_results('r2', '0')
+        self.__assert_summary(passed=2, failed=0, inconclusive=0)
+
+        self.__update('r2', '1'.zfill(20), 'Add_Run_Result')
+        self.__assert_summary(passed=1, failed=1, inconclusive=0)
+
+        # The records after the rewritten one are still updated in place.
+        self.__set_results('r3', '0')
+        self.__add_instances(['r4'])
+        self.__set_results('r4', '1')
+        self.__assert_summary(passed=2, failed=2, inconclusive=0)
+
+    def test_summary_of_rewrite_that_keeps_offsets(self):
+        """Tests the summary after a rewrite that leaves every record at the same offset."""
+        self.__add_instances(['k1', 'k2', 'k3'])
+        for unique_id in ('k1', 'k2', 'k3'):
+            self.__set_results(unique_id, '0')
+        self.__assert_summary(passed=3, failed=0, inconclusive=0)
+
+        # An empty value cannot be written in place, and is padded to the
+        # column width by the rewrite, so the summary must notice the
+        # rewrite from the change log alone.
+        self.__update('k1', '', 'Add_Run_Result')
+        self.__update('k2', '1', 'Add_Run_Result')
+        self.__assert_summary(passed=1, failed=1, inconclusive=0)
+
+    def test_summary_without_saved_cursor(self):
+        """Tests that a new cursor starts from the current status file."""
+        self.__add_instances(['n1', 'n2'])
+        self.__set_results('n1', '0')
+        self.__assert_summary(passed=1, failed=0, inconclusive=0)
+
+        self.__update('n1', '1', 'Add_Run_Result')
+        self.__set_results('n2', '0')
+        os.remove(self.__cursor_path)
+        self.__assert_summary(passed=1, failed=1, inconclusive=0)
+
+        self.__update('n2', '1', 'Add_Run_Result')
+        self.__assert_summary(passed=0, failed=2, inconclusive=0)
+
+    def test_change_log_is_compacted(self):
+        """Tests that the change log only keeps the changes not yet applied by the saved cursor."""
+        self.__add_instances(['c1', 'c2'])
+        for value in ('0', '1', '0', '1'):
+            self.__set_results('c1', value)
+            self.__assert_summary(passed=int(value == '0'), failed=int(value == '1'), inconclusive=0)
+            self.assertEqual(self.__num_changes(), 0)
+
+        # Changes logged after the summary are kept until the next one.
+        self.__update('c1', '0', 'Add_Run_Result')
+        self.assertEqual(self.__num_changes(), 1)
+        self.__assert_summary(passed=1, failed=0, inconclusive=0)
+        self.assertEqual(self.__num_changes(), 0)
+
+    def __add_instances(self, unique_ids):
+        for unique_id in unique_ids:
+            self.__status_file._StatusFile__status_file_add_test_instance('2026-01-01T00:00:00.000000',
+                                                                          'launch', unique_id)
+
+    def __set_results(self, unique_id, check_result):
+        self.__update(unique_id, '0', 'Add_Build_Result')
+        self.__update(unique_id, '0', 'Add_Submit_Result')
+        self.__update(unique_id, check_result, 'Add_Run_Result')
+
+    def __update(self, unique_id, value, mode):
+        self.__status_file._StatusFile__status_file_add_result(unique_id, value, mode)
+
+    def __num_changes(self):
+        with open(self.__changes_path, 'r') as changes_file:
+            return len([line for line in changes_file if not line.startswith('generation ')])
+
+    def __assert_summary(self, passed, failed, inconclusive):
+        """Checks the cursor summary against the expected counts and a full parse of the status file."""
+        expected = {'passed' : passed, 'failed' : failed, 'inconclusive' : inconclusive}
+
+        recount = {name : 0 for name in StatusFileCursor.CLASSES}
+        with open(self.__status_file_path, 'r') as status_file_obj:
+            for line in status_file_obj:
+                record_class = classify_status_record(line.split())
+                if not StatusFile.ignore_line(line) and record_class in recount:
+                    recount[record_class] += 1
+
+        summary = StatusFileCursor(self.__status_file_path).summary()
+        self.assertEqual(recount, expected)
+        self.assertEqual(summary, expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+""" Test class module verifies the system log of harness events. """
+
+# Python package imports
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+# My harness package imports
+import libraries
+
+class Test_system_log_at_exit(unittest.TestCase):
+    """ Tests for writing buffered system log records through the event pipeline while the interpreter exits. """
+
+    # Writes system log records from the event pipeline while its worker is
+    # busy, so that they are written when the pipeline is closed at exit, and
+    # one record from the main thread, which creates the system log writer
+    # after the event pipeline.
+    SCRIPT = textwrap.dedent('''
+        import time
+
+        from libraries.event_pipeline import get_event_pipeline
+        from libraries.status_file import write_system_log
+
+        def make_status_info(test_id):
+            return [['app', 'app1'], ['test', 'test1'], ['test_id', test_id], ['event_name', 'build_start']]
+
+        pipeline = get_event_pipeline()
+        pipeline.put(time.sleep, 0.5)
+        for test_id in ['id0', 'id1', 'id2']:
+            pipeline.put(write_system_log, test_id, make_status_info(test_id))
+        write_system_log('id3', make_status_info('id3'))
+    ''')
+
+    TEST_IDS = ['id0', 'id1', 'id2', 'id3']
+
+    def setUp(self):
+        """ Creates a temporary directory for the system log files and the script. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        return
+
+    def tearDown(self):
+        """ Removes the temporary directory. """
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_records_written_at_exit(self):
+        """Tests that the records written while the event pipeline is closed are flushed, for each batch size."""
+        for batch_size in ['1', '10']:
+            with self.subTest(batch_size=batch_size):
+                log_dir = os.path.join(self.__tmp_dir, 'system_log_' + batch_size)
+                os.mkdir(log_dir)
+                self.__run_script(log_dir, batch_size)
+                self.assertEqual(sorted(os.listdir(log_dir)),
+                                 ['app1_#_test1_#_' + test_id + '.txt' for test_id in self.TEST_IDS])
+                for test_id in self.TEST_IDS:
+                    with open(os.path.join(log_dir, 'app1_#_test1_#_' + test_id + '.txt')) as log_file:
+                        self.assertEqual(log_file.read(),
+                                         f'app="app1" test="test1" test_id="{test_id}" event_name="build_start"\n')
+
+    def __run_script(self, log_dir, batch_size):
+        """Runs SCRIPT and checks that it exited cleanly."""
+        script_path = os.path.join(self.__tmp_dir, 'write_at_exit.py')
+        with open(script_path, 'w') as script_file:
+            script_file.write(self.SCRIPT)
+
+        harness_dir = os.path.dirname(os.path.dirname(os.path.abspath(libraries.__file__)))
+        env = dict(os.environ,
+                   PYTHONPATH=os.pathsep.join([harness_dir, os.environ.get('PYTHONPATH', '')]),
+                   RGT_EVENT_PIPELINE='1',
+                   RGT_SYSTEM_LOG_TAG='tag1',
+                   RGT_SYSTEM_LOG_DIR=log_dir,
+                   RGT_SYSTEM_LOG_BATCH_SIZE=batch_size,
+                   RGT_SYSTEM_LOG_FLUSH_INTERVAL='60')
+        env.pop('RGT_SYSTEM_LOG_FORMAT', None)
+
+        result = subprocess.run([sys.executable, script_path], env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, universal_newlines=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
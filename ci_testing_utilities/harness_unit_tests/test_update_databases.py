@@ -0,0 +1,198 @@
+#! /usr/bin/env python3
+""" Test class module verifies the reading of Slurm job states by update_databases.py. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import contextlib
+import io
+import os
+import pwd
+import runpy
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+
+# My harness package imports
+import libraries
+from libraries.status_file import StatusFile
+
+class RecordingDBLogger:
+    """ Stands in for the database logger of one database, and keeps the events it is given. """
+
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(dict(event))
+        return True
+
+class Test_update_databases_sacct(unittest.TestCase):
+    """ Tests for the parsing of the sacct output, and the check_end events made from it. """
+
+    MACHINE_INI = textwrap.dedent('''
+        [MachineDetails]
+        machine_name = test_machine
+        scheduler_type = slurm
+
+        [RepoDetails]
+        type_of_repository = git
+
+        [TestshotDefaults]
+        system_log_tag = test_tag
+    ''')
+
+    # The sacct output: job 101 has a '|' in its comment, job 102 survived a
+    # node failure and has a later record, job 103 was cancelled by user ID 0,
+    # and the line of job 104 is cut short.
+    SACCT_OUTPUT = ('JobID|Elapsed|Start|End|State|ExitCode|Reason|Comment\n'
+                    '101|00:10:00|2026-01-01T00:00:00|2026-01-01T00:10:00|TIMEOUT|0:0|TimeLimit|nightly | rerun|2\n'
+                    '102|00:05:00|2026-01-01T00:00:00|2026-01-01T00:05:00|RESIZING|0:0|None|\n'
+                    '\n'
+                    '102|00:20:00|2026-01-01T00:00:00|2026-01-01T00:20:00|TIMEOUT|0:0|TimeLimit|\n'
+                    '103|00:01:00|2026-01-01T00:00:00|2026-01-01T00:01:00|CANCELLED by 0|0:15|None|\n'
+                    '104|00:01:00|2026-01-01T00:00:00\n')
+
+    # Writes SACCT_STDERR_BYTES bytes to stderr before its output.
+    SACCT_SCRIPT = textwrap.dedent('''
+        #!{python}
+        import os
+        import sys
+        with open({args_path!r}, 'w') as args_file:
+            args_file.write(' '.join(sys.argv[1:]))
+        sys.stderr.write('e' * int(os.environ.get('SACCT_STDERR_BYTES', '0')))
+        sys.stderr.flush()
+        with open({output_path!r}) as output_file:
+            sys.stdout.write(output_file.read())
+    ''').lstrip()
+
+    JOB_IDS = ['101', '102', '103', '104']
+
+    def setUp(self):
+        """ Puts a fake sacct on the PATH, then loads update_databases.py with no databases enabled. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__args_path = os.path.join(self.__tmp_dir, 'sacct_args.txt')
+        output_path = os.path.join(self.__tmp_dir, 'sacct_output.txt')
+        with open(output_path, 'w') as output_file:
+            output_file.write(self.SACCT_OUTPUT)
+        bin_dir = os.path.join(self.__tmp_dir, 'bin')
+        os.mkdir(bin_dir)
+        sacct_path = os.path.join(bin_dir, 'sacct')
+        with open(sacct_path, 'w') as sacct_file:
+            sacct_file.write(self.SACCT_SCRIPT.format(python=sys.executable, args_path=self.__args_path,
+                                                      output_path=output_path))
+        os.chmod(sacct_path, 0o755)
+        with open(os.path.join(self.__tmp_dir, 'test_machine.ini'), 'w') as ini_file:
+            ini_file.write(self.MACHINE_INI)
+
+        self.__environ = unittest.mock.patch.dict(os.environ, {'PATH': os.pathsep.join([bin_dir, os.environ.get('PATH', '')]),
+                                                               'USER': 'tester',
+                                                               'OLCF_HARNESS_MACHINE': 'test_machine'})
+        self.__environ.start()
+        for envvar in ('RGT_INFLUXDB_URI', 'RGT_SQLITE_URI', 'RGT_DATABASE_SPOOL_DIR'):
+            os.environ.pop(envvar, None)
+
+        # The script reads the machine configuration from the working directory,
+        # and its logger writes to the standard error of the time it is created
+        harness_dir = os.path.dirname(os.path.dirname(os.path.abspath(libraries.__file__)))
+        script_path = os.path.join(harness_dir, 'utilities', 'update_databases.py')
+        cwd = os.getcwd()
+        os.chdir(self.__tmp_dir)
+        try:
+            with unittest.mock.patch.object(sys, 'argv', [script_path, '--machine', 'test_machine', '--loglevel', 'CRITICAL']), \
+                 contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                self.__update_databases = runpy.run_path(script_path)
+        finally:
+            os.chdir(cwd)
+        return
+
+    def tearDown(self):
+        """ Restores the environment and removes the temporary directory. """
+        self.__environ.stop()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_sacct_job_status(self):
+        """Tests the fields of each job, including a '|' in a comment, a RESIZING record and a line cut short."""
+        slurm_data = self.__update_databases['sacct_job_status'](self.JOB_IDS)
+
+        with open(self.__args_path) as args_file:
+            self.assertEqual(args_file.read(), '-j 101,102,103,104 --format JobID,Elapsed,Start,End,State,ExitCode,Reason,Comment -X --parsable2')
+        self.assertEqual(sorted(slurm_data), ['101', '102', '103'])
+        self.assertEqual(slurm_data['101'], {'jobid': '101', 'elapsed': '00:10:00', 'start': '2026-01-01T00:00:00',
+                                             'end': '2026-01-01T00:10:00', 'state': 'TIMEOUT', 'exitcode': '0:0',
+                                             'reason': 'TimeLimit', 'comment': 'nightly | rerun|2'})
+
+        # The RESIZING record marks the later record of the job, and is otherwise skipped
+        self.assertEqual(slurm_data['102']['state'], 'TIMEOUT')
+        self.assertEqual(slurm_data['102']['end'], '2026-01-01T00:20:00')
+        self.assertIs(slurm_data['102']['node-failed'], True)
+        self.assertNotIn('node-failed', slurm_data['101'])
+        self.assertEqual(slurm_data['103']['state'], 'CANCELLED by 0')
+
+    def test_sacct_with_long_stderr(self):
+        """Tests that sacct writing more than a pipe buffer to stderr does not block the reading of its output."""
+        os.environ['SACCT_STDERR_BYTES'] = str(1024 * 1024)
+        slurm_data = {}
+        reader = threading.Thread(target=lambda: slurm_data.update(self.__update_databases['sacct_job_status'](self.JOB_IDS)),
+                                  daemon=True)
+        reader.start()
+        reader.join(timeout=60)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(sorted(slurm_data), ['101', '102', '103'])
+
+    def test_check_job_status_batches(self):
+        """Tests that the job IDs are queried in batches of 100."""
+        job_ids = [str(i) for i in range(250)]
+        with unittest.mock.patch.dict(self.__update_databases['check_job_status'].__globals__,
+                                      {'sacct_job_status': lambda batch: {batch[0]: len(batch)}}):
+            slurm_data = self.__update_databases['check_job_status'](job_ids)
+        self.assertEqual(slurm_data, {'0': 100, '100': 100, '200': 50})
+
+    def test_process_entry(self):
+        """Tests the check_end event logged for each job state, and that a job missing from sacct is skipped."""
+        slurm_data = self.__update_databases['sacct_job_status'](self.JOB_IDS)
+        process_entry = self.__update_databases['process_entry']
+        root_name = pwd.getpwuid(0).pw_name
+
+        expected_events = {
+            '101': (23, '2026-01-01T00:10:00.000000',
+                    'TIMEOUT detected. Job exited in state TIMEOUT at 2026-01-01T00:10:00, after running for 00:10:00.'),
+            '102': (9, '2026-01-01T00:20:00.000000',
+                    'NODE_FAIL followed by TIMEOUT detected. Job exited in state TIMEOUT at 2026-01-01T00:20:00, after running for 00:20:00.'),
+            '103': (21, '2026-01-01T00:01:00.000000',
+                    f'Job canceled at 2026-01-01T00:01:00 by {root_name}, after running for 00:01:00. Exit code: 0:15, reason: None.'),
+        }
+        for job_id in self.JOB_IDS:
+            with self.subTest(job_id=job_id):
+                db_logger = RecordingDBLogger()
+                entry = {'test_id': f'id{job_id}', 'app': 'app1', 'test': 'test1', 'runtag': 'tag1',
+                         'machine': 'test_machine', 'user': 'tester', 'job_id': job_id,
+                         'event_name': 'job_queued', 'event_value': '0', 'event_time': '2026-01-01T00:00:00.000000',
+                         'event_filename': 'Event_130_job_queued.txt', 'run_archive': self.__tmp_dir}
+                outcome = process_entry(entry, slurm_data, db_logger)
+
+                if not job_id in expected_events:
+                    self.assertEqual(outcome, 'skipped')
+                    self.assertEqual(db_logger.events, [])
+                    continue
+                (event_value, event_time, output_txt) = expected_events[job_id]
+                self.assertEqual(outcome, 'sent')
+                self.assertEqual(len(db_logger.events), 1)
+                event = db_logger.events[0]
+                self.assertEqual(event['test_id'], f'id{job_id}')
+                self.assertEqual(event['event_name'], 'check_end')
+                # Only the event of a cancelled job names the event file of check_end
+                if job_id == '103':
+                    self.assertEqual(event['event_filename'], StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][0])
+                else:
+                    self.assertEqual(event['event_filename'], StatusFile.NO_VALUE)
+                self.assertEqual(event['event_value'], event_value)
+                self.assertEqual(event['event_time'], event_time)
+                self.assertEqual(event['output_txt'], output_txt)
+                self.assertEqual(event['user'], 'tester')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+#! /usr/bin/env python3
+""" Test class module verifies the retries and the circuit breakers of the database writes. """
+
+# Python package imports
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+import uuid
+
+# My harness package imports
+from libraries.rgt_loggers.rgt_logger_factory import create_rgt_logger
+from libraries.rgt_database_loggers import write_retry
+from libraries.rgt_database_loggers.db_backends.base_db import BaseDBLogger
+from libraries.rgt_database_loggers.db_backends.base_db import DatabaseTransientError
+
+class FakeClock:
+    """ Stands in for time.monotonic and time.sleep in write_retry, so that no test waits. """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeDBLogger(BaseDBLogger):
+    """ A backend whose writes return, or raise, the results it is given, in order. """
+
+    def __init__(self, results, alive=True):
+        self.url = 'fake://' + uuid.uuid4().hex
+        self.results = list(results)
+        self.alive = alive
+        self.num_writes = 0
+        self.num_probes = 0
+
+    disable_file_name = '.disable_fake'
+    disable_envvar_name = 'RGT_FAKE_DISABLE'
+    successful_file_name = '.success_fake'
+    name = 'fake'
+
+    def send_event(self, event_dict, callback=None):
+        return
+
+    def send_metrics(self, test_info_dict, metrics_dict, callback=None):
+        return
+
+    def send_node_health_results(self, test_info_dict, node_health_dict, callback=None):
+        return
+
+    def send_external_metrics(self, table, tags, values, log_time, callback=None):
+        return
+
+    def is_alive(self):
+        self.num_probes += 1
+        return None if self.alive else 'down'
+
+    def query(self, query):
+        return []
+
+    def _write_batch(self, records):
+        self.num_writes += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+class Test_write_retry(unittest.TestCase):
+    """ Tests for retry_write, CircuitBreaker and BaseDBLogger._send_batch. """
+
+    def setUp(self):
+        """ Patches the clock of write_retry and sets the retry and circuit breaker settings. """
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__logger = create_rgt_logger(logger_name='test_write_retry',
+                                          fh_filepath=os.path.join(self.__tmp_dir, 'test_write_retry.log'),
+                                          logger_threshold_log_level='CRITICAL',
+                                          fh_threshold_log_level='CRITICAL',
+                                          ch_threshold_log_level='CRITICAL')
+        self.__clock = FakeClock()
+        self.__patches = [unittest.mock.patch.object(write_retry.time, 'monotonic', self.__clock.monotonic),
+                          unittest.mock.patch.object(write_retry.time, 'sleep', self.__clock.sleep),
+                          unittest.mock.patch.dict(os.environ, {'RGT_DATABASE_RETRIES': '2',
+                                                                'RGT_DATABASE_RETRY_DELAY': '0.5',
+                                                                'RGT_DATABASE_RETRY_MAX_DELAY': '8',
+                                                                'RGT_DATABASE_BREAKER_THRESHOLD': '3',
+                                                                'RGT_DATABASE_BREAKER_PROBE_INTERVAL': '30'})]
+        for patch in self.__patches:
+            patch.start()
+        return
+
+    def tearDown(self):
+        """ Removes the patches and the temporary directory. """
+        for patch in reversed(self.__patches):
+            patch.stop()
+        shutil.rmtree(self.__tmp_dir)
+        return
+
+    def test_backoff_bounds(self):
+        """Tests that the delay before retry n is drawn between 0 and the base delay * 2^n, capped at the maximum delay."""
+        os.environ['RGT_DATABASE_RETRIES'] = '5'
+        os.environ['RGT_DATABASE_RETRY_MAX_DELAY'] = '3'
+        backend = FakeDBLogger([DatabaseTransientError('down')] * 6)
+
+        with unittest.mock.patch.object(write_retry.random, 'uniform', side_effect=lambda low, high: high) as uniform:
+            with self.assertRaises(DatabaseTransientError):
+                write_retry.retry_write(lambda: backend._write_batch([]), (DatabaseTransientError,))
+
+        self.assertEqual(backend.num_writes, 6)
+        self.assertEqual([call.args for call in uniform.call_args_list],
+                         [(0, 0.5), (0, 1.0), (0, 2.0), (0, 3.0), (0, 3.0)])
+        self.assertEqual(self.__clock.sleeps, [0.5, 1.0, 2.0, 3.0, 3.0])
+
+    def test_retry_until_success(self):
+        """Tests that a write is retried until it succeeds, and that other errors are not retried."""
+        backend = FakeDBLogger([DatabaseTransientError('down'), DatabaseTransientError('down'), True])
+        self.assertTrue(write_retry.retry_write(lambda: backend._write_batch([]), (DatabaseTransientError,)))
+        self.assertEqual(backend.num_writes, 3)
+
+        backend = FakeDBLogger([ValueError('bad data'), True])
+        with self.assertRaises(ValueError):
+            write_retry.retry_write(lambda: backend._write_batch([]), (DatabaseTransientError,))
+        self.assertEqual(backend.num_writes, 1)
+
+    def test_breaker_opens_at_threshold(self):
+        """Tests that consecutive failures open the circuit, and that a success in between resets the count."""
+        breaker = write_retry.CircuitBreaker(failure_threshold=3, probe_interval=30)
+        self.assertEqual([breaker.record_failure(), breaker.record_failure()], [False, False])
+        breaker.record_success()
+        self.assertEqual([breaker.record_failure(), breaker.record_failure()], [False, False])
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.record_failure())
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.record_failure())
+
+    def test_breaker_half_open_probe(self):
+        """Tests that an open circuit is probed once per probe interval, and fails again after one failure once probed."""
+        breaker = write_retry.CircuitBreaker(failure_threshold=3, probe_interval=30)
+        for i in range(3):
+            breaker.record_failure()
+        backend = FakeDBLogger([], alive=False)
+
+        # No probe before the probe interval has passed.
+        self.__clock.now += 29
+        self.assertFalse(breaker.allow_request(lambda: not backend.is_alive()))
+        self.assertEqual(backend.num_probes, 0)
+
+        # A failed probe keeps the circuit open for another interval.
+        self.__clock.now += 1
+        self.assertFalse(breaker.allow_request(lambda: not backend.is_alive()))
+        self.assertEqual(backend.num_probes, 1)
+        self.__clock.now += 29
+        self.assertFalse(breaker.allow_request(lambda: not backend.is_alive()))
+        self.assertEqual(backend.num_probes, 1)
+
+        # A successful probe half-closes the circuit: one more failure opens it again.
+        backend.alive = True
+        self.__clock.now += 1
+        self.assertTrue(breaker.allow_request(lambda: not backend.is_alive()))
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow_request(lambda: not backend.is_alive()))
+        self.assertEqual(backend.num_probes, 2)
+        self.assertTrue(breaker.record_failure())
+        self.assertTrue(breaker.is_open)
+
+    def test_breaker_closes_on_success(self):
+        """Tests that a success after a successful probe closes the circuit fully."""
+        breaker = write_retry.CircuitBreaker(failure_threshold=3, probe_interval=30)
+        for i in range(3):
+            breaker.record_failure()
+        self.__clock.now += 30
+        self.assertTrue(breaker.allow_request(lambda: True))
+        breaker.record_success()
+        self.assertEqual([breaker.record_failure(), breaker.record_failure()], [False, False])
+        self.assertFalse(breaker.is_open)
+
+    def test_send_batch_through_breaker(self):
+        """Tests that _send_batch fails fast while the circuit is open, and writes again after a successful probe."""
+        backend = FakeDBLogger([DatabaseTransientError('down')] * 9 + [False, True])
+
+        # Each write is tried 3 times; the third failed write opens the circuit.
+        for i in range(3):
+            self.assertIs(backend._send_batch(['record'], self.__logger), write_retry.TRANSIENT_FAILURE)
+        self.assertEqual(backend.num_writes, 9)
+        self.assertEqual(len(self.__clock.sleeps), 6)
+        self.assertTrue(all(0 <= delay <= 1.0 for delay in self.__clock.sleeps))
+
+        # While the circuit is open, writes fail without being tried.
+        self.assertIs(backend._send_batch(['record'], self.__logger), write_retry.TRANSIENT_FAILURE)
+        self.assertEqual(backend.num_writes, 9)
+        self.assertEqual(backend.num_probes, 0)
+
+        # After the probe interval, the destination is probed and the write is tried. A
+        # rejected write shows the destination is reachable, so it closes the circuit.
+        self.__clock.now += 30
+        self.assertIs(backend._send_batch(['record'], self.__logger), False)
+        self.assertEqual((backend.num_writes, backend.num_probes), (10, 1))
+        self.assertIs(backend._send_batch(['record'], self.__logger), True)
+        self.assertEqual((backend.num_writes, backend.num_probes), (11, 1))
+
+    def test_breaker_threshold_zero(self):
+        """Tests that RGT_DATABASE_BREAKER_THRESHOLD=0 disables circuit breaking."""
+        os.environ['RGT_DATABASE_BREAKER_THRESHOLD'] = '0'
+        os.environ['RGT_DATABASE_RETRIES'] = '0'
+        backend = FakeDBLogger([DatabaseTransientError('down')] * 10 + [True])
+        self.assertIsNone(write_retry.get_circuit_breaker(backend.batch_key))
+
+        for i in range(10):
+            self.assertIs(backend._send_batch(['record'], self.__logger), write_retry.TRANSIENT_FAILURE)
+        self.assertIs(backend._send_batch(['record'], self.__logger), True)
+        self.assertEqual((backend.num_writes, backend.num_probes), (11, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -247,6 +247,17 @@ DEFAULT_OUTPUT=PERMITTED_OUTPUT_VALUES[0]
 str: The default output option.
 """
 
+# This section pertains to the maximum concurrent tests option.
+DEFAULT_MAX_CONCURRENT_TESTS=0
+"""
+int: The default maximum number of tests launched concurrently.
+
+The maximum number of concurrent tests is set by means of the command line arguments to the
+runtests.py command: --max-concurrent-tests <N>. A value of 0 defers to the
+max_workers setting of the [TestshotDefaults] section of the machine configuration file
+(or the RGT_MAX_WORKERS environment variable). If neither is set, tests are launched serially.
+"""
+
 #-----------------------------------------------------
 # End of section that sets the permitted and/or      -
 # default for the command line options of the        -
@@ -324,8 +335,27 @@ def create_parser():
                         default=False,
                         help="Separate output from build into build_out.stderr.txt and build_out.stdout.txt")
 
+    concurrency_help = ("Maximum number of application tests to launch concurrently.\n"
+                        "A value of 0 uses max_workers from the [TestshotDefaults] section\n"
+                        "of the configuration file (default: %(default)s)")
+    parser.add_argument("--max-concurrent-tests",
+                        required=False,
+                        default=DEFAULT_MAX_CONCURRENT_TESTS,
+                        type=_non_negative_int,
+                        help=concurrency_help)
+
     return parser
 
+def _non_negative_int(value):
+    """Argparse type for integer options that must be 0 or greater."""
+    try:
+        ivalue = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if ivalue < 0:
+        raise argparse.ArgumentTypeError(f"must be a non-negative integer: '{value}'")
+    return ivalue
+
 def parse_commandline_argv(argv):
     """
     Returns a object of type HarnessParsedArguments.
@@ -355,7 +385,8 @@ def parse_commandline_argv(argv):
                                                               stdout_stderr=Vargs.output,
                                                               runmode=Vargs.mode,
                                                               use_fireworks=Vargs.fireworks,
-                                                              separate_build_stdio=Vargs.separate_build_stdio)
+                                                              separate_build_stdio=Vargs.separate_build_stdio,
+                                                              max_concurrent_tests=Vargs.max_concurrent_tests)
     return harness_parsed_args
 
 def runtests(my_arg_string=None):
@@ -414,7 +445,8 @@ def runtests(my_arg_string=None):
                                   harness_arguments.loglevel,
                                   harness_arguments.stdout_stderr,
                                   harness_arguments.use_fireworks,
-                                  harness_arguments.separate_build_stdio)
+                                  harness_arguments.separate_build_stdio,
+                                  harness_arguments.max_concurrent_tests)
 
     main_logger.info("Created an instance of the harness.")
     main_logger.info("Harness: " + str(rgt))
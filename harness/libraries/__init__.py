@@ -21,6 +21,9 @@ __all__ = [
                 'command_line',
                 'get_machine_name',
                 'status_file_factory',
+                'event_pipeline',
+                'system_log',
+                'event_journal',
           ]
 
 version = 2.0
@@ -23,6 +23,7 @@ from libraries.status_file import parse_status_file
 from libraries.status_file import parse_status_file2
 from libraries.status_file import summarize_status_file
 from libraries.status_file import StatusFile
+from libraries.event_journal import read_event
 from libraries.repositories.common_repository_utility_functions import run_as_subprocess_command_return_exitstatus
 from libraries.repositories.common_repository_utility_functions import run_as_subprocess_command_return_stdout_stderr_exitstatus
 
@@ -136,27 +137,28 @@ class subtest(base_apptest, apptest_layout):
                 if test_checkout_lock:
                     test_checkout_lock.acquire()
 
-                from libraries.repositories import RepositoryFactory
+                try:
+                    from libraries.repositories import RepositoryFactory
 
-                repository_type = RepositoryFactory.get_type_of_repository()
-                name_of_application = self.getNameOfApplication()
-                url_to_remote_repsitory_application = RepositoryFactory.get_repository_url_of_application(name_of_application)
-                my_repository_branch = RepositoryFactory.get_repository_git_branch()
+                    repository_type = RepositoryFactory.get_type_of_repository()
+                    name_of_application = self.getNameOfApplication()
+                    url_to_remote_repsitory_application = RepositoryFactory.get_repository_url_of_application(name_of_application)
+                    my_repository_branch = RepositoryFactory.get_repository_git_branch()
 
-                my_repository = RepositoryFactory.create(repository_type,
-                                                         url_to_remote_repsitory_application,
-                                                         my_repository_branch)
+                    my_repository = RepositoryFactory.create(repository_type,
+                                                             url_to_remote_repsitory_application,
+                                                             my_repository_branch)
 
-                self.doInfoLogging("Start of cloning repository")
-                destination = self.getLocalPathToTests()
+                    self.doInfoLogging("Start of cloning repository")
+                    destination = self.getLocalPathToTests()
 
-                exit_code = self.cloneRepository(my_repository,
-                                     destination)
+                    exit_code = self.cloneRepository(my_repository,
+                                         destination)
 
-                self.doInfoLogging("End of cloning repository")
-
-                if test_checkout_lock:
-                    test_checkout_lock.release()
+                    self.doInfoLogging("End of cloning repository")
+                finally:
+                    if test_checkout_lock:
+                        test_checkout_lock.release()
 
                 if exit_code:
                     return 1
@@ -186,10 +188,11 @@ class subtest(base_apptest, apptest_layout):
                     if test_display_lock:
                         test_display_lock.acquire()
 
-                    self.display_status()
-
-                    if test_display_lock:
-                        test_display_lock.release()
+                    try:
+                        self.display_status()
+                    finally:
+                        if test_display_lock:
+                            test_display_lock.release()
 
                 elif harness_task == Harness.summarize_results:
                     self.generateReport()
@@ -575,11 +578,10 @@ class subtest(base_apptest, apptest_layout):
         """
         Enables the harness database logging extensions for Metrics and Node Health
         """
-        currentdir = os.getcwd()
-        self.logger.doDebugLogging(f"Current directory in apptest: {currentdir}")
+        # The Run_Archive files are addressed by path rather than by changing directory, so
+        # that the extensions of several test instances may run concurrently in one process
         runarchive_dir = self.get_path_to_runarchive()
-        os.chdir(runarchive_dir)
-        self.logger.doInfoLogging(f"Starting the harness database extensions in apptest: {os.getcwd()}")
+        self.logger.doInfoLogging(f"Starting the harness database extensions in apptest: {runarchive_dir}")
 
         # Find the machine name, or give a best-guess
         if not 'RGT_MACHINE_NAME' in os.environ:
@@ -594,13 +596,14 @@ class subtest(base_apptest, apptest_layout):
             'runtag': os.environ['RGT_SYSTEM_LOG_TAG'] if 'RGT_SYSTEM_LOG_TAG' in os.environ else 'unknown',
             'machine': machine_name,
             'test_id': self.get_harness_id(),
-            'event_time': self._get_event_time(event=StatusFile.EVENT_CHECK_START)
+            'event_time': self._get_event_time(event=StatusFile.EVENT_CHECK_START),
+            'run_archive': runarchive_dir
         }
 
         success_log = 0
         failed_log = 0
 
-        metrics = self._get_metrics()
+        metrics = self._get_metrics(runarchive_dir)
 
         if len(metrics) == 0:
             self.logger.doInfoLogging(f"No metrics found to log to influxDB")
@@ -621,7 +624,7 @@ class subtest(base_apptest, apptest_layout):
                 self.logger.doWarningLogging(f"Logging metrics failed to log to at least one database.")
     
         # add node-based health checking
-        node_healths = self._get_node_health()
+        node_healths = self._get_node_health(runarchive_dir)
         self.logger.doDebugLogging(f"Found {len(node_healths)} nodes reported for node health")
         if len(node_healths) > 0:
             if not self.__db_logger.log_node_health(test_info, node_healths):
@@ -631,7 +634,6 @@ class subtest(base_apptest, apptest_layout):
                 success_log += 1
                 self.logger.doDebugLogging(f"Successfully logged {len(node_healths)} node health results to all databases.")
 
-        os.chdir(currentdir)
         return failed_log == 0
 
     def _get_build_time(self):
@@ -645,53 +647,43 @@ class subtest(base_apptest, apptest_layout):
                                                     StatusFile.EVENT_DICT[StatusFile.EVENT_BINARY_EXECUTE_END][0])
 
     def _get_run_timestamp(self, event=StatusFile.EVENT_CHECK_END):
-        # Check for start event file and end event file
-        check_status_file = f"{self.get_path_to_test()}/{self.test_status_dirname}/{self.get_harness_id()}/"
-        check_status_file += f"{StatusFile.EVENT_DICT[event][0]}"
+        # Check for the event in the event journal or event file
+        status_dir = f"{self.get_path_to_test()}/{self.test_status_dirname}/{self.get_harness_id()}"
+        event_info = read_event(status_dir, StatusFile.EVENT_DICT[event][0])
 
-        if not os.path.exists(f"{check_status_file}"):
-            self.logger.doWarningLogging(f"Couldn't find required file for post-run time logging: {check_status_file}")
+        if event_info == None:
+            self.logger.doWarningLogging(f"Couldn't find required event for post-run time logging: {status_dir}/{StatusFile.EVENT_DICT[event][0]}")
             return -1
-        with open(f"{check_status_file}", 'r') as check_fstr:
-            line = next(check_fstr)
-            check_timestamp = line.split()[0]
-            # Convert to UTC
-            #dt_utc = datetime.strptime(check_timestamp, "%Y-%m-%dT%H:%M:%S.%f") \
-                #+ (datetime.utcnow() - datetime.now())
-            dt_utc = datetime.strptime(check_timestamp, "%Y-%m-%dT%H:%M:%S.%f")
-            ns_utc = int(datetime.timestamp(dt_utc)) * 1000 * 1000 * 1000
+        check_timestamp = event_info['event_time']
+        # Convert to UTC
+        #dt_utc = datetime.strptime(check_timestamp, "%Y-%m-%dT%H:%M:%S.%f") \
+            #+ (datetime.utcnow() - datetime.now())
+        dt_utc = datetime.strptime(check_timestamp, "%Y-%m-%dT%H:%M:%S.%f")
+        ns_utc = int(datetime.timestamp(dt_utc)) * 1000 * 1000 * 1000
         return ns_utc
 
     def _get_event_time(self, event=StatusFile.EVENT_CHECK_END):
-        # Check for start event file and end event file
-        status_file = f"{self.get_path_to_test()}/{self.test_status_dirname}/{self.get_harness_id()}/"
-        status_file += f"{StatusFile.EVENT_DICT[event][0]}"
+        # Check for the event in the event journal or event file
+        status_dir = f"{self.get_path_to_test()}/{self.test_status_dirname}/{self.get_harness_id()}"
+        event_info = read_event(status_dir, StatusFile.EVENT_DICT[event][0])
 
-        if not os.path.exists(f"{status_file}"):
-            self.logger.doWarningLogging(f"Couldn't find required file event time fetching: {status_file}")
+        if event_info == None:
+            self.logger.doWarningLogging(f"Couldn't find required event for event time fetching: {status_dir}/{StatusFile.EVENT_DICT[event][0]}")
             return -1
-        with open(f"{status_file}", 'r') as fstr:
-            line = next(fstr)
-            event_time = line.split()[0]
-        return event_time
+        return event_info['event_time']
 
     def _get_time_diff_of_status_files(self, start_event_file, end_event_file):
-        # Check for start event file and end event file
+        # Check for start event and end event in the event journal or event files
         status_dir = f"{self.get_path_to_test()}/{self.test_status_dirname}/{self.get_harness_id()}"
 
-        for targ in [ f"{status_dir}/{start_event_file}", \
-                        f"{status_dir}/{end_event_file}" ]:
-            if not os.path.exists(f"{targ}"):
-                self.logger.doWarningLogging(f"Couldn't find required file for time logging: {targ}")
+        timestamps = []
+        for targ in [ start_event_file, end_event_file ]:
+            event_info = read_event(status_dir, targ)
+            if event_info == None:
+                self.logger.doWarningLogging(f"Couldn't find required event for time logging: {status_dir}/{targ}")
                 return -1
-        start_timestamp = ''
-        end_timestamp = ''
-        with open(f"{status_dir}/{start_event_file}", 'r') as start_fstr:
-            line = next(start_fstr)
-            start_timestamp = line.split()[0]
-        with open(f"{status_dir}/{end_event_file}", 'r') as end_fstr:
-            line = next(end_fstr)
-            end_timestamp = line.split()[0]
+            timestamps.append(event_info.get('event_time', ''))
+        start_timestamp, end_timestamp = timestamps
         if len(start_timestamp) <= 1 or len(end_timestamp) <= 1:
             self.logger.doErrorLogging(f"Invalid start or end timestamp: {start_timestamp}, {end_timestamp}")
             return -1
@@ -702,8 +694,8 @@ class subtest(base_apptest, apptest_layout):
         diff = end_ts_dt - start_ts_dt
         return diff.total_seconds()   # diff in seconds
 
-    def _get_metrics(self):
-        """ Parse the metrics.txt file for InfluxDB reporting """
+    def _get_metrics(self, runarchive_dir):
+        """ Parse the metrics.txt file in runarchive_dir for InfluxDB reporting """
         def is_numeric(s):
             """ Checks if an entry (RHS) is numeric """
             # Local function. s is assumed to be a whitespace-stripped string
@@ -719,10 +711,11 @@ class subtest(base_apptest, apptest_layout):
         metrics = {}
         app_name = self.getNameOfApplication()
         test_name = self.getNameOfSubtest()
-        if not os.path.isfile('metrics.txt'):
+        metrics_file_path = os.path.join(runarchive_dir, 'metrics.txt')
+        if not os.path.isfile(metrics_file_path):
             self.logger.doWarningLogging(f"File metrics.txt not found")
             return metrics
-        with open('metrics.txt', 'r') as metric_f:
+        with open(metrics_file_path, 'r') as metric_f:
             # Each line is in format "metric = value" (space around '=' optional)
             # All whitespace in metric name will be replaced with underscores
             for line in metric_f:
@@ -752,14 +745,15 @@ class subtest(base_apptest, apptest_layout):
                         self.logger.doErrorLogging(f"Found a line in metrics.txt with 0 or >1 equals signs:\n{line.strip()}")
         return metrics
 
-    def _get_node_health(self):
-        """ Parse the nodecheck.txt file for InfluxDB reporting """
+    def _get_node_health(self, runarchive_dir):
+        """ Parse the nodecheck.txt file in runarchive_dir for InfluxDB reporting """
         node_healths = {}
         node_name_list = []
         app_name = self.getNameOfApplication()
         test_name = self.getNameOfSubtest()
 
-        if not os.path.isfile('nodecheck.txt'):
+        nodecheck_file_path = os.path.join(runarchive_dir, 'nodecheck.txt')
+        if not os.path.isfile(nodecheck_file_path):
             self.logger.doInfoLogging(f"File nodecheck.txt not found.")
             return node_healths
         self.logger.doDebugLogging("Processing file nodecheck.txt.")
@@ -770,7 +764,7 @@ class subtest(base_apptest, apptest_layout):
             'HW-FAIL': ['INCORRECT', 'HW-FAIL'],
             'PERF-FAIL': ['PERF', 'PERF-FAIL']
         }
-        with open('nodecheck.txt', 'r') as nodes_f:
+        with open(nodecheck_file_path, 'r') as nodes_f:
             # Each line is in format <nodename> <state> <msg>
             for line in nodes_f:
                 # Allows comment lines
@@ -831,18 +825,57 @@ def do_application_tasks(launch_id,
     # Returns [#Passed,#Failed]
     ret = [0, 0, []]
     for app_test in app_test_list:
-        print(f"Starting tasks for Application.Test: {app_test.getNameOfApplication()}.{app_test.getNameOfSubtest()}: {tasks}")
         # Non-zero exit status is failure
-        if app_test.doTasks(launchid=launch_id,
-                         tasks=tasks,
-                         stdout_stderr=stdout_stderr,
-                         separate_build_stdio=separate_build_stdio):
+        if do_subtest_tasks(launch_id,
+                            app_test,
+                            tasks,
+                            stdout_stderr,
+                            separate_build_stdio=separate_build_stdio):
             ret[1] += 1
             ret[2].append(f"{app_test.getNameOfApplication()}.{app_test.getNameOfSubtest()}")
         else:
             ret[0] += 1
     return ret
 
+def do_subtest_tasks(launch_id,
+                     app_test,
+                     tasks,
+                     stdout_stderr,
+                     separate_build_stdio=False,
+                     test_checkout_lock=None,
+                     test_display_lock=None):
+    """ Does the harness tasks for a single subtest.
+
+    This is the unit of work the Harness submits to its launch thread pool.
+
+    Parameters
+    ----------
+    app_test : subtest
+        The subtest to do the tasks for.
+
+    test_checkout_lock : threading.Lock
+        (Optional) A lock shared by the subtests of the same application that
+        serializes the repository checkout.
+
+    test_display_lock : threading.Lock
+        (Optional) A lock that serializes writing of the status display files.
+
+    Returns
+    -------
+    int
+        0 if the tasks succeeded, 1 otherwise.
+    """
+    print(f"Starting tasks for Application.Test: {app_test.getNameOfApplication()}.{app_test.getNameOfSubtest()}: {tasks}")
+    # Non-zero exit status is failure
+    if app_test.doTasks(launchid=launch_id,
+                        tasks=tasks,
+                        test_checkout_lock=test_checkout_lock,
+                        test_display_lock=test_display_lock,
+                        stdout_stderr=stdout_stderr,
+                        separate_build_stdio=separate_build_stdio):
+        return 1
+    return 0
+
 def wait_for_jobs_to_complete_in_queue(harness_config,
                                        app_test_list,
                                        timeout):
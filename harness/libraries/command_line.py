@@ -15,7 +15,8 @@ class HarnessParsedArguments:
                        runmode=None,
                        stdout_stderr=None,
                        use_fireworks=False,
-                       separate_build_stdio=False):
+                       separate_build_stdio=False,
+                       max_concurrent_tests=0):
 
         self.__inputfile = inputfile
         self.__loglevel = loglevel
@@ -24,6 +25,7 @@ class HarnessParsedArguments:
         self.__stdout_stderr = stdout_stderr
         self.__use_fireworks = use_fireworks
         self.__separate_build_stdio = separate_build_stdio
+        self.__max_concurrent_tests = max_concurrent_tests
 
         self.__verify_attributes()
 
@@ -68,6 +70,10 @@ class HarnessParsedArguments:
     def separate_build_stdio(self):
         return self.__separate_build_stdio
 
+    @property
+    def max_concurrent_tests(self):
+        return self.__max_concurrent_tests
+
     @property
     def effective_command_line(self):
         command_options = ("Effective command line: "
@@ -77,6 +83,7 @@ class HarnessParsedArguments:
                            " --loglevel {my_loglevel}"
                            " --output {my_output}"
                            " --separate-build-stdio"
+                           " --max-concurrent-tests {my_max_concurrent_tests}"
                            " --mode {my_runmode}")
 
         run_mode_args=" ".join(self.runmode) 
@@ -85,6 +92,7 @@ class HarnessParsedArguments:
                                      my_configfile = self.configfile,
                                      my_loglevel = self.loglevel,
                                      my_output = self.stdout_stderr,
+                                     my_max_concurrent_tests = self.max_concurrent_tests,
                                      my_runmode = run_mode_args)
 
         return efc
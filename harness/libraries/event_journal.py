@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+"""
+This module implements the event journal of a test instance.
+
+By default every harness event of a test instance is written to its own
+Event_*.txt file in the Status/<test_id> directory. When RGT_EVENT_JOURNAL
+is set, the events are instead appended, one JSON object per line, to a
+single journal file in that directory, which cuts the number of files each
+test instance creates and each reader has to stat and open. The 'compat'
+mode writes both, for tools that still read the Event_*.txt files.
+
+Readers should use read_events and read_event, which read the journal and
+any Event_*.txt files, so that they work for test instances written in any
+mode.
+"""
+
+import json
+import os
+import re
+
+from libraries.layout_of_apps_directory import apptest_layout
+
+MODE_FILES = 'files'
+"""str: Each event is written to its own Event_*.txt file."""
+
+MODE_JOURNAL = 'journal'
+"""str: Events are appended to the journal of the test instance."""
+
+MODE_COMPAT = 'compat'
+"""str: Events are appended to the journal and written to Event_*.txt files."""
+
+PERMITTED_MODES = (MODE_FILES, MODE_JOURNAL, MODE_COMPAT)
+
+EVENT_FILENAME_REGEX = re.compile(r'^Event_.*\.txt$')
+
+def get_journal_mode():
+    """Returns the event journal mode selected by RGT_EVENT_JOURNAL.
+
+    Returns
+    -------
+    str
+        One of PERMITTED_MODES. '1' is accepted for MODE_JOURNAL, and
+        anything unrecognized selects MODE_FILES.
+    """
+    mode = os.getenv('RGT_EVENT_JOURNAL', MODE_FILES).lower()
+    if mode == '1':
+        return MODE_JOURNAL
+    if mode not in PERMITTED_MODES:
+        return MODE_FILES
+    return mode
+
+def append_event(test_status_dir, status_info):
+    """Appends an event to the journal of a test instance.
+
+    The record is written with a single write to a file opened for
+    appending, then synced, so concurrent writers never interleave records
+    and a record is durable once this returns.
+
+    Parameters
+    ----------
+    test_status_dir : str
+        The Status/<test_id> directory of the test instance.
+
+    status_info : dict
+        The field/value pairs of the event, in order.
+    """
+    record = (json.dumps(status_info) + '\n').encode()
+    path = os.path.join(test_status_dir, apptest_layout.event_journal_filename)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o664)
+    try:
+        os.write(fd, record)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_journal(path):
+    """Returns the events of a journal file.
+
+    A trailing incomplete or unparsable record, e.g. from a writer that was
+    killed, is skipped.
+
+    Parameters
+    ----------
+    path : str
+        The path to the journal file.
+
+    Returns
+    -------
+    list
+        The event dicts, in the order they were appended.
+    """
+    events = []
+    with open(path, 'rb') as file_obj:
+        for line in file_obj:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+def read_event_file(path):
+    """Returns the field/value pairs of an Event_*.txt file as a dict."""
+    with open(path, 'r') as file_obj:
+        line = file_obj.read()
+
+    line = re.sub('\n', '', line)
+    f_vs = [f_v.split('=') for f_v in line.split('\t')
+            if len(f_v.split('=')) == 2]
+
+    return {field: value for (field, value) in f_vs}
+
+def read_events(test_status_dir):
+    """Returns all events of a test instance.
+
+    The journal is read with one open. Event_*.txt files are only read for
+    events that are not in the journal. An event logged more than once is
+    returned as last logged.
+
+    Parameters
+    ----------
+    test_status_dir : str
+        The Status/<test_id> directory of the test instance.
+
+    Returns
+    -------
+    list
+        The event dicts, in event file name order.
+    """
+    events = {}
+    try:
+        with os.scandir(test_status_dir) as entries:
+            names = [entry.name for entry in entries]
+    except FileNotFoundError:
+        return []
+
+    if apptest_layout.event_journal_filename in names:
+        for event in read_journal(os.path.join(test_status_dir, apptest_layout.event_journal_filename)):
+            events[event.get('event_filename')] = event
+
+    for name in names:
+        if EVENT_FILENAME_REGEX.search(name) and not name in events:
+            try:
+                events[name] = read_event_file(os.path.join(test_status_dir, name))
+            except FileNotFoundError:
+                continue
+
+    return [events[name] for name in sorted(events)]
+
+def read_event(test_status_dir, event_filename):
+    """Returns one event of a test instance.
+
+    Parameters
+    ----------
+    test_status_dir : str
+        The Status/<test_id> directory of the test instance.
+
+    event_filename : str
+        The Event_*.txt file name of the event, see StatusFile.EVENT_DICT.
+
+    Returns
+    -------
+    dict
+        The field/value pairs of the event, or None if it has not occurred.
+    """
+    journal_path = os.path.join(test_status_dir, apptest_layout.event_journal_filename)
+    if os.path.exists(journal_path):
+        events = [event for event in read_journal(journal_path)
+                  if event.get('event_filename') == event_filename]
+        if events:
+            return events[-1]
+
+    try:
+        return read_event_file(os.path.join(test_status_dir, event_filename))
+    except FileNotFoundError:
+        return None
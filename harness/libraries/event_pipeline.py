@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+"""
+This module implements the asynchronous event pipeline of the harness.
+
+When enabled with RGT_EVENT_PIPELINE=1, the work that follows the durable
+Event_*.txt write of a harness event (system logging, status file rollups and
+database logging) is handed to a background thread so that builds and
+submissions are not held up by a slow filesystem or database.
+"""
+
+import atexit
+import os
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 1024
+"""int: The default maximum number of pending tasks before callers block."""
+
+DEFAULT_BATCH_SIZE = 64
+"""int: The default maximum number of pending tasks the worker takes at a time."""
+
+_event_pipeline = None
+_event_pipeline_lock = threading.Lock()
+
+def get_event_pipeline(logger=None):
+    """Returns the event pipeline of this process, or None if it is disabled.
+
+    The pipeline is enabled by setting RGT_EVENT_PIPELINE to '1'. The first
+    call creates the pipeline, which is flushed and stopped when the process
+    exits.
+
+    Parameters
+    ----------
+    logger : rgt_logger
+        The logger used to report failed tasks.
+
+    Returns
+    -------
+    EventPipeline
+        The event pipeline shared by all status files of this process, or
+        None if the pipeline is not enabled.
+    """
+    global _event_pipeline
+
+    if os.getenv('RGT_EVENT_PIPELINE', '0') != '1':
+        return None
+
+    with _event_pipeline_lock:
+        if _event_pipeline == None:
+            _event_pipeline = EventPipeline(logger=logger,
+                                            max_queue_size=_int_from_environment('RGT_EVENT_PIPELINE_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+                                            batch_size=_int_from_environment('RGT_EVENT_PIPELINE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+            atexit.register(_event_pipeline.close)
+
+    return _event_pipeline
+
+def _int_from_environment(envvar, default):
+    value = os.getenv(envvar)
+    if value and value.isdigit() and int(value) > 0:
+        return int(value)
+    return default
+
+class EventPipeline:
+    """Runs deferred event tasks, in order, on a bounded background queue."""
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Special methods                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __init__(self, logger=None, max_queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        """Constructor.
+
+        Parameters
+        ----------
+        logger : rgt_logger
+            The logger used to report failed tasks.
+
+        max_queue_size : int
+            The maximum number of pending tasks. Adding a task to a full
+            queue blocks until the worker catches up.
+
+        batch_size : int
+            The maximum number of pending tasks the worker takes from the
+            queue at a time.
+        """
+        self.__logger = logger
+        self.__batch_size = batch_size
+        self.__queue = queue.Queue(maxsize=max_queue_size)
+        self.__closed = False
+
+        # The worker is a daemon so that it never holds up interpreter
+        # shutdown; the pending tasks are flushed by close() at exit.
+        self.__worker = threading.Thread(target=self.__run, name='rgt_event_pipeline', daemon=True)
+        self.__worker.start()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Public methods.                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def put(self, task, *args):
+        """Adds a task to the pipeline.
+
+        Tasks are run in the order they are added. Once the pipeline is
+        closed, tasks are run immediately in the calling thread.
+
+        Parameters
+        ----------
+        task : callable
+            The task to run.
+
+        args
+            The arguments of the task.
+        """
+        if self.__closed:
+            self.__run_task(task, args)
+        else:
+            self.__queue.put((task, args))
+
+    def flush(self):
+        """Blocks until every task added so far has been run."""
+        self.__queue.join()
+
+    def close(self):
+        """Flushes the pending tasks and stops the worker."""
+        if self.__closed:
+            return
+        self.__queue.put(None)
+        self.__worker.join()
+        self.__closed = True
+
+        # Run anything added while the worker was stopping.
+        while not self.__queue.empty():
+            item = self.__queue.get_nowait()
+            if item != None:
+                self.__run_task(*item)
+            self.__queue.task_done()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Private methods.                                                @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __run(self):
+        while True:
+            # Wait for a task, then take whatever else is already pending.
+            batch = [self.__queue.get()]
+            while len(batch) < self.__batch_size:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in batch:
+                if item == None:
+                    stop = True
+                else:
+                    self.__run_task(*item)
+                self.__queue.task_done()
+
+            if stop:
+                return
+
+    def __run_task(self, task, args):
+        try:
+            task(*args)
+        except Exception as e:
+            message = f"The following exception occurred in the event pipeline: {e}"
+            if self.__logger:
+                self.__logger.doErrorLogging(message)
+            else:
+                print(message)
@@ -34,6 +34,7 @@ class apptest_layout:
     test_summary_filename = 'rgt_summary.txt'
     job_status_filename = 'job_status.txt'
     job_id_filename = 'job_id.txt'
+    event_journal_filename = 'events.jsonl'
     app_logger_filename = 'application_logfile.txt'
     status_logger_filename = 'status_logfile.txt'
     """
@@ -6,7 +6,9 @@ import collections
 import concurrent.futures
 import datetime
 import getpass
+import itertools
 import os
+import threading
 import time
 
 # Harness package imports.
@@ -46,7 +48,8 @@ class Harness:
                  log_level,
                  stdout_stderr,
                  use_fireworks,
-                 separate_build_stdio):
+                 separate_build_stdio,
+                 max_concurrent_tests=0):
         self.__config = config
         self.__tests = rgt_input_file.get_tests()
         self.__tasks = rgt_input_file.get_harness_tasks()
@@ -56,7 +59,7 @@ class Harness:
         self.__log_level = log_level
         self.__myLogger = None
         self.__stdout_stderr = stdout_stderr
-        self.__num_workers = 1
+        self.__num_workers = self.__resolve_num_workers(config, max_concurrent_tests)
         self.__use_fireworks = use_fireworks
         self.__separate_build_stdio = separate_build_stdio
         self.__formAppTests()
@@ -81,6 +84,7 @@ class Harness:
         self.__launched_tests = 0
         self.__failed_tests = 0
         self.__failed_test_list = []
+        self.__launch_counter_lock = threading.Lock()
 
         # Define a logger that streams to file.
         logger_name=Harness.LOGGER_NAME
@@ -159,24 +163,24 @@ class Harness:
         timeout : float
             The maximum time to wait in minutes for the subtest cycle to complete.
         """
-        future_to_appname = {}
+        future_to_subtest = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.__num_workers) as executor:
-            for appname in self.__app_subtests.keys():
+            for subtest in self.__interleave_subtests():
                 future = executor.submit(apptest.wait_for_jobs_to_complete_in_queue,
                                          self.__config,
-                                         self.__app_subtests[appname],
+                                         [subtest],
                                          timeout)
 
-                future_to_appname[future] = appname
+                future_to_subtest[future] = subtest
 
-            for my_future in concurrent.futures.as_completed(future_to_appname):
-                appname = future_to_appname[my_future]
+            for my_future in concurrent.futures.as_completed(future_to_subtest):
+                test_name = self.__subtest_name(future_to_subtest[my_future])
                 my_future_exception = my_future.exception()
                 if my_future_exception:
-                    message = "Application {} future for queue exception:\n{}".format(appname, my_future_exception)
+                    message = "Test {} future for queue exception:\n{}".format(test_name, my_future_exception)
                     self.__myLogger.doCriticalLogging(message)
                 else:
-                    message = "Application {} future for queue is completed.".format(appname)
+                    message = "Test {} future for queue is completed.".format(test_name)
                     self.__myLogger.doInfoLogging(message)
         return
 
@@ -257,40 +261,99 @@ class Harness:
                 app_subtests[appname].append(subtest)
         return app_subtests
 
+    @staticmethod
+    def __resolve_num_workers(config, max_concurrent_tests):
+        """Returns the number of worker threads used to launch tests.
+
+        The command line value takes precedence. A value of 0 defers to
+        RGT_MAX_WORKERS, which is set from max_workers in the [TestshotDefaults]
+        section of the configuration file. The default is 1 (serial launch).
+        """
+        if max_concurrent_tests:
+            return int(max_concurrent_tests)
+
+        max_workers = os.getenv('RGT_MAX_WORKERS')
+        if not max_workers:
+            max_workers = config.get_testshot_config().get('max_workers')
+
+        if max_workers:
+            max_workers = str(max_workers).strip()
+            if max_workers.lower() == 'auto':
+                return os.cpu_count() or 1
+            if max_workers.isdigit() and int(max_workers) > 0:
+                return int(max_workers)
+            print(f"Ignoring invalid max_workers value '{max_workers}'. Launching tests serially.")
+        return 1
+
+    @staticmethod
+    def __subtest_name(subtest):
+        return f"{subtest.getNameOfApplication()}.{subtest.getNameOfSubtest()}"
+
+    def __interleave_subtests(self):
+        """Returns a flat list of subtests ordered round-robin across applications.
+
+        All subtests are submitted to a single thread pool, so an idle worker takes
+        the next pending test regardless of its application. The round-robin order
+        keeps one application with many tests from delaying the start of the others.
+        """
+        per_app_subtests = [tests for tests in self.__app_subtests.values()]
+        subtests = []
+        for group in itertools.zip_longest(*per_app_subtests):
+            subtests.extend([a_subtest for a_subtest in group if a_subtest is not None])
+        return subtests
+
+    def __record_launch_result(self, test_name, failed):
+        """Updates the launch summary counters."""
+        with self.__launch_counter_lock:
+            if failed:
+                self.__failed_tests += 1
+                self.__failed_test_list.append(test_name)
+            else:
+                self.__launched_tests += 1
+
     def __run_subtests_asynchronously(self):
-        future_to_appname = {}
+        future_to_subtest = {}
 
-        # Submit futures by means of thread pool.
+        # Tests of the same application share a repository checkout, so
+        # checkouts are serialized per application. Status display writes to
+        # a common file in the current directory and is serialized globally.
+        checkout_locks = {appname : threading.Lock() for appname in self.__app_subtests.keys()}
+        display_lock = threading.Lock()
+
+        subtests = self.__interleave_subtests()
+        message = "Launching {} tests with at most {} concurrent workers.".format(len(subtests), self.__num_workers)
+        self.__myLogger.doInfoLogging(message)
+
+        # Submit one future per test by means of thread pool.
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.__num_workers) as executor:
-            for appname in self.__app_subtests.keys():
-                future = executor.submit(apptest.do_application_tasks,
+            for subtest in subtests:
+                appname = subtest.getNameOfApplication()
+                future = executor.submit(apptest.do_subtest_tasks,
                                          self.__launch_id,
-                                         self.__app_subtests[appname],
+                                         subtest,
                                          self.__tasks,
                                          self.__stdout_stderr,
-                                         self.__separate_build_stdio)
-                future_to_appname[future] = appname
+                                         self.__separate_build_stdio,
+                                         test_checkout_lock=checkout_locks[appname],
+                                         test_display_lock=display_lock)
+                future_to_subtest[future] = subtest
 
             # Log when all job tasks are initiated.
-            for my_future in concurrent.futures.as_completed(future_to_appname):
-                appname = future_to_appname[my_future]
+            for my_future in concurrent.futures.as_completed(future_to_subtest):
+                test_name = self.__subtest_name(future_to_subtest[my_future])
 
                 # Check if an exception has been raised
                 my_future_exception = my_future.exception()
                 if my_future_exception:
-                    message = "Application {} future exception:\n{}".format(appname, my_future_exception)
+                    message = "Test {} future exception:\n{}".format(test_name, my_future_exception)
                     self.__myLogger.doCriticalLogging(message)
+                    self.__record_launch_result(test_name, failed=True)
                 else:
-                    message = "Application {} future is completed.".format(appname)
+                    message = "Test {} future is completed.".format(test_name)
                     self.__myLogger.doInfoLogging(message)
+                    self.__record_launch_result(test_name, failed=bool(my_future.result()))
 
-                subtest_result = my_future.result()
-                self.__launched_tests += subtest_result[0]
-                self.__failed_tests += subtest_result[1]
-                if self.__failed_tests:
-                    self.__failed_test_list.extend(subtest_result[2])
-
-            message = "All applications completed futures. Yahoo!!"
+            message = "All tests completed futures. Yahoo!!"
             self.__myLogger.doInfoLogging(message)
             # For the moment, hard-code this as a print statement.
             print(f"Launched {self.__launched_tests} tests, failed to launch {self.__failed_tests} tests.")
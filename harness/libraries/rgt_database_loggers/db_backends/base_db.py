@@ -1,9 +1,15 @@
 #! /usr/bin/env python3
 
 from abc import ABC, abstractmethod, ABCMeta
+import glob
 import os
 from datetime import datetime
 
+from libraries.rgt_database_loggers.write_batcher import get_write_batcher
+from libraries.rgt_database_loggers.write_retry import get_circuit_breaker, retry_write, TRANSIENT_FAILURE
+from libraries.rgt_database_loggers.write_spool import get_spool_dir, spool_records, reject_records
+from libraries.rgt_utilities import read_file_tail
+
 class BaseDBLogger(ABC):
 
     """
@@ -11,6 +17,12 @@ class BaseDBLogger(ABC):
     """
     __metaclass__ = ABCMeta
 
+    # Re-defines the StatusFile.NOVALUE
+    NO_VALUE = '[NO_VALUE]'
+
+    # The number of characters of an output file kept in output_txt (64 kb)
+    OUTPUT_TXT_MAX_CHARS = 65534
+
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     #                                                                 @
     # Special methods                                                 @
@@ -56,20 +68,42 @@ class BaseDBLogger(ABC):
     def name(self):
         return
 
+    # Where this backend writes to. Spooled records are replayed to the
+    # backend with the same name and destination. Must not contain secrets.
+    @property
+    def destination(self):
+        return self.url
+
+    # Identifies the destination this backend writes to. Backends with the
+    # same key share a write batch when batching is enabled.
+    @property
+    def batch_key(self):
+        return (self.name, self.destination)
+
+    # The exception types of the failures to reach the database that are worth
+    # retrying, such as connection errors and timeouts. Backends add the
+    # exception types of their client libraries.
+    @property
+    def transient_errors(self):
+        return (DatabaseTransientError,)
+
+    # The send_* methods return True if the data was written or, when batching
+    # is enabled (see write_batcher.py), buffered. The optional callback is
+    # called with True or False once the data has been written or failed.
     @abstractmethod
-    def send_event(self, event_dict : dict):
+    def send_event(self, event_dict : dict, callback=None):
         return
 
     @abstractmethod
-    def send_metrics(self, test_info_dict : dict, metrics_dict : dict):
+    def send_metrics(self, test_info_dict : dict, metrics_dict : dict, callback=None):
         return
 
     @abstractmethod
-    def send_node_health_results(self, test_info_dict : dict, node_health_dict : dict):
+    def send_node_health_results(self, test_info_dict : dict, node_health_dict : dict, callback=None):
         return
 
     @abstractmethod
-    def send_external_metrics(self, table : str, tags : dict, values : dict, log_time : str):
+    def send_external_metrics(self, table : str, tags : dict, values : dict, log_time : str, callback=None):
         return
 
     @abstractmethod
@@ -80,12 +114,225 @@ class BaseDBLogger(ABC):
     def query(self, query):
         return
 
+    # Yields the results of a query as they are received. Backends that can stream
+    # their query responses override this.
+    def iter_query(self, query):
+        yield from self.query(query)
+
+    def flush(self):
+        """
+        Writes the records buffered for this backend's destination.
+        Returns True if all of them were written.
+        """
+        batcher = get_write_batcher(self.batch_key, self._send_batch)
+        if batcher == None:
+            return True
+        return batcher.flush()
+
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     #                                                                 @
     # End of public methods.                                          @
     #                                                                 @
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Private methods.                                                @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    # Writes a list of records to the database in one request. Returns True on success,
+    # and False if the database rejected the records. Transient errors are raised, see
+    # transient_errors. The same records may be written more than once, by the retries
+    # and by the replays of the spool (see write_spool.py), so the writes must be
+    # idempotent: writing a record again must replace it rather than add a duplicate.
+    @abstractmethod
+    def _write_batch(self, records : list):
+        return
+
+    def _write_records(self, records : list, callback=None, logger=None):
+        """
+        Writes records to the database, or adds them to the write batch of
+        this backend's destination if batching is enabled. Records that fail
+        to be written because of a transient error are spooled if spooling is
+        enabled (see write_spool.py), and records that the database rejected are
+        saved to the rejected file of the spool directory.
+
+        Parameters
+        ----------
+            records : list
+                The records to write
+            callback : callable
+                (Optional) called with True or False once the records are written or failed
+            logger : rgt_logger
+                (Optional) the logger used to report failed batched writes
+
+        Returns
+        -------
+            True if the records were written or buffered
+            False otherwise
+        """
+        callback = self.__spooling_callback(get_spool_dir(), records, callback, logger)
+
+        batcher = get_write_batcher(self.batch_key, lambda batch: self._send_batch(batch, logger), logger)
+        if batcher != None:
+            batcher.add(records, callback)
+            return True
+
+        try:
+            success = self._send_batch(records, logger)
+        except Exception:
+            callback(False)
+            raise
+        callback(success)
+        return bool(success)
+
+    def _send_batch(self, records : list, logger=None):
+        """
+        Writes a list of records to the database in one request, through the circuit
+        breaker of this backend's destination (see write_retry.py). Transient errors
+        are retried with backoff, and reported by returning TRANSIENT_FAILURE once the
+        retries are exhausted or while the circuit is open.
+
+        Returns
+        -------
+            True if the records were written
+            TRANSIENT_FAILURE if they may be written later
+            False if the database rejected them
+        """
+        breaker = get_circuit_breaker(self.batch_key)
+        if breaker != None and not breaker.allow_request(self.__probe):
+            if logger:
+                logger.doDebugLogging(f"Not writing {len(records)} records to {self.name} at {self.destination}: the destination is unreachable.")
+            return TRANSIENT_FAILURE
+
+        try:
+            success = retry_write(lambda: self._write_batch(records), self.transient_errors, logger=logger,
+                                  description=f"Writing {len(records)} records to {self.name} at {self.destination}")
+        except self.transient_errors as e:
+            message = f"Failed to write {len(records)} records to {self.name} at {self.destination}: {e}"
+            if breaker != None and breaker.record_failure():
+                message += f" Writes to {self.destination} will fail fast until it is reachable again."
+            if logger:
+                logger.doErrorLogging(message)
+            else:
+                print(message)
+            return TRANSIENT_FAILURE
+
+        if breaker != None:
+            breaker.record_success()
+        return success
+
+    def _check_alive(self):
+        """
+        Checks that the database is alive when a backend is initialized, through the
+        circuit breaker of this backend's destination. While the circuit is open, the
+        check is skipped so that initializing backends does not wait for timeouts;
+        their writes fail fast until the destination is reachable again.
+
+        Returns
+        -------
+            None if the database is alive or the circuit is open
+            A message describing the problem otherwise
+        """
+        breaker = get_circuit_breaker(self.batch_key)
+        if breaker == None:
+            return self.is_alive()
+        if breaker.is_open:
+            return None
+        try:
+            alive_msg = self.is_alive()
+        except self.transient_errors as e:
+            breaker.record_failure()
+            return str(e)
+        breaker.record_success()
+        return alive_msg
+
+    def __probe(self):
+        """ Probes the destination of an open circuit. Returns True if it is reachable. """
+        return not self.is_alive()
+
+    def _get_output_txt(self, event_dict : dict, logger=None):
+        """
+        Returns the output_txt field of an event: the end of the output file of the
+        event, if the event has one, or event_dict['output_txt'] if it is provided.
+
+        Parameters
+        ----------
+            event_dict : dict
+                The event
+            logger : rgt_logger
+                (Optional) the logger used to report which file is read
+
+        Returns
+        -------
+            The output text, truncated to OUTPUT_TXT_MAX_CHARS
+        """
+        if 'output_txt' in event_dict.keys():
+            # if the update_databases wrapper calls this method, then it will provide an output_txt
+            return event_dict['output_txt']
+
+        if event_dict['event_name'] == "build_end":
+            file_names = [os.path.join(event_dict['build_directory'], "output_build.txt")]
+            output = "Output file not found in " + file_names[0]
+        elif event_dict['event_name'] == "submit_end":
+            file_names = [os.path.join(event_dict['run_archive'], "submit.err")]
+            output = "Output file not found in " + file_names[0]
+        elif event_dict['event_name'] == "binary_execute_end":
+            file_names = glob.glob(event_dict['run_archive'] + "/*.o" + event_dict['job_id'])
+            output = "Job output file not found"
+        elif event_dict['event_name'] == "check_end":
+            file_names = [os.path.join(event_dict['run_archive'], "output_check.txt")]
+            output = "Output file not found in " + file_names[0]
+        else:
+            # Even if event is not one with an output file, still log the output_txt field
+            return self.NO_VALUE
+
+        for file_name in file_names:
+            if logger:
+                logger.doDebugLogging(f"Using {file_name} for {event_dict['event_name']} output for {self.name}")
+            if os.path.exists(file_name):
+                output = self._read_output_txt(file_name)
+        return output
+
+    def _read_output_txt(self, file_name : str):
+        """
+        Returns the end of an output file for the output_txt field, truncated to
+        OUTPUT_TXT_MAX_CHARS. Only the end of the file is read.
+        """
+        return read_file_tail(file_name, self.OUTPUT_TXT_MAX_CHARS)
+
+    def __spooling_callback(self, spool_dir, records, callback, logger):
+        """
+        Returns a write callback that spools the records if they failed transiently, or
+        saves them to the rejected file if the database rejected them, then calls callback
+        with True or False. Nothing is saved if spool_dir is None.
+        """
+        def spooling_callback(success):
+            if success is TRANSIENT_FAILURE and spool_dir != None:
+                try:
+                    spool_records(spool_dir, self.name, self.destination, records)
+                    message = f"Spooled {len(records)} {self.name} records to {spool_dir} for replay."
+                    if logger:
+                        logger.doInfoLogging(message)
+                except OSError as e:
+                    self.__log_error(f"Failed to spool {len(records)} {self.name} records to {spool_dir}: {e}", logger)
+            elif not success and spool_dir != None:
+                try:
+                    path = reject_records(spool_dir, self.name, self.destination, records)
+                    self.__log_error(f"{self.name} at {self.destination} rejected {len(records)} records. They were saved to {path}.", logger)
+                except OSError as e:
+                    self.__log_error(f"Failed to save {len(records)} {self.name} records rejected by {self.destination} to {spool_dir}: {e}", logger)
+            if callback != None:
+                callback(bool(success))
+        return spooling_callback
+
+    def __log_error(self, message, logger):
+        if logger:
+            logger.doErrorLogging(message)
+        else:
+            print(message)
+
 # Raised when there is an initialization error
 class DatabaseInitError(Exception):
     """ An exception to indicate a database initialization failure """
@@ -100,6 +347,13 @@ class DatabaseDataError(Exception):
         super().__init__(message)
         return
 
+# Raised when the database cannot be reached, or is temporarily unable to accept data
+class DatabaseTransientError(Exception):
+    """ An exception to indicate a database failure that may succeed if retried """
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        return
+
 # Raised when there is an environment variable-related error
 class DatabaseEnvironmentError(Exception):
     """ An exception to indicate a problem with the RGT_ environment variables """
@@ -0,0 +1,133 @@
+#! /usr/bin/env python3
+"""
+This module implements the serialization of records to InfluxDB line protocol.
+
+A record is a single line of the form::
+
+    measurement,tag_key=tag_value,... field_key=field_value,... timestamp
+
+Measurements, tag keys, tag values and field keys are escaped as the line
+protocol requires, and string field values are quoted and escaped. Numeric
+and other field values are written as given, so that the types of the fields
+already stored in a database do not change.
+"""
+
+import datetime
+import functools
+import re
+
+from libraries.rgt_database_loggers.db_backends.base_db import DatabaseDataError
+
+# Escapes commas and spaces in measurements. Backslashes are escaped so that one
+# at the end of a measurement does not escape the separator that follows it, and
+# line breaks, which would end the record, and tabs are written as \n, \r and \t.
+_MEASUREMENT_ESCAPES = str.maketrans({',': '\\,', ' ': '\\ ', '\\': '\\\\',
+                                      '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+# Escapes commas, equals signs and spaces in tag keys, tag values and field keys,
+# and backslashes and line breaks as in measurements
+_KEY_ESCAPES = str.maketrans({',': '\\,', '=': '\\=', ' ': '\\ ', '\\': '\\\\',
+                              '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+# Escapes double quotes and backslashes in string field values. Line breaks are
+# allowed within the quotes and are kept.
+_STRING_FIELD_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"'})
+
+# The event time formats accepted by timestamp(): YYYY-MM-DDTHH:MM:SS, with optional
+# microseconds (.UUUUUU) and an optional 'Z'. The time is always taken as local time.
+_EVENT_TIME_REGEX = re.compile(r'^[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}(\.[0-9]{6})?Z?$')
+
+# The number of timestamp units per second of each supported precision
+_UNITS_PER_SECOND = {'s': 1, 'ms': 1000, 'us': 1000000, 'ns': 1000000000}
+
+def escape_measurement(measurement):
+    """Returns the measurement escaped for line protocol."""
+    return str(measurement).translate(_MEASUREMENT_ESCAPES)
+
+def escape_key(key):
+    """Returns a tag key, tag value or field key escaped for line protocol."""
+    return str(key).translate(_KEY_ESCAPES)
+
+def string_field(value):
+    """Returns value as a quoted and escaped string field value."""
+    return '"' + str(value).translate(_STRING_FIELD_ESCAPES) + '"'
+
+def field_value(value):
+    """Returns a field value in line protocol.
+
+    Booleans and numbers are converted. Strings are taken to be formatted
+    field values already, e.g. '1.5' or '"text"', and are returned as is.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+@functools.lru_cache(maxsize=4096)
+def timestamp(event_time, precision='ns'):
+    """Converts a harness event time to a line protocol timestamp.
+
+    The records of an event, or of a node health check, share one event
+    time, so conversions are cached.
+
+    Parameters
+    ----------
+    event_time : str
+        The local time, as YYYY-MM-DDTHH:MM:SS[.UUUUUU][Z].
+
+    precision : str
+        The precision of the timestamp: 's', 'ms', 'us' or 'ns'. Anything
+        else is taken as 'ns'.
+
+    Returns
+    -------
+    int
+        The time since the epoch in units of precision.
+    """
+    if not _EVENT_TIME_REGEX.match(event_time):
+        raise DatabaseDataError(f"Unrecognized time format in string {event_time}.")
+
+    log_time = datetime.datetime.fromisoformat(event_time.rstrip('Z'))
+    microseconds = int(log_time.replace(microsecond=0).timestamp()) * 1000000 + log_time.microsecond
+
+    units_per_second = _UNITS_PER_SECOND.get(precision, _UNITS_PER_SECOND['ns'])
+    if units_per_second >= 1000000:
+        return microseconds * (units_per_second // 1000000)
+    return microseconds // (1000000 // units_per_second)
+
+def format_line(measurement, tags, fields, time_stamp):
+    """Returns one record in line protocol.
+
+    Parameters
+    ----------
+    measurement : str
+        The measurement (table) name.
+
+    tags : dict
+        The tag values by tag key, in order. Tags with empty values are
+        left out, since line protocol does not allow them.
+
+    fields : dict
+        The formatted field values by field key, in order, see string_field
+        and field_value.
+
+    time_stamp : int
+        The timestamp, see timestamp.
+
+    Returns
+    -------
+    str
+    """
+    parts = [escape_measurement(measurement)]
+    for (key, value) in tags.items():
+        value = str(value)
+        if value != '':
+            parts.extend((',', escape_key(key), '=', escape_key(value)))
+    parts.append(' ')
+    parts.append(','.join([escape_key(key) + '=' + value for (key, value) in fields.items()]))
+    parts.append(' ')
+    parts.append(str(time_stamp))
+    return ''.join(parts)
+
+def format_batch(lines):
+    """Returns records in line protocol as the body of one write request."""
+    return '\n'.join(lines)
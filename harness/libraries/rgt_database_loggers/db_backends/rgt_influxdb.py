@@ -1,15 +1,18 @@
 #! /usr/bin/env python3
 
 import csv
-from datetime import datetime
-import glob
+import io
 import json
 import os
-import re
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 from urllib.parse import urlparse
+import urllib3
+import zlib
 
 from libraries.rgt_database_loggers.db_backends.base_db import *
+from libraries.rgt_database_loggers.db_backends import line_protocol
 
 class InfluxDBLogger(BaseDBLogger):
 
@@ -24,11 +27,30 @@ class InfluxDBLogger(BaseDBLogger):
         'org': 'RGT_INFLUXDB_ORG',
         'precision': 'RGT_INFLUXDB_PRECISION',
         'dryrun': 'RGT_INFLUXDB_DRY_RUN',
-        'disable': 'RGT_INFLUXDB_DISABLE'
+        'disable': 'RGT_INFLUXDB_DISABLE',
+        'pool_size': 'RGT_INFLUXDB_POOL_SIZE',
+        'connect_timeout': 'RGT_INFLUXDB_CONNECT_TIMEOUT',
+        'read_timeout': 'RGT_INFLUXDB_READ_TIMEOUT',
+        'compression': 'RGT_INFLUXDB_COMPRESSION'
     }
 
-    # Re-defines the StatusFile.NOVALUE
-    NO_VALUE = '[NO_VALUE]'
+    # Defaults of the HTTP connection settings
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_READ_TIMEOUT = 60.0
+
+    # Supported Content-Encodings of the write payloads
+    PERMITTED_COMPRESSIONS = ['none', 'gzip']
+    # Smaller payloads are sent uncompressed, since compressing them saves little
+    COMPRESSION_MIN_BYTES = 1024
+    # Number of characters of a payload encoded and compressed at a time
+    COMPRESSION_CHUNK_SIZE = 65536
+
+    # The HTTP sessions shared by all InfluxDBLogger objects of this process, by server URL.
+    # A new InfluxDBLogger is made for every status file, so the sessions are kept here
+    # so that connections are reused across them.
+    _sessions = {}
+    _sessions_lock = threading.Lock()
 
     #---Influx key identifiers.
     INFLUX_TAGS = [
@@ -87,11 +109,17 @@ class InfluxDBLogger(BaseDBLogger):
         self.org = None
         # Default of nanosecond precision
         self.precision = 'ns'
+        self.compression = 'none'
         self.dryrun = False
 
         self._validate_uri()
 
-        alive_msg = self.is_alive()
+        self.pool_size = self._get_envvar_number('pool_size', int, self.DEFAULT_POOL_SIZE)
+        self.timeout = (self._get_envvar_number('connect_timeout', float, self.DEFAULT_CONNECT_TIMEOUT),
+                        self._get_envvar_number('read_timeout', float, self.DEFAULT_READ_TIMEOUT))
+        self.__session = self._get_session(self.url, self.pool_size)
+
+        alive_msg = self._check_alive()
         if alive_msg:
             message = f'An InfluxDB server at {self.url} is not alive: {alive_msg}'
             raise DatabaseInitError(message)
@@ -125,25 +153,34 @@ class InfluxDBLogger(BaseDBLogger):
     def name(self):
         return 'influxdb'
 
-    def send_event(self, event_dict : dict):
+    @property
+    def destination(self):
+        return self._get_write_url()
+
+    @property
+    def batch_key(self):
+        return (self.name, self.destination, self.token)
+
+    @property
+    def transient_errors(self):
+        return (DatabaseTransientError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def send_event(self, event_dict : dict, callback=None):
         """
             Posts the event to InfluxDB.
         """
         self.__logger.doDebugLogging(f"Posting event {event_dict['event_name']} for test id: {event_dict['test_id']} to Influx")
 
-        # Initialize the tags for record string
-        influx_event_record_string = 'events'
-
         # Check that required tags exist
+        tags = {}
         for tag_name in self.INFLUX_TAGS:
             if not tag_name in event_dict.keys():
                 message = "Could not find required InfluxDB tag in event dictionary: {tag_name}"
                 raise DatabaseDataError(message)
-            influx_event_record_string += f',{tag_name}={event_dict[tag_name]}'
+            tags[tag_name] = event_dict[tag_name]
 
-        # Add fields to influx record string
-        # First field separated by space, every other field by commas
-        sep=' '
+        # Add fields to influx record
+        fields = {}
         for field_name in self.INFLUX_EVENT_FIELDS:
             if field_name == 'output_txt':
                 # don't add output_txt yet
@@ -153,98 +190,39 @@ class InfluxDBLogger(BaseDBLogger):
                 if not field_name == 'comment':
                     self.__logger.doWarningLogging(f"Couldn't find InfluxDB field: {field_name}. Setting to NOVALUE")
                 event_dict[field_name] = self.NO_VALUE
-            influx_event_record_string += f'{sep}{field_name}="{event_dict[field_name]}"'
-            sep = ','
-
-        if not 'output_txt' in event_dict.keys():
-            # Add handling for pasting outputs to influxdb
-            if event_dict['event_name'] == "build_end":
-                file_name = os.path.join(event_dict['build_directory'], "output_build.txt")
-                self.__logger.doDebugLogging(f"Using {file_name} for build output for Influx")
-                if os.path.exists(file_name):
-                    with open(file_name, "r") as f:
-                        output = f.read()
-                        # Truncate to 64 kb
-                        output = output[-65534:].replace('"', '\\"')
-                        influx_event_record_string += ",output_txt=\"" + output + "\""
-                else:
-                    influx_event_record_string += ",output_txt=\"Output file not found in " + file_name  + "\""
-            elif event_dict['event_name'] == "submit_end":
-                file_name = os.path.join(event_dict['run_archive'], "submit.err")
-                self.__logger.doDebugLogging(f"Using {file_name} for submit errors for Influx")
-                if os.path.exists(file_name):
-                    with open(file_name, "r") as f:
-                        output = f.read()
-                        # Truncate to 64 kb
-                        output = output[-65534:].replace('"', '\\"')
-                        influx_event_record_string += ",output_txt=\"" + output + "\""
-                else:
-                    influx_event_record_string += ",output_txt=\"Output file not found in " + file_name + "\""
-            elif event_dict['event_name'] == "binary_execute_end":
-                found_job_file = False
-                for file_name in glob.glob(event_dict['run_archive'] + "/*.o" + event_dict['job_id']):
-                    self.__logger.doDebugLogging(f"Using {file_name} for job output for Influx")
-                    if os.path.exists(file_name):
-                        found_job_file = True
-                        with open(file_name, "r") as f:
-                            output = f.read()
-                            # Truncate to 64 kb
-                            output = output[-65534:].replace('"', '\\"')
-                            influx_event_record_string += ",output_txt=\"" + output + "\""
-                if not found_job_file:
-                    influx_event_record_string += ",output_txt=\"Job output file not found" + "\""
-            elif event_dict['event_name'] == "check_end":
-                file_name = os.path.join(event_dict['run_archive'], "output_check.txt")
-                self.__logger.doDebugLogging(f"Using {file_name} for check output for Influx")
-                if os.path.exists(file_name):
-                    with open(file_name, "r") as f:
-                        output = f.read()
-                        # Truncate to 64 kb
-                        output = output[-65534:].replace('"', '\\"')
-                        influx_event_record_string += ",output_txt=\"" + output + "\""
-                else:
-                    # if the update_databases wrapper calls this method, then it will provide an output_txt
-                    influx_event_record_string += ",output_txt=\"Output file not found in " + file_name + "\""
-            else:
-                # Even if event is not one with an output file, still log the output_txt metric
-                influx_event_record_string += ",output_txt=\"" + self.NO_VALUE  + "\""
-        else:
-            influx_event_record_string += ",output_txt=\"" + event_dict['output_txt'] + "\""
-                
+            fields[field_name] = line_protocol.string_field(event_dict[field_name])
 
-        influx_event_record_string += f" {str(self._event_time_to_timestamp(event_dict['event_time']))}"
+        output = self._get_output_txt(event_dict, logger=self.__logger)
+        fields['output_txt'] = line_protocol.string_field(output)
 
-        headers = {'Authorization': f'Token {self.token}', 'Content-Type': "text/plain; charset=utf-8", 'Accept': "application/json"}
+        influx_event_record_string = line_protocol.format_line('events', tags, fields,
+                                                               self._event_time_to_timestamp(event_dict['event_time']))
 
         # Send message to InfluxDB & return the result True/False
-        return self._send_message(self._get_write_url(), influx_event_record_string, headers)
+        return self._write_records([influx_event_record_string], callback=callback, logger=self.__logger)
 
-    def send_metrics(self, test_info_dict : dict, metrics_dict : dict):
+    def send_metrics(self, test_info_dict : dict, metrics_dict : dict, callback=None):
         """
             Posts metrics to InfluxDB.
         """
         self.__logger.doDebugLogging(f"Posting metrics from test id: {test_info_dict['test_id']} to InfluxDB")
 
-        # Initialize the tags for record string
-        influx_event_record_string = 'metrics'
-
         # Check that required tags exist
+        tags = {}
         for tag_name in self.INFLUX_TAGS:
             if not tag_name in test_info_dict.keys():
                 message = "Could not find required InfluxDB tag in metrics dictionary: {tag_name}"
                 raise DatabaseDataError(message)
-            influx_event_record_string += f',{tag_name}={test_info_dict[tag_name]}'
-
-        influx_event_record_string += ' '
-        influx_event_record_string += ','.join([f"{k}={v}" for k, v in metrics_dict.items()])
-        influx_event_record_string += f" {str(self._event_time_to_timestamp(test_info_dict['event_time']))}"
+            tags[tag_name] = test_info_dict[tag_name]
 
-        headers = {'Authorization': f'Token {self.token}', 'Content-Type': "text/plain; charset=utf-8", 'Accept': "application/json"}
+        fields = {k: line_protocol.field_value(v) for k, v in metrics_dict.items()}
+        influx_event_record_string = line_protocol.format_line('metrics', tags, fields,
+                                                               self._event_time_to_timestamp(test_info_dict['event_time']))
 
         # Send message to InfluxDB & return the result True/False
-        return self._send_message(self._get_write_url(), influx_event_record_string, headers)
+        return self._write_records([influx_event_record_string], callback=callback, logger=self.__logger)
 
-    def send_node_health_results(self, test_info_dict : dict, node_health_dict : dict):
+    def send_node_health_results(self, test_info_dict : dict, node_health_dict : dict, callback=None):
         """
         Send node health data to InfluxDB
         """
@@ -261,7 +239,8 @@ class InfluxDBLogger(BaseDBLogger):
                 raise DatabaseDataError(f"Test info provided to node health logging missing tag: {t}")
 
         influxdb_tags = ['test', 'machine']
-        static_tag_line = ','.join([f'{k}={test_info_dict[k]}' for k in influxdb_tags])
+        static_tags = {k: test_info_dict[k] for k in influxdb_tags}
+        time_stamp = self._event_time_to_timestamp(test_info_dict['event_time'])
 
         # find and read node location file -- json file
         use_node_location_file = True
@@ -291,41 +270,28 @@ class InfluxDBLogger(BaseDBLogger):
         post_lines = []
         # for each node found in the nodecheck.txt
         for node_name in node_health_dict.keys():
-            influx_event_record_string = f'node_health,{static_tag_line},node={node_name}'
+            tags = dict(static_tags, node=node_name)
             if node_name in node_locations.keys():
                 # then it's a node location identifier
-                for k in node_locations[node_name].keys():
-                    influx_event_record_string += f',{k}={node_locations[node_name][k]}'
-            node_data_string = ','.join([f'{k}="{v}"' for k,v in node_health_dict[node_name].items()])
-            influx_event_record_string += f' test_id="{test_info_dict["test_id"]}",{node_data_string}'
-            influx_event_record_string += f" {str(self._event_time_to_timestamp(test_info_dict['event_time']))}"
-            post_lines.append(influx_event_record_string)
+                tags.update(node_locations[node_name])
+            fields = {'test_id': line_protocol.string_field(test_info_dict["test_id"])}
+            fields.update({k: line_protocol.string_field(v) for k,v in node_health_dict[node_name].items()})
+            post_lines.append(line_protocol.format_line('node_health', tags, fields, time_stamp))
 
-        headers = {'Authorization': f'Token {self.token}', 'Content-Type': "text/plain; charset=utf-8", 'Accept': "application/json"}
         # Send message to InfluxDB & return the True/False result
-        return self._send_message(self._get_write_url(), '\n'.join(post_lines), headers)
+        return self._write_records(post_lines, callback=callback, logger=self.__logger)
 
-    def send_external_metrics(self, table : str, tags : dict, values : dict, log_time : str):
+    def send_external_metrics(self, table : str, tags : dict, values : dict, log_time : str, callback=None):
         """
             Posts external metrics to InfluxDB.
         """
         self.__logger.doDebugLogging(f"Posting external metrics to InfluxDB")
 
-        # Initialize the tags for record string
-        influx_event_record_string = table
-
-        # Check that required tags exist
-        for tag_name in tags.keys():
-            influx_event_record_string += f',{tag_name}={tags[tag_name]}'
-
-        influx_event_record_string += ' '
-        influx_event_record_string += ','.join([f"{k}={v}" for k, v in values.items()])
-        influx_event_record_string += f" {str(self._event_time_to_timestamp(log_time))}"
-
-        headers = {'Authorization': f'Token {self.token}', 'Content-Type': "text/plain; charset=utf-8", 'Accept': "application/json"}
+        fields = {k: line_protocol.field_value(v) for k, v in values.items()}
+        influx_event_record_string = line_protocol.format_line(table, tags, fields, self._event_time_to_timestamp(log_time))
 
         # Send message to InfluxDB & return the result True/False
-        return self._send_message(self._get_write_url(), influx_event_record_string, headers)
+        return self._write_records([influx_event_record_string], callback=callback, logger=self.__logger)
 
     def is_alive(self):
         """
@@ -338,7 +304,7 @@ class InfluxDBLogger(BaseDBLogger):
         }
 
         self.__logger.doDebugLogging(f'Using the following endpoint for InfluxDB health check and bucket verification: {self.url}/api/v2/buckets')
-        r = requests.get(f'{self.url}/api/v2/buckets', headers=headers)
+        r = self.__session.get(f'{self.url}/api/v2/buckets', headers=headers, timeout=self.timeout)
         if int(r.status_code) >= 400:
             return f"status_code = {r.status_code}, text = {r.text}, reason = {r.reason}"
         json_success = False
@@ -363,7 +329,7 @@ class InfluxDBLogger(BaseDBLogger):
 
     def query(self, query):
         """
-        Query the /api/v2/read endpoint of the InfluxDB server to check for the specified bucket.
+        Query the /api/v2/query endpoint of the InfluxDB server.
 
         Parameters:
             query: a Flux-formatted query string
@@ -371,38 +337,43 @@ class InfluxDBLogger(BaseDBLogger):
         Returns:
             a list of dictionary objects
         """
+        return list(self.iter_query(query))
+
+    def iter_query(self, query):
+        """
+        Query the /api/v2/query endpoint of the InfluxDB server, yielding the records as the
+        response is downloaded, so that callers can filter them without holding them all.
+
+        Parameters:
+            query: a Flux-formatted query string
+
+        Returns:
+            an iterator of dictionary objects, one per record of every table in the response
+        """
         headers = {
             'Authorization': f'Token {self.token}',
             'Content-Type': "application/vnd.flux",
-            'Accept': "application/json"
+            'Accept': "application/csv"
         }
 
         self.__logger.doDebugLogging(f'Sending query: {query} to: {self.url}/api/v2/query')
-        r = requests.post(f'{self.url}/api/v2/query?org={self.org}', data=query, headers=headers)
-        if int(r.status_code) >= 400:
-            self.__logger.doErrorLogging(f"InfluxDB request failed. status_code = {r.status_code}, text = {r.text}, reason = {r.reason}")
-            return []
-        rdc = r.content.decode('utf-8')
-        resp = list(csv.reader(rdc.splitlines(), delimiter=','))
-        # each entry in series is a record
-        col_names = resp[0]
-        # Transforming into list of dictionaries
-        ret_data = []
-        for entry_index in range(1, len(resp)):
-            data_tmp = {}
-            if len(resp[entry_index]) == 0:
-                # Empty row, usually just a spacing formality
-                continue
-            if len(resp[entry_index]) < len(col_names):
-                self.__logger.doErrorLogging(f"Not enough columns in row. Skipping row: {resp[entry_index]}.")
-                continue
-            # First column is useless
-            for c_index in range(1, len(col_names)):
-                # Ignore result, table & _time
-                if not col_names[c_index] in ["result", "table", "_time"]:
-                    data_tmp[col_names[c_index]] = resp[entry_index][c_index]
-            ret_data.append(data_tmp)
-        return ret_data
+        with self.__session.post(f'{self.url}/api/v2/query?org={self.org}', data=query, headers=headers,
+                                 timeout=self.timeout, stream=True) as r:
+            if int(r.status_code) >= 400:
+                self.__logger.doErrorLogging(f"InfluxDB request failed. status_code = {r.status_code}, text = {r.text}, reason = {r.reason}")
+                return
+            # Decode any Content-Encoding of the response as it is read, and keep the response
+            # open at the end of its body until it is closed below: a closed file cannot be read
+            # to the end by the TextIOWrapper
+            r.raw.decode_content = True
+            r.raw.auto_close = False
+            try:
+                yield from self._parse_flux_csv(csv.reader(io.TextIOWrapper(r.raw, encoding='utf-8', newline='')))
+            except urllib3.exceptions.ProtocolError as e:
+                # The response ended early. The records of the rows received in full have been
+                # yielded. Raised as requests does when it reads the whole response.
+                raise requests.exceptions.ChunkedEncodingError(e)
+
 
 
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
@@ -417,6 +388,92 @@ class InfluxDBLogger(BaseDBLogger):
     #                                                                 @
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
+    def _parse_flux_csv(self, rows):
+        """
+        Yields the records of the tables of a Flux CSV response, with or without annotations.
+
+        Tables are separated by an empty row, and each starts with optional annotation rows
+        (#datatype, #group, #default) and a header row. The first column of every row is the
+        annotation column. Empty values are replaced by the #default annotation, if any.
+        The result, table and _time columns are left out of the records.
+        """
+        col_names = None
+        defaults = None
+        for row in rows:
+            if len(row) == 0 or (len(row) == 1 and row[0] == ''):
+                # End of a table; the next table has its own annotations and header
+                col_names = None
+                defaults = None
+                continue
+            if row[0].startswith('#'):
+                if row[0] == '#default':
+                    defaults = row
+                col_names = None
+                continue
+            if col_names == None:
+                col_names = row
+                if col_names[1:3] == ['error', 'reference']:
+                    # Flux reports errors that occur during the query as a table
+                    error_row = next(rows, [])
+                    self.__logger.doErrorLogging(f"InfluxDB query failed: {','.join(error_row[1:])}")
+                    return
+                continue
+            if len(row) < len(col_names):
+                self.__logger.doErrorLogging(f"Not enough columns in row. Skipping row: {row}.")
+                continue
+            record = {}
+            # First column is the annotation column
+            for c_index in range(1, len(col_names)):
+                # Ignore result, table & _time
+                if not col_names[c_index] in ["result", "table", "_time"]:
+                    value = row[c_index]
+                    if value == '' and defaults != None and c_index < len(defaults):
+                        value = defaults[c_index]
+                    record[col_names[c_index]] = value
+            yield record
+
+    @classmethod
+    def _get_session(cls, url : str, pool_size : int):
+        """
+        Returns the HTTP session to the InfluxDB server at url, creating it if needed.
+
+        The session keeps up to pool_size connections alive. Threads that find no free
+        connection open a short-lived one rather than wait: urllib3 empties its pools when
+        the interpreter exits, before the data buffered for the databases is flushed, and a
+        blocking pool would then wait forever. It is shared by all threads: requests only
+        pass per-request headers and never change the state of the session.
+        """
+        with cls._sessions_lock:
+            if not url in cls._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                cls._sessions[url] = session
+            return cls._sessions[url]
+
+    def _get_envvar_number(self, key : str, number_type, default):
+        """
+        Returns the number set by the environment variable of kw[key], or default if unset or invalid.
+        """
+        if not self.kw[key] in os.environ:
+            return default
+        try:
+            value = number_type(os.environ[self.kw[key]])
+        except ValueError:
+            value = 0
+        if value <= 0:
+            self.__logger.doWarningLogging(f'Ignoring invalid {self.kw[key]}={os.environ[self.kw[key]]}. Using {default}.')
+            return default
+        return value
+
+    def _write_batch(self, records : list):
+        """
+        Sends records to the Write API endpoint in one request
+        """
+        headers = {'Authorization': f'Token {self.token}', 'Content-Type': "text/plain; charset=utf-8", 'Accept': "application/json"}
+        return self._send_message(self._get_write_url(), line_protocol.format_batch(records), headers)
+
     def _get_write_url(self):
         """
         Construct the URL for the Write API endpoint
@@ -445,6 +502,8 @@ class InfluxDBLogger(BaseDBLogger):
                 self.org = arg_split[1]
             elif arg_split[0] == 'precision':
                 self.precision = arg_split[1]
+            elif arg_split[0] == 'compression':
+                self.compression = arg_split[1]
             else:
                 message = f'Unrecognized URL-encoded keyword argument: {arg_split[0]}'
                 raise DatabaseInitError(message)
@@ -458,6 +517,8 @@ class InfluxDBLogger(BaseDBLogger):
             self.org = os.environ[self.kw['org']]
         if self.kw['precision'] in os.environ:
             self.precision = os.environ[self.kw['precision']]
+        if self.kw['compression'] in os.environ:
+            self.compression = os.environ[self.kw['compression']]
         if self.kw['dryrun'] in os.environ and os.environ[self.kw['dryrun']] == '1':
             self.dryrun = True
 
@@ -466,51 +527,61 @@ class InfluxDBLogger(BaseDBLogger):
             message += f' The InfluxDB URI was {self.full_uri}.'
             raise DatabaseInitError(message)
 
+        if not self.compression in self.PERMITTED_COMPRESSIONS:
+            message = f'Unsupported InfluxDB compression: {self.compression}.'
+            message += f' Supported compressions are: {", ".join(self.PERMITTED_COMPRESSIONS)}.'
+            raise DatabaseInitError(message)
+
     def _send_message(self, full_url : str, message : str, headers : dict):
         """
         Sends the message to InfluxDB with the associated headers
+        The message is gzip-compressed if compression is enabled and the message is large enough
         """
 
+        data = message
+        if self.compression == 'gzip' and len(message) >= self.COMPRESSION_MIN_BYTES:
+            data = self._gzip_message(message)
+            headers = dict(headers, **{'Content-Encoding': 'gzip'})
+            message_size = f' ({len(data)} bytes gzip-compressed)'
+        else:
+            message_size = ''
+
         if self.dryrun:
-            self.__logger.doInfoLogging(f'InfluxDB dry-run is set via the {self.kw["dryrun"]} environment variable. Message: {message}')
+            self.__logger.doInfoLogging(f'InfluxDB dry-run is set via the {self.kw["dryrun"]} environment variable. Message{message_size}: {message}')
             return True
         elif self.kw['dryrun'] in os.environ and os.environ[self.kw['dryrun']] == '1':
             # A Harness utility may set the environment variable after DB init time
             self.dryrun = True
-            self.__logger.doInfoLogging(f'InfluxDB dry-run is set via the {self.kw["dryrun"]} environment variable. Message: {message}')
+            self.__logger.doInfoLogging(f'InfluxDB dry-run is set via the {self.kw["dryrun"]} environment variable. Message{message_size}: {message}')
             return True
 
-        self.__logger.doDebugLogging(f"Sending message to InfluxDB: {message}")
-        # We do not catch the exception here -- it will be caught in the database manager class
-        r = requests.post(full_url, data=message, headers=headers)
+        self.__logger.doDebugLogging(f"Sending message to InfluxDB{message_size}: {message}")
+        # We do not catch the exception here -- connection errors and timeouts are retried in
+        # BaseDBLogger._send_batch, and other exceptions are caught in the database manager class
+        r = self.__session.post(full_url, data=data, headers=headers, timeout=self.timeout)
 
         if r.status_code == 200 or r.status_code == 204:
             self.__logger.doDebugLogging(f"Logged to InfluxDB successfully ({r.status_code}, {r.reason}): {message}")
             return True
+        elif r.status_code == 429 or r.status_code >= 500:
+            # The server is overloaded or unavailable, so the write may be retried
+            raise DatabaseTransientError(f"InfluxDB responded {r.status_code} - {r.reason}")
         else:
             self.__logger.doErrorLogging(f"Failed to post to InfluxDB. Message: {message}, Response: {r.status_code} - {r.reason}")
             return False
 
-    def _event_time_to_timestamp(self, event_time : str):
-        """ Converts a time string to Unix timestamp in EST """
-
-        # Check for different time formats
-        if re.search("^[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}\.[0-9]{6}$", event_time):
-            # YYYY-MM-DDTHH:MM:SS.UUUUUU -- this is the default harness output
-            log_time = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%S.%f")
-        elif re.search("^[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}\.[0-9]{6}Z$", event_time):
-            # YYYY-MM-DDTHH:MM:SS.UUUUUUZ
-            log_time = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%S.%fZ")
-        elif re.search("^[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}$", event_time):
-            # YYYY-MM-DDTHH:MM:SS
-            log_time = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%S")
-        elif re.search("^[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}Z$", event_time):
-            # YYYY-MM-DDTHH:MM:SSZ
-            log_time = datetime.strptime(event_time, "%Y-%m-%dT%H:%M:%S")
-        else:
-            raise DatabaseDataError(f"Unrecognized time format in string {event_time}.")
+    def _gzip_message(self, message : str):
+        """
+        Returns the message encoded as UTF-8 and gzip-compressed.
+        The message is encoded and compressed in chunks, so that batches of records are never
+        held in memory as a complete uncompressed byte string as well.
+        """
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        chunks = [compressor.compress(message[i:i + self.COMPRESSION_CHUNK_SIZE].encode('utf-8'))
+                  for i in range(0, len(message), self.COMPRESSION_CHUNK_SIZE)]
+        chunks.append(compressor.flush())
+        return b''.join(chunks)
 
-        if self.precision == "ms":
-            return round(datetime.timestamp(log_time) * 1000 * 1000)
-        else:
-            return round(datetime.timestamp(log_time) * 1000 * 1000) * 1000
+    def _event_time_to_timestamp(self, event_time : str):
+        """ Converts a local time string to a Unix timestamp in the precision of this logger """
+        return line_protocol.timestamp(event_time, self.precision)
@@ -0,0 +1,499 @@
+#! /usr/bin/env python3
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from libraries.rgt_database_loggers.db_backends.base_db import *
+from libraries.rgt_database_loggers.db_backends import line_protocol
+
+class SQLiteDBLogger(BaseDBLogger):
+
+    """
+    The logging class for SQLite databases
+
+    Each database is a local file, so this backend needs no server. It can be
+    used as a local store of the harness events, or in place of a database
+    server for testing and benchmarking. The file is opened in WAL mode, so
+    that it can be read while tests are logging to it, and several processes
+    of the same host can log to it at once.
+
+    WAL mode needs memory shared by the processes using the database, so the
+    file must be on a local file system, not on Lustre, GPFS or NFS. Where WAL
+    mode cannot be enabled, the database falls back to a rollback journal, in
+    which readers and writers wait for each other. Processes on different
+    hosts must not log to the same database.
+    """
+
+    kw = {
+        'uri': 'RGT_SQLITE_URI',
+        'dryrun': 'RGT_SQLITE_DRY_RUN',
+        'disable': 'RGT_SQLITE_DISABLE',
+        'busy_timeout': 'RGT_SQLITE_BUSY_TIMEOUT'
+    }
+
+    URI_PREFIX = 'sqlite://'
+
+    # Seconds a write waits for another process to release the database. A locked
+    # database is also retried, so a write may wait this long on every attempt.
+    DEFAULT_BUSY_TIMEOUT = 10
+
+    # The primary result codes of the database, or a table, being locked by another
+    # connection for longer than the busy timeout (SQLITE_BUSY and SQLITE_LOCKED). Only
+    # these errors are retried; other errors, such as a full disk, fail at once.
+    LOCKED_ERROR_CODES = (5, 6)
+
+    SCHEMA_VERSION = 1
+
+    # Same tags and event fields as the InfluxDB backend
+    TAGS = [
+                'test_id',
+                'app',
+                'test',
+                'runtag',
+                'machine'
+    ]
+
+    EVENT_FIELDS = [
+                'build_directory',
+                'event_filename',
+                'event_name',
+                'event_subtype',
+                'event_time',
+                'event_type',
+                'event_value',
+                'check_alias',
+                'hostname',
+                'job_account_id',
+                'job_id',
+                'path_to_rgt_package',
+                'rgt_path_to_sspace',
+                'rgt_system_log_tag',
+                'run_archive',
+                'user',
+                'workdir',
+                'comment',
+                'output_txt'
+    ]
+
+    # The columns and the primary key of each table. Like an InfluxDB point,
+    # a row written twice with the same key is stored once, so that records
+    # can be replayed safely. The time column is nanoseconds since the epoch.
+    TABLES = {
+        'events': (TAGS + EVENT_FIELDS + ['time'],
+                   TAGS + ['event_name', 'time']),
+        'metrics': (TAGS + ['event_time', 'name', 'value', 'time'],
+                    TAGS + ['name', 'time']),
+        'node_health': (['test', 'machine', 'node', 'test_id', 'event_time', 'status', 'message', 'location', 'time'],
+                        ['test', 'machine', 'node', 'time']),
+        'external_metrics': (['measurement', 'tags', 'field', 'value', 'time'],
+                             ['measurement', 'tags', 'field', 'time'])
+    }
+
+    DISABLE_DOTFILE_NAME = '.disable_sqlite'
+    SUCCESSFUL_DOTFILE_NAME = '.success_sqlite'
+
+    # The connections shared by all SQLiteDBLogger objects of this process, by
+    # database path. A new SQLiteDBLogger is made for every status file, so the
+    # connections are kept here so that they are reused across them.
+    _connections = {}
+    _connections_lock = threading.Lock()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Special methods                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __init__(self,
+                 uri='',
+                 logger=None):
+
+        # This function can't be reached except through the parent
+        # rgt_database_logger, which checks if the logger is not None
+        self.__logger = logger
+        self.full_uri = uri
+
+        self.path = None
+        self.url = None
+        self.dryrun = False
+
+        self._validate_uri()
+        self.busy_timeout = self._get_envvar_number('busy_timeout', float, self.DEFAULT_BUSY_TIMEOUT)
+
+        (self.__db, self.__db_lock) = self._get_connection(self.path, self.busy_timeout, self.__logger)
+
+        alive_msg = self._check_alive()
+        if alive_msg:
+            message = f'An SQLite database at {self.path} is not usable: {alive_msg}'
+            raise DatabaseInitError(message)
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # End of special methods                                          @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Public methods.                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    @property
+    def disable_file_name(self):
+        return self.DISABLE_DOTFILE_NAME
+
+    @property
+    def disable_envvar_name(self):
+        return self.kw['dryrun']
+
+    @property
+    def successful_file_name(self):
+        return self.SUCCESSFUL_DOTFILE_NAME
+
+    @property
+    def name(self):
+        return 'sqlite'
+
+    def send_event(self, event_dict : dict, callback=None):
+        """
+            Writes the event to the events table.
+        """
+        self.__logger.doDebugLogging(f"Writing event {event_dict['event_name']} for test id: {event_dict['test_id']} to {self.path}")
+
+        row = self._get_tags(event_dict, 'event')
+        for field_name in self.EVENT_FIELDS:
+            if field_name == 'output_txt':
+                continue
+            elif not field_name in event_dict.keys():
+                # We don't expect the comment to be populated yet.
+                if not field_name == 'comment':
+                    self.__logger.doWarningLogging(f"Couldn't find SQLite field: {field_name}. Setting to NOVALUE")
+                event_dict[field_name] = self.NO_VALUE
+            row[field_name] = str(event_dict[field_name])
+        row['output_txt'] = self._get_output_txt(event_dict, logger=self.__logger)
+        row['time'] = line_protocol.timestamp(event_dict['event_time'])
+
+        return self._write_records([self._make_record('events', row)], callback=callback, logger=self.__logger)
+
+    def send_metrics(self, test_info_dict : dict, metrics_dict : dict, callback=None):
+        """
+            Writes metrics to the metrics table, one row per metric.
+        """
+        self.__logger.doDebugLogging(f"Writing metrics from test id: {test_info_dict['test_id']} to {self.path}")
+
+        tags = self._get_tags(test_info_dict, 'metrics')
+        time_stamp = line_protocol.timestamp(test_info_dict['event_time'])
+        records = [self._make_record('metrics', dict(tags, event_time=test_info_dict['event_time'],
+                                                     name=name, value=self._get_value(value), time=time_stamp))
+                   for (name, value) in metrics_dict.items()]
+
+        return self._write_records(records, callback=callback, logger=self.__logger)
+
+    def send_node_health_results(self, test_info_dict : dict, node_health_dict : dict, callback=None):
+        """
+            Writes node health data to the node_health table, one row per node.
+            The node locations of RGT_NODE_LOCATION_FILE, if it is set, are stored as JSON.
+        """
+        self.__logger.doDebugLogging(f"Writing node health data from test id: {test_info_dict['test_id']} to {self.path}")
+
+        for t in ['test', 'machine', 'test_id', 'event_time']:
+            if not t in test_info_dict.keys():
+                raise DatabaseDataError(f"Test info provided to node health logging missing tag: {t}")
+
+        node_locations = {}
+        node_location_file = os.environ.get('RGT_NODE_LOCATION_FILE', 'none')
+        if node_location_file.lower() != 'none':
+            if not os.path.exists(node_location_file):
+                raise DatabaseEnvironmentError(f"An RGT_NODE_LOCATION_FILE does not exist at {node_location_file}")
+            with open(node_location_file, 'r') as f:
+                # if this generates an exception, it will be caught by parent class
+                node_locations = json.loads(f.read())
+
+        time_stamp = line_protocol.timestamp(test_info_dict['event_time'])
+        records = []
+        for (node_name, node_health) in node_health_dict.items():
+            location = node_locations.get(node_name)
+            row = {'test': test_info_dict['test'],
+                   'machine': test_info_dict['machine'],
+                   'node': node_name,
+                   'test_id': test_info_dict['test_id'],
+                   'event_time': test_info_dict['event_time'],
+                   'status': node_health.get('status'),
+                   'message': node_health.get('message'),
+                   'location': json.dumps(location) if location != None else None,
+                   'time': time_stamp}
+            records.append(self._make_record('node_health', row))
+
+        return self._write_records(records, callback=callback, logger=self.__logger)
+
+    def send_external_metrics(self, table : str, tags : dict, values : dict, log_time : str, callback=None):
+        """
+            Writes external metrics to the external_metrics table, one row per value.
+            The table name is stored in the measurement column, and the tags as JSON.
+        """
+        self.__logger.doDebugLogging(f"Writing external metrics to {self.path}")
+
+        tags_json = json.dumps(tags, sort_keys=True)
+        time_stamp = line_protocol.timestamp(log_time)
+        records = [self._make_record('external_metrics', {'measurement': table, 'tags': tags_json, 'field': field,
+                                                          'value': self._get_value(value), 'time': time_stamp})
+                   for (field, value) in values.items()]
+
+        return self._write_records(records, callback=callback, logger=self.__logger)
+
+    def is_alive(self):
+        """
+        Checks that the database can be read.
+        """
+        try:
+            with self.__db_lock:
+                self.__db.execute('SELECT COUNT(*) FROM events WHERE 0').fetchone()
+        except sqlite3.Error as e:
+            return str(e)
+        return
+
+    def query(self, query):
+        """
+        Queries the database.
+
+        Parameters:
+            query: an SQL query string
+
+        Returns:
+            a list of dictionary objects
+        """
+        return list(self.iter_query(query))
+
+    def iter_query(self, query):
+        """
+        Queries the database, yielding the result rows as they are read.
+        The query runs on its own read-only connection, so it neither waits for
+        nor blocks the writes of this process.
+
+        Parameters:
+            query: an SQL query string
+
+        Returns:
+            an iterator of dictionary objects, one per result row
+        """
+        self.__logger.doDebugLogging(f'Sending query: {query} to: {self.path}')
+        try:
+            db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, timeout=self.busy_timeout)
+        except sqlite3.Error as e:
+            self.__logger.doErrorLogging(f"Failed to open SQLite database {self.path}: {e}")
+            return
+        try:
+            db.row_factory = sqlite3.Row
+            for row in db.execute(query):
+                yield dict(row)
+        except sqlite3.Error as e:
+            self.__logger.doErrorLogging(f"SQLite query failed: {e}")
+        finally:
+            db.close()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # End of public methods.                                          @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Private methods.                                                @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    @classmethod
+    def _get_connection(cls, path : str, busy_timeout : float, logger):
+        """
+        Returns the connection to the database at path and the lock that serializes its use,
+        opening the database with busy_timeout and creating its tables if needed.
+
+        The connection is shared by all threads of this process. Connections are not
+        inherited by forked processes, which open their own.
+        """
+        key = (path, os.getpid())
+        with cls._connections_lock:
+            if not key in cls._connections:
+                # Transactions are begun explicitly, see _write_batch
+                db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+                try:
+                    if cls._set_journal_mode(db) == 'wal':
+                        # In WAL mode, a commit is durable once the WAL is synced at checkpoints
+                        db.execute('PRAGMA synchronous=NORMAL')
+                    else:
+                        logger.doWarningLogging(f"Could not enable WAL mode for the SQLite database {path}. Is it on a "
+                                                f"network file system? Using a rollback journal, in which reads and "
+                                                f"writes wait for each other.")
+                    cls._create_tables(db)
+                except sqlite3.Error:
+                    db.close()
+                    raise
+                cls._connections[key] = (db, threading.Lock())
+            return cls._connections[key]
+
+    @staticmethod
+    def _set_journal_mode(db):
+        """
+        Puts the database in WAL mode or, if WAL mode cannot be enabled, in the default
+        rollback journal mode (DELETE). Returns the journal mode of the database.
+        """
+        try:
+            journal_mode = db.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        except sqlite3.OperationalError:
+            journal_mode = None
+        if journal_mode != 'wal':
+            journal_mode = db.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+        return journal_mode
+
+    @classmethod
+    def _create_tables(cls, db):
+        """
+        Creates the tables of TABLES if they do not exist.
+        """
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        if version > cls.SCHEMA_VERSION:
+            raise DatabaseInitError(f'The database schema version {version} is newer than the supported version {cls.SCHEMA_VERSION}.')
+
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for (table, (columns, key)) in cls.TABLES.items():
+                db.execute('CREATE TABLE IF NOT EXISTS ' + table + '(' +
+                           ', '.join(columns) + ', PRIMARY KEY(' + ', '.join(key) + '))')
+            db.execute('PRAGMA user_version = ' + str(cls.SCHEMA_VERSION))
+            db.execute('COMMIT')
+        except:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            raise
+
+    def _write_batch(self, records : list):
+        """
+        Writes records to the database in one transaction
+        """
+        if self.dryrun or (self.kw['dryrun'] in os.environ and os.environ[self.kw['dryrun']] == '1'):
+            # A Harness utility may set the environment variable after DB init time
+            self.dryrun = True
+            self.__logger.doInfoLogging(f'SQLite dry-run is set via the {self.kw["dryrun"]} environment variable. Records: {records}')
+            return True
+
+        rows = {}
+        for record in records:
+            record = json.loads(record)
+            if not record['table'] in self.TABLES:
+                raise DatabaseDataError(f"Unknown SQLite table: {record['table']}")
+            rows.setdefault(record['table'], []).append(record['row'])
+
+        self.__logger.doDebugLogging(f"Writing {len(records)} records to {self.path}")
+        # A locked database is raised as a DatabaseTransientError, to be retried in
+        # BaseDBLogger._send_batch. Other errors are caught in the database manager class
+        try:
+            with self.__db_lock:
+                # Begin with the write lock taken, so that concurrent writers wait
+                # for the busy timeout instead of failing to upgrade their lock
+                self.__db.execute('BEGIN IMMEDIATE')
+                try:
+                    for (table, table_rows) in rows.items():
+                        columns = self.TABLES[table][0]
+                        self.__db.executemany('INSERT OR REPLACE INTO ' + table + '(' + ', '.join(columns) + ') ' +
+                                              'VALUES(:' + ', :'.join(columns) + ')', table_rows)
+                    self.__db.execute('COMMIT')
+                except:
+                    if self.__db.in_transaction:
+                        self.__db.execute('ROLLBACK')
+                    raise
+        except sqlite3.OperationalError as e:
+            if self._is_locked_error(e):
+                raise DatabaseTransientError(f"The SQLite database {self.path} is locked: {e}") from e
+            raise
+        return True
+
+    def _is_locked_error(self, e : sqlite3.OperationalError):
+        """
+        Returns whether an error is the database being locked, see LOCKED_ERROR_CODES.
+        The error code is available from Python 3.11; before, the message is checked.
+        """
+        error_code = getattr(e, 'sqlite_errorcode', None)
+        if error_code != None:
+            # Extended result codes keep the primary result code in their low byte
+            return (error_code & 0xff) in self.LOCKED_ERROR_CODES
+        return str(e).startswith('database is locked') or str(e).startswith('database table is locked')
+
+    def _make_record(self, table : str, row : dict):
+        """
+        Serializes a row of a table as a record, see _write_batch
+        """
+        return json.dumps({'table': table, 'row': row})
+
+    def _get_tags(self, info_dict : dict, kind : str):
+        """
+        Returns the tag values of an event or test info dictionary
+        """
+        tags = {}
+        for tag_name in self.TAGS:
+            if not tag_name in info_dict.keys():
+                raise DatabaseDataError(f"Could not find required tag in {kind} dictionary: {tag_name}")
+            tags[tag_name] = str(info_dict[tag_name])
+        return tags
+
+    def _get_value(self, value):
+        """
+        Converts a metric value to an SQLite value. Values may be formatted for
+        InfluxDB line protocol: quoted strings are unquoted, and unquoted strings
+        that are numbers are stored as numbers.
+        """
+        if isinstance(value, bool):
+            return int(value)
+        elif isinstance(value, (int, float)):
+            return value
+        value = str(value)
+        if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+            return re.sub(r'\\(["\\])', r'\1', value[1:-1])
+        for number_type in (int, float):
+            try:
+                return number_type(value)
+            except ValueError:
+                pass
+        return value
+
+    def _validate_uri(self):
+        """
+        Parses the URI provided by RGT_SQLITE_URI
+        The URI is sqlite:// followed by the path to the database file (ie, sqlite:///path/to/file.db),
+        or just the path. Relative paths are relative to the current working directory.
+        """
+        path = self.full_uri
+        if path.startswith(self.URI_PREFIX):
+            path = path[len(self.URI_PREFIX):]
+        if len(path) == 0:
+            message = f'The SQLite URI must specify the path to the database file. The SQLite URI was {self.full_uri}.'
+            raise DatabaseInitError(message)
+        self.path = os.path.abspath(path)
+        self.url = self.URI_PREFIX + self.path
+
+        if not os.path.isdir(os.path.dirname(self.path)):
+            message = f'The directory of the SQLite database {self.path} does not exist.'
+            raise DatabaseInitError(message)
+
+        if self.kw['dryrun'] in os.environ and os.environ[self.kw['dryrun']] == '1':
+            self.dryrun = True
+
+    def _get_envvar_number(self, key : str, number_type, default):
+        """
+        Returns the number set by the environment variable of kw[key], or default if unset or invalid.
+        """
+        if not self.kw[key] in os.environ:
+            return default
+        try:
+            value = number_type(os.environ[self.kw[key]])
+        except ValueError:
+            value = 0
+        if value <= 0:
+            self.__logger.doWarningLogging(f'Ignoring invalid {self.kw[key]}={os.environ[self.kw[key]]}. Using {default}.')
+            return default
+        return value
@@ -5,7 +5,13 @@ This module implements the database logging capability of the harness.
 
 """
 
+import concurrent.futures
 import os
+import threading
+import time
+
+from libraries.rgt_database_loggers import write_spool
+from libraries.rgt_database_loggers.db_backends.rgt_sqlite import SQLiteDBLogger
 
 class RgtDatabaseLogger:
 
@@ -15,6 +21,15 @@ class RgtDatabaseLogger:
     # Information required in the log_* methods to be able to send the test information to InfluxDB
     REQUIRED_TEST_INFO = ['test_id', 'app', 'test', 'runtag', 'machine']
 
+    # Defaults of sending data to several backends at once
+    DEFAULT_FANOUT_WORKERS = 8
+    DEFAULT_FANOUT_TIMEOUT = 120.0
+
+    # The executor that sends data to the backends concurrently, shared by all
+    # RgtDatabaseLogger objects of this process
+    _fanout_executor = None
+    _fanout_executor_lock = threading.Lock()
+
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     #                                                                 @
     # Public methods.                                                 @
@@ -42,7 +57,7 @@ class RgtDatabaseLogger:
         self.enabled_backends = [] # database logger objects
         self._add_db_backends(only=only)
 
-    def log_event(self, event_dict : dict, only=None):
+    def log_event(self, event_dict : dict, only=None, callback=None):
         """
         Logs the provided event to all databases
         ----
@@ -51,56 +66,57 @@ class RgtDatabaseLogger:
               a dictionary providing all event information to log
           only : str
               a string URL specifying which database backend to log to (defaults to logging to all)
+          callback : callable
+              (Optional) called as callback(backend, success) once the data has been written
+              to, or failed to be written to, each backend. When batching is enabled
+              (see write_batcher.py) this may happen after this method returns.
         """
 
         if not self._check_test_info_exists(event_dict):
             return False
 
-        # Go to the Run_Archive directory to be consistent with metrics & node health logging
-        currentdir = os.getcwd()
+        # The dot-files live in the Run_Archive directory. Paths are used rather than changing
+        # directory, since events may be logged from a background thread (see event_pipeline.py)
         runarchive_dir = event_dict['run_archive']
-        os.chdir(runarchive_dir)
 
         # Use event file name to match the logging_start event
         if event_dict['event_name'] == 'logging_start':
             # Make sure that any explicitly-disabled backends create the dot-file
             for dotfile in self.disabled_backends_filenames:
-                if not os.path.exists(dotfile):
-                    os.mknod(dotfile)
-
-        num_failed = 0
-
-        for backend in self._make_db_target_list(only):
-            try:
-                if not self._check_test_disabled_backend(backend):
-                    if not backend.send_event(event_dict):
-                        self.logger.doErrorLogging(f"An error occurred while logging an event to {backend.url}. Please see log files for more details.")
-                        num_failed += 1
-                    elif event_dict['event_name'] == 'check_end':
-                        # If we just successfully logged check_end, then we add a dot-file to indicate logging completed
-                        if not os.path.exists(backend.successful_file_name):
-                            os.mknod(backend.successful_file_name)
-            except Exception as e:
-                self.logger.doErrorLogging(f"The following exception occurred while logging an event to {backend.url}: {e}.")
-                num_failed += 1
-                pass
-
-        os.chdir(currentdir)
-        return num_failed == 0
-
-    def log_metrics(self, test_info_dict : dict, metrics_dict : dict, only=None):
+                dotfile_path = os.path.join(runarchive_dir, dotfile)
+                if not os.path.exists(dotfile_path):
+                    os.mknod(dotfile_path)
+
+        def send(backend):
+            if self._check_test_disabled_backend(backend, runarchive_dir):
+                return True
+            on_success = None
+            if event_dict['event_name'] == 'check_end':
+                # Once check_end is successfully logged, we add a dot-file to indicate logging completed
+                on_success = lambda: self._mark_logging_complete(backend, runarchive_dir)
+            # Each backend gets its own copy, since backends may fill in missing fields
+            return backend.send_event(dict(event_dict), callback=self._make_write_callback(backend, 'an event', callback, on_success))
+
+        return self._send_to_backends(self._make_db_target_list(only), send, 'an event')
+
+    def log_metrics(self, test_info_dict : dict, metrics_dict : dict, only=None, callback=None):
         """
         Logs the provided metrics data to all databases
         ----
         Parameters:
           test_info_dict : dict
-              a dictionary providing test_id, app, test, runtag, machine
+              a dictionary providing test_id, app, test, runtag, machine, and optionally
+              run_archive, the Run_Archive directory of the test (defaults to the current directory)
 
           metrics_dict : dict
               a dictionary providing all key-value metrics pairings
 
           only : str
               a string URL specifying which database backend to log to (defaults to logging to all)
+          callback : callable
+              (Optional) called as callback(backend, success) once the data has been written
+              to, or failed to be written to, each backend. When batching is enabled
+              (see write_batcher.py) this may happen after this method returns.
         ----
         Returns:
             True if logging is successful for all backends
@@ -110,33 +126,34 @@ class RgtDatabaseLogger:
         if not self._check_test_info_exists(test_info_dict):
             return False
 
-        num_failed = 0
+        runarchive_dir = test_info_dict.get('run_archive', '.')
 
-        for backend in self._make_db_target_list(only):
-            try:
-                if not self._check_test_disabled_backend(backend):
-                    if not backend.send_metrics(test_info_dict, metrics_dict):
-                        self.logger.doErrorLogging(f"An error occurred while logging an metrics to {backend.url}. Please see log files for more details.")
-                        num_failed += 1
-            except Exception as e:
-                self.logger.doErrorLogging(f"The following exception occurred while logging metrics to {backend.url}: {e}.")
-                num_failed += 1
-                pass
-        return num_failed == 0
+        def send(backend):
+            if self._check_test_disabled_backend(backend, runarchive_dir):
+                return True
+            return backend.send_metrics(test_info_dict, metrics_dict,
+                                        callback=self._make_write_callback(backend, 'metrics', callback))
 
-    def log_node_health(self, test_info_dict : dict, node_health_dict : dict, only=None):
+        return self._send_to_backends(self._make_db_target_list(only), send, 'metrics')
+
+    def log_node_health(self, test_info_dict : dict, node_health_dict : dict, only=None, callback=None):
         """
         Logs the provided event to all databases
         ----
         Parameters:
           test_info_dict : dict
-              a dictionary providing test_id, app, test, runtag, machine
+              a dictionary providing test_id, app, test, runtag, machine, and optionally
+              run_archive, the Run_Archive directory of the test (defaults to the current directory)
 
           node_health_dict : dict
               a dictionary providing all node statuses and messages
 
           only : str
               a string URL specifying which database backend to log to (defaults to logging to all)
+          callback : callable
+              (Optional) called as callback(backend, success) once the data has been written
+              to, or failed to be written to, each backend. When batching is enabled
+              (see write_batcher.py) this may happen after this method returns.
         ----
         Returns:
             True if logging is successful for all backends
@@ -146,20 +163,17 @@ class RgtDatabaseLogger:
         if not self._check_test_info_exists(test_info_dict):
             return False
 
-        num_failed = 0
-        for backend in self._make_db_target_list(only):
-            try:
-                if not self._check_test_disabled_backend(backend):
-                    if not backend.send_node_health_results(test_info_dict, node_health_dict):
-                        self.logger.doErrorLogging(f"An error occurred while logging node health data to {backend.url}. Please see log files for more details.")
-                        num_failed += 1
-            except Exception as e:
-                self.logger.doErrorLogging(f"The following exception occurred while logging node health results to {backend.url}: {e}.")
-                num_failed += 1
-                pass
-        return num_failed == 0
+        runarchive_dir = test_info_dict.get('run_archive', '.')
+
+        def send(backend):
+            if self._check_test_disabled_backend(backend, runarchive_dir):
+                return True
+            return backend.send_node_health_results(test_info_dict, node_health_dict,
+                                                    callback=self._make_write_callback(backend, 'node health data', callback))
+
+        return self._send_to_backends(self._make_db_target_list(only), send, 'node health data')
 
-    def log_external_metrics(self, table : str, tags : dict, values : dict, log_time : str, only=None):
+    def log_external_metrics(self, table : str, tags : dict, values : dict, log_time : str, only=None, callback=None):
         """
         Logs the provided external metrics to the databases
         ----
@@ -175,6 +189,13 @@ class RgtDatabaseLogger:
 
           log_time : str
               The timestamp (isoformat) to associate with this metric
+
+          only : str
+              a string URL specifying which database backend to log to (defaults to logging to all)
+          callback : callable
+              (Optional) called as callback(backend, success) once the data has been written
+              to, or failed to be written to, each backend. When batching is enabled
+              (see write_batcher.py) this may happen after this method returns.
         ----
         Returns:
             True if logging is successful for all backends
@@ -182,18 +203,51 @@ class RgtDatabaseLogger:
         """
 
         # Logging external metrics is very simple -- just do it. No dot-files, just environment variables
+        def send(backend):
+            return backend.send_external_metrics(table, tags, values, log_time,
+                                                 callback=self._make_write_callback(backend, 'external metrics', callback))
+
+        return self._send_to_backends(self._make_db_target_list(only), send, 'external metrics')
+
+    def flush(self, only=None):
+        """
+        Writes the data buffered for the databases when batching is enabled (see write_batcher.py)
+        ----
+        Parameters:
+          only : str
+              a string URL specifying which database backend to flush (defaults to all)
+        ----
+        Returns:
+            True if all buffered data was written
+            False otherwise
+        """
         num_failed = 0
         for backend in self._make_db_target_list(only):
-            try:
-                if not backend.send_external_metrics(table, tags, values, log_time):
-                    self.logger.doErrorLogging(f"An error occurred while logging external metrics to {backend.url}. Please see log files for more details.")
-                    num_failed += 1
-            except Exception as e:
-                self.logger.doErrorLogging(f"The following exception occurred while logging external metrics to {backend.url}: {e}.")
+            if not backend.flush():
                 num_failed += 1
-                pass
         return num_failed == 0
 
+    def replay_spool(self, max_workers=write_spool.DEFAULT_REPLAY_WORKERS, only=None):
+        """
+        Delivers the writes spooled when spooling is enabled (see write_spool.py)
+        ----
+        Parameters:
+          max_workers : int
+              the number of spooled writes delivered at a time
+          only : str
+              a string URL specifying which database backend to deliver to (defaults to all)
+        ----
+        Returns:
+            A tuple of the number of spooled writes delivered, the number still spooled
+            and the number rejected by their database
+        """
+        spool_dir = write_spool.get_spool_dir()
+        if spool_dir == None:
+            self.logger.doWarningLogging("Spooling is not enabled. Set RGT_DATABASE_SPOOL_DIR to an existing directory.")
+            return (0, 0, 0)
+        return write_spool.replay_spool(spool_dir, self._make_db_target_list(only),
+                                        max_workers=max_workers, logger=self.logger)
+
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
     #                                                                 @
     # End of public methods.                                          @
@@ -207,6 +261,120 @@ class RgtDatabaseLogger:
     #                                                                 @
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
 
+    @classmethod
+    def _get_fanout_executor(cls):
+        """
+        Returns the executor shared by all RgtDatabaseLogger objects, creating it if needed.
+        The number of threads is set by RGT_DATABASE_FANOUT_WORKERS.
+        """
+        with cls._fanout_executor_lock:
+            if cls._fanout_executor == None:
+                max_workers = cls._get_envvar_number('RGT_DATABASE_FANOUT_WORKERS', int, cls.DEFAULT_FANOUT_WORKERS)
+                cls._fanout_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                                             thread_name_prefix='rgt_database_fanout')
+            return cls._fanout_executor
+
+    @staticmethod
+    def _get_envvar_number(envvar : str, number_type, default):
+        """
+        Returns the positive number set by an environment variable, or default if unset or invalid.
+        """
+        try:
+            value = number_type(os.getenv(envvar, default))
+        except ValueError:
+            return default
+        return value if value > 0 else default
+
+    def _send_to_backends(self, backends : list, send, description : str):
+        """
+        Sends data to each backend, concurrently if there is more than one, so that each
+        additional backend does not add its latency to that of the others.
+
+        Parameters
+        ----------
+            backends : list
+                The database logger objects to send to
+            send : callable
+                Called as send(backend). Returns True if the data was sent
+            description : str
+                What is being logged, for the error messages
+
+        Returns
+        -------
+            True if the data was sent to all backends
+            False otherwise
+        """
+        def send_to_backend(backend):
+            try:
+                return send(backend)
+            except Exception as e:
+                self.logger.doErrorLogging(f"The following exception occurred while logging {description} to {backend.url}: {e}.")
+                return False
+
+        if len(backends) <= 1:
+            return all([send_to_backend(backend) for backend in backends])
+
+        # A backend that does not finish within the timeout is counted as failed. Its send
+        # keeps running, and its write callback is still called when it finishes.
+        timeout = self._get_envvar_number('RGT_DATABASE_FANOUT_TIMEOUT', float, self.DEFAULT_FANOUT_TIMEOUT)
+        futures = []
+        num_failed = 0
+        for backend in backends:
+            try:
+                futures.append((backend, self._get_fanout_executor().submit(send_to_backend, backend)))
+            except RuntimeError:
+                # Executors can neither be made nor take work once the interpreter is exiting,
+                # which is before the exit handlers, such as that of the event pipeline, log
+                # the last events. The data is then sent to the backends one at a time.
+                if not send_to_backend(backend):
+                    num_failed += 1
+        deadline = time.monotonic() + timeout
+
+        for (backend, future) in futures:
+            try:
+                if not future.result(timeout=max(0.0, deadline - time.monotonic())):
+                    num_failed += 1
+            except concurrent.futures.TimeoutError:
+                self.logger.doErrorLogging(f"Logging {description} to {backend.url} did not finish within {timeout} seconds.")
+                num_failed += 1
+        return num_failed == 0
+
+    def _make_write_callback(self, backend, description : str, callback=None, on_success=None):
+        """
+        Makes the callback a backend calls once data has been written or failed to be written
+
+        Parameters
+        ----------
+            backend : instantiation of the base_db class
+                Database logger object
+            description : str
+                What is being logged, for the error message
+            callback : callable
+                (Optional) the caller's callback, called as callback(backend, success)
+            on_success : callable
+                (Optional) called if the data was written
+
+        Returns
+        -------
+            A function of one argument, True if the data was written
+        """
+        def write_callback(success):
+            if not success:
+                self.logger.doErrorLogging(f"An error occurred while logging {description} to {backend.url}. Please see log files for more details.")
+            elif on_success != None:
+                on_success()
+            if callback != None:
+                callback(backend, success)
+        return write_callback
+
+    def _mark_logging_complete(self, backend, runarchive_dir : str):
+        """
+        Creates the dot-file indicating that logging the test to a backend completed
+        """
+        successful_file_path = os.path.join(runarchive_dir, backend.successful_file_name)
+        if not os.path.exists(successful_file_path):
+            os.mknod(successful_file_path)
+
     def _check_test_info_exists(self, test_info_dict : dict):
         """
         Checks that all required information exits in the provided test_info_dict
@@ -226,36 +394,40 @@ class RgtDatabaseLogger:
                 return False
         return True
 
-    def _check_test_disabled_backend(self, db_logger):
+    def _check_test_disabled_backend(self, db_logger, runarchive_dir='.'):
         """
         Checks if a specific test has disabled the specified backend
         Checks BOTH environment variables (and creates the dot-files if they don't exist) and the dot-files
-        This function should be called from the Run_Archive directory
 
         Parameters
         ----------
             db_logger : instantiation of the base_db class
                 Database logger object
 
+            runarchive_dir : str
+                (Optional) the Run_Archive directory of the test. Defaults to the current directory
+
         Returns
         -------
             True if test/run has disabled the specific backend
             False otherwise
         """
 
+        disable_file_path = os.path.join(runarchive_dir, db_logger.disable_file_name)
+
         # Check if the environment variables to disable the backend are set
         if db_logger.name in self.disabled_backends:
             # Create dot-file if it doesn't already exist
-            if not os.path.exists(db_logger.disable_file_name):
-                os.mknod(db_logger.disable_file_name)
+            if not os.path.exists(disable_file_path):
+                os.mknod(disable_file_path)
             return True
 
         # Check if the dot-file exists in Run_Archive/test_id to disable the backend
         # Since the DB backend initialization is NOT done on a per-test basis, it's
         # possible that a test previously had InfluxDB disabled, but was not explicitly
         # disabled in the current environment. We want to enforce the past disabling
-        if os.path.exists(db_logger.disable_file_name):
-            self.logger.doDebugLogging(f'Found {db_logger.disable_file_name} in {os.getcwd()}. Disabling {db_logger.name}.')
+        if os.path.exists(disable_file_path):
+            self.logger.doDebugLogging(f'Found {db_logger.disable_file_name} in {os.path.abspath(runarchive_dir)}. Disabling {db_logger.name}.')
             return True
 
         return False
@@ -306,6 +478,12 @@ class RgtDatabaseLogger:
             self.logger.doInfoLogging(f"InfluxDB logging is explicitly disabled with {InfluxDBLogger.kw['disable']}=1")
             self.disabled_backends.append('influxdb')
             self.disabled_backends_filenames.append(InfluxDBLogger.DISABLE_DOTFILE_NAME)
+
+        if SQLiteDBLogger.kw['disable'] in os.environ and \
+                            str(os.environ[SQLiteDBLogger.kw['disable']]) == '1':
+            self.logger.doInfoLogging(f"SQLite logging is explicitly disabled with {SQLiteDBLogger.kw['disable']}=1")
+            self.disabled_backends.append('sqlite')
+            self.disabled_backends_filenames.append(SQLiteDBLogger.DISABLE_DOTFILE_NAME)
         return
 
     def _add_db_backends(self, only=None):
@@ -355,6 +533,17 @@ class RgtDatabaseLogger:
                                 self.enabled_backends.append(influxdb_backend)
                         except Exception as e:
                             self.logger.doErrorLogging(f"Failed to enable the database logger from URL {influxdb_uris[i]}: {e}")
+
+        if not 'sqlite' in self.disabled_backends and SQLiteDBLogger.kw['uri'] in os.environ:
+            # Multiple SQLite databases can be separated by semicolons
+            for sqlite_uri in os.environ[SQLiteDBLogger.kw['uri']].split(';'):
+                try:
+                    sqlite_backend = SQLiteDBLogger(uri=sqlite_uri, logger=self.logger)
+                    if not only or sqlite_backend.url == only:
+                        self.logger.doDebugLogging(f"Enabling the {sqlite_backend.name} database logger from URI {sqlite_uri}.")
+                        self.enabled_backends.append(sqlite_backend)
+                except Exception as e:
+                    self.logger.doErrorLogging(f"Failed to enable the database logger from URI {sqlite_uri}: {e}")
         return
 
     #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
@@ -0,0 +1,233 @@
+#! /usr/bin/env python3
+"""
+This module implements the write batching of the database backends.
+
+When enabled with RGT_DATABASE_BATCH=1, the records a backend is asked to
+log are not written one call at a time. They are accumulated, across events
+and test instances, and written in bulk when the batch reaches a line or
+size limit, when it is older than the flush interval, when it is flushed
+explicitly, or when the process exits.
+"""
+
+import atexit
+import os
+import threading
+
+from libraries.rgt_database_loggers.write_retry import TRANSIENT_FAILURE
+
+DEFAULT_MAX_LINES = 5000
+"""int: The default number of buffered lines that triggers a write."""
+
+DEFAULT_MAX_BYTES = 1048576
+"""int: The default number of buffered bytes that triggers a write."""
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+"""float: The default maximum number of seconds a record stays buffered."""
+
+_write_batchers = {}
+_write_batchers_lock = threading.Lock()
+
+def get_write_batcher(key, write_batch, logger=None):
+    """Returns the write batcher of a database destination, or None if batching is disabled.
+
+    Batching is enabled by setting RGT_DATABASE_BATCH to '1'. The first call
+    for a destination creates its batcher. All batchers are flushed when the
+    process exits.
+
+    Parameters
+    ----------
+    key : hashable
+        Identifies the destination. Backend objects that write to the same
+        destination share one batcher.
+
+    write_batch : callable
+        Writes a list of records to the destination in one request, and
+        returns True on success.
+
+    logger : rgt_logger
+        The logger used to report failed writes.
+
+    Returns
+    -------
+    WriteBatcher
+    """
+    if os.getenv('RGT_DATABASE_BATCH', '0') != '1':
+        return None
+
+    with _write_batchers_lock:
+        if not key in _write_batchers:
+            batcher = WriteBatcher(write_batch, logger=logger,
+                                   max_lines=_number_from_environment('RGT_DATABASE_BATCH_MAX_LINES', int, DEFAULT_MAX_LINES),
+                                   max_bytes=_number_from_environment('RGT_DATABASE_BATCH_MAX_BYTES', int, DEFAULT_MAX_BYTES),
+                                   flush_interval=_number_from_environment('RGT_DATABASE_BATCH_FLUSH_INTERVAL', float, DEFAULT_FLUSH_INTERVAL))
+            _write_batchers[key] = batcher
+        return _write_batchers[key]
+
+def _flush_write_batchers():
+    with _write_batchers_lock:
+        batchers = list(_write_batchers.values())
+    for batcher in batchers:
+        batcher.flush()
+
+# Registered when the module is imported, which is before the event pipeline
+# registers its own exit handler, so that the events the pipeline logs while
+# it is closed are still flushed.
+atexit.register(_flush_write_batchers)
+
+def _number_from_environment(envvar, number_type, default):
+    try:
+        value = number_type(os.getenv(envvar, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+class WriteBatcher:
+    """Accumulates records and writes them in bulk."""
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Special methods                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __init__(self, write_batch, logger=None, max_lines=DEFAULT_MAX_LINES,
+                 max_bytes=DEFAULT_MAX_BYTES, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Constructor.
+
+        Parameters
+        ----------
+        write_batch : callable
+            Writes a list of records in one request, and returns True on
+            success.
+
+        logger : rgt_logger
+            The logger used to report failed writes.
+
+        max_lines : int
+            The number of buffered lines that triggers a write.
+
+        max_bytes : int
+            The number of buffered bytes that triggers a write.
+
+        flush_interval : float
+            The maximum number of seconds a record stays buffered.
+        """
+        self.__write_batch = write_batch
+        self.__logger = logger
+        self.__max_lines = max_lines
+        self.__max_bytes = max_bytes
+        self.__flush_interval = flush_interval
+
+        # The buffered (records, callback) groups, one per call to add().
+        self.__groups = []
+        self.__num_lines = 0
+        self.__num_bytes = 0
+        self.__lock = threading.Lock()
+        self.__timer = None
+
+        # Held while writing, so that flush() returns after any write that
+        # another thread has already started.
+        self.__write_lock = threading.Lock()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Public methods.                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def add(self, records, callback=None):
+        """Buffers records, writing the buffer if it is full.
+
+        Parameters
+        ----------
+        records : list
+            The records to write, each a str of one or more lines.
+
+        callback : callable
+            (Optional) called with the result of the write once the records
+            have been written or have failed to be written.
+        """
+        with self.__lock:
+            self.__groups.append((records, callback))
+            self.__num_lines += sum(record.count('\n') + 1 for record in records)
+            self.__num_bytes += sum(len(record) + 1 for record in records)
+            if self.__num_lines >= self.__max_lines or self.__num_bytes >= self.__max_bytes:
+                groups = self.__take_groups()
+            else:
+                groups = None
+                if self.__timer == None:
+                    self.__timer = threading.Timer(self.__flush_interval, self.flush)
+                    self.__timer.daemon = True
+                    self.__timer.start()
+
+        if groups:
+            self.__write(groups)
+
+    def flush(self):
+        """Writes all buffered records.
+
+        Returns
+        -------
+        bool
+            True if every buffered record was written.
+        """
+        with self.__lock:
+            groups = self.__take_groups()
+        return self.__write(groups)
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Private methods.                                                @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __take_groups(self):
+        """Empties the buffer and returns its groups. The caller must hold the lock."""
+        if self.__timer != None:
+            self.__timer.cancel()
+            self.__timer = None
+        (groups, self.__groups) = (self.__groups, [])
+        self.__num_lines = 0
+        self.__num_bytes = 0
+        return groups
+
+    def __write(self, groups):
+        """Writes groups of records in one request.
+
+        If the database rejects the request, each group is written on its own
+        so that only the groups that cannot be written are reported as failed.
+        If the request fails transiently, every group is reported with that
+        result, see write_retry.py.
+        """
+        with self.__write_lock:
+            if len(groups) == 0:
+                return True
+
+            records = [record for (group_records, callback) in groups for record in group_records]
+            result = self.__try_write(records)
+            if result or result is TRANSIENT_FAILURE or len(groups) == 1:
+                results = [result] * len(groups)
+            else:
+                results = [self.__try_write(group_records) for (group_records, callback) in groups]
+
+        for ((group_records, callback), success) in zip(groups, results):
+            if callback != None:
+                try:
+                    callback(success)
+                except Exception as e:
+                    self.__log_error(f"The following exception occurred in a database write callback: {e}")
+
+        return all(results)
+
+    def __try_write(self, records):
+        try:
+            return self.__write_batch(records)
+        except Exception as e:
+            self.__log_error(f"The following exception occurred while writing a batch of {len(records)} database records: {e}")
+            return False
+
+    def __log_error(self, message):
+        if self.__logger:
+            self.__logger.doErrorLogging(message)
+        else:
+            print(message)
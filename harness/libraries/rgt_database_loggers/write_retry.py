@@ -0,0 +1,231 @@
+#! /usr/bin/env python3
+"""
+This module implements the retries and the circuit breakers of the database writes.
+
+A write that fails with a transient error, such as a connection error or a
+timeout, is retried after a random delay that grows exponentially with each
+attempt. When the writes to a destination keep failing, its circuit breaker
+opens: writes to the destination then fail immediately, without waiting for
+timeouts, and the destination is probed with the is_alive method of its
+backend at most once per probe interval. The circuit closes again once a
+probe succeeds. Writes that fail in either way return TRANSIENT_FAILURE, to
+tell them apart from the writes that the destination rejected.
+"""
+
+import os
+import random
+import threading
+import time
+
+DEFAULT_MAX_RETRIES = 2
+"""int: The default number of times a write that failed with a transient error is retried."""
+
+DEFAULT_RETRY_DELAY = 0.5
+"""float: The default base delay of the retries, in seconds. Doubles with each retry."""
+
+DEFAULT_RETRY_MAX_DELAY = 8.0
+"""float: The default maximum delay of a retry, in seconds."""
+
+DEFAULT_BREAKER_THRESHOLD = 5
+"""int: The default number of consecutive failed writes that opens a circuit breaker."""
+
+DEFAULT_BREAKER_PROBE_INTERVAL = 30.0
+"""float: The default minimum number of seconds between the probes of an open circuit."""
+
+class TransientFailure:
+    """The result of a write that failed with a transient error or was refused by an open circuit.
+
+    It is false, like the result of a write that the destination rejected,
+    but unlike a rejected write the same write may succeed later.
+    """
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'TRANSIENT_FAILURE'
+
+TRANSIENT_FAILURE = TransientFailure()
+"""TransientFailure: Returned by the writes that failed transiently."""
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(key):
+    """Returns the circuit breaker of a database destination, or None if circuit breaking is disabled.
+
+    Circuit breaking is disabled by setting RGT_DATABASE_BREAKER_THRESHOLD
+    to '0'. The first call for a destination creates its circuit breaker.
+
+    Parameters
+    ----------
+    key : hashable
+        Identifies the destination. Backend objects that write to the same
+        destination share one circuit breaker.
+
+    Returns
+    -------
+    CircuitBreaker
+    """
+    with _circuit_breakers_lock:
+        if not key in _circuit_breakers:
+            threshold = _number_from_environment('RGT_DATABASE_BREAKER_THRESHOLD', int, DEFAULT_BREAKER_THRESHOLD)
+            if threshold == 0:
+                _circuit_breakers[key] = None
+            else:
+                _circuit_breakers[key] = CircuitBreaker(threshold,
+                                                        _number_from_environment('RGT_DATABASE_BREAKER_PROBE_INTERVAL', float, DEFAULT_BREAKER_PROBE_INTERVAL))
+        return _circuit_breakers[key]
+
+def retry_write(write, transient_errors, logger=None, description='Database write'):
+    """Calls write, retrying it with jittered exponential backoff while it raises a transient error.
+
+    The delay before retry n is drawn uniformly between 0 and
+    RGT_DATABASE_RETRY_DELAY * 2^n seconds, capped at
+    RGT_DATABASE_RETRY_MAX_DELAY, so that the processes and threads writing
+    to a recovering database do not retry in step. At most
+    RGT_DATABASE_RETRIES retries are made.
+
+    Parameters
+    ----------
+    write : callable
+        The write. Its return value is returned.
+
+    transient_errors : tuple
+        The exception types that are worth retrying.
+
+    logger : rgt_logger
+        The logger used to report retries.
+
+    description : str
+        Describes the write in the log messages.
+
+    Returns
+    -------
+    The return value of write. The transient error of the last attempt is
+    raised if every attempt failed.
+    """
+    max_retries = _number_from_environment('RGT_DATABASE_RETRIES', int, DEFAULT_MAX_RETRIES)
+    base_delay = _number_from_environment('RGT_DATABASE_RETRY_DELAY', float, DEFAULT_RETRY_DELAY)
+    max_delay = _number_from_environment('RGT_DATABASE_RETRY_MAX_DELAY', float, DEFAULT_RETRY_MAX_DELAY)
+
+    attempt = 0
+    while True:
+        try:
+            return write()
+        except transient_errors as e:
+            if attempt >= max_retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            attempt += 1
+            if logger:
+                logger.doWarningLogging(f"{description} failed: {e}. Retrying in {delay:.2f} seconds ({attempt}/{max_retries}).")
+            time.sleep(delay)
+
+def _number_from_environment(envvar, number_type, default):
+    try:
+        value = number_type(os.getenv(envvar, default))
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+class CircuitBreaker:
+    """Fails the writes to a destination fast while the destination is unreachable."""
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Special methods                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_THRESHOLD,
+                 probe_interval=DEFAULT_BREAKER_PROBE_INTERVAL):
+        """Constructor.
+
+        Parameters
+        ----------
+        failure_threshold : int
+            The number of consecutive failed writes that opens the circuit.
+
+        probe_interval : float
+            The minimum number of seconds between the probes of the open
+            circuit.
+        """
+        self.__failure_threshold = failure_threshold
+        self.__probe_interval = probe_interval
+
+        self.__num_failures = 0
+        self.__is_open = False
+        self.__last_probe_time = 0.0
+        self.__probing = False
+        self.__lock = threading.Lock()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Public methods.                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    @property
+    def is_open(self):
+        """bool: True while writes to the destination fail fast."""
+        return self.__is_open
+
+    def allow_request(self, probe):
+        """Returns whether a write to the destination should be attempted.
+
+        While the circuit is open, the first caller after each probe interval
+        probes the destination and the other callers are refused. A
+        successful probe half-closes the circuit: writes are attempted again,
+        and the next failed write opens it again.
+
+        Parameters
+        ----------
+        probe : callable
+            Returns True if the destination is reachable.
+
+        Returns
+        -------
+        bool
+        """
+        with self.__lock:
+            if not self.__is_open:
+                return True
+            if self.__probing or time.monotonic() - self.__last_probe_time < self.__probe_interval:
+                return False
+            self.__probing = True
+
+        try:
+            alive = probe()
+        except Exception:
+            alive = False
+
+        with self.__lock:
+            self.__probing = False
+            self.__last_probe_time = time.monotonic()
+            if alive:
+                self.__is_open = False
+                self.__num_failures = self.__failure_threshold - 1
+        return alive
+
+    def record_success(self):
+        """Records that the destination was reached, which closes the circuit."""
+        with self.__lock:
+            self.__num_failures = 0
+            self.__is_open = False
+
+    def record_failure(self):
+        """Records that the destination could not be reached.
+
+        Returns
+        -------
+        bool
+            True if this failure opened the circuit.
+        """
+        with self.__lock:
+            self.__num_failures += 1
+            if self.__is_open or self.__num_failures < self.__failure_threshold:
+                return False
+            self.__is_open = True
+            self.__last_probe_time = time.monotonic()
+            return True
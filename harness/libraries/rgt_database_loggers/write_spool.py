@@ -0,0 +1,251 @@
+#! /usr/bin/env python3
+"""
+This module implements the spool of database writes that failed.
+
+When RGT_DATABASE_SPOOL_DIR names an existing directory, the records a
+database backend fails to write because of a transient error, or because its
+circuit is open (see write_retry.py), are appended to a spool file in that
+directory, with the records already serialized, instead of being lost. Each
+process appends to its own spool file. The spooled records are delivered
+later by replay_spool, see utilities/replay_database_spool.py.
+
+The records that a database rejects would be rejected again by every replay,
+so they are not spooled. They are appended to a rejected file in the same
+directory instead, for inspection.
+"""
+
+import concurrent.futures
+import datetime
+import fcntl
+import glob
+import json
+import os
+import socket
+import uuid
+
+from libraries.rgt_database_loggers.write_retry import TRANSIENT_FAILURE
+
+SPOOL_FILENAME_FORMAT = 'spool.{}.{}.jsonl'
+"""str: The name of the spool file of a process, formatted with the host name and pid."""
+
+REJECTED_FILENAME_FORMAT = 'rejected.{}.{}.jsonl'
+"""str: The name of the rejected file of a process, formatted with the host name and pid."""
+
+CLAIMED_SUFFIX = '.replay'
+"""str: Appended to the name of a spool file while it is being replayed."""
+
+DEFAULT_REPLAY_WORKERS = 4
+"""int: The default number of spooled writes replayed at a time."""
+
+def get_spool_dir():
+    """Returns the spool directory set by RGT_DATABASE_SPOOL_DIR, or None if spooling is disabled."""
+    spool_dir = os.getenv('RGT_DATABASE_SPOOL_DIR', '')
+    if spool_dir == '' or not os.path.isdir(spool_dir):
+        return None
+    return spool_dir
+
+def spool_records(spool_dir, backend_name, destination, records):
+    """Appends records that could not be written to the spool file of this process.
+
+    Parameters
+    ----------
+    spool_dir : str
+        The spool directory.
+
+    backend_name : str
+        The name of the backend, e.g. 'influxdb'.
+
+    destination : str
+        Where the records were written to, see BaseDBLogger.destination.
+
+    records : list
+        The serialized records.
+    """
+    _append_entries(_get_spool_path(spool_dir), [_make_entry(backend_name, destination, records)])
+
+def reject_records(spool_dir, backend_name, destination, records):
+    """Appends records that a database rejected to the rejected file of this process.
+
+    The rejected file has the format of a spool file, but it is never
+    replayed.
+
+    Parameters
+    ----------
+    spool_dir : str
+        The spool directory.
+
+    backend_name : str
+        The name of the backend, e.g. 'influxdb'.
+
+    destination : str
+        Where the records were written to, see BaseDBLogger.destination.
+
+    records : list
+        The serialized records.
+
+    Returns
+    -------
+    str
+        The path of the rejected file.
+    """
+    path = _get_rejected_path(spool_dir)
+    _append_entries(path, [_make_entry(backend_name, destination, records)])
+    return path
+
+def replay_spool(spool_dir, backends, max_workers=DEFAULT_REPLAY_WORKERS, logger=None):
+    """Delivers the spooled records of all spool files to their databases.
+
+    Each spool file is claimed by renaming it, so that writers start a new
+    spool file and concurrent replays skip it. The records whose delivery
+    fails transiently, or whose destination is not among backends, are
+    spooled again. The records that the database rejects are moved to the
+    rejected file of this process. Records may be delivered more than once if
+    a replay is interrupted, which is why BaseDBLogger._write_batch must
+    write idempotently.
+
+    Parameters
+    ----------
+    spool_dir : str
+        The spool directory.
+
+    backends : list
+        The database backend objects to deliver to.
+
+    max_workers : int
+        The number of spooled writes delivered at a time.
+
+    logger : rgt_logger
+        The logger used to report failed deliveries.
+
+    Returns
+    -------
+    tuple
+        The number of spooled writes delivered, the number spooled again and
+        the number rejected.
+    """
+    destinations = {(backend.name, backend.destination): backend for backend in backends}
+
+    num_delivered = 0
+    num_remaining = 0
+    num_rejected = 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path in sorted(glob.glob(os.path.join(spool_dir, 'spool.*'))):
+            claimed = _claim_spool_file(path)
+            if claimed == None:
+                continue
+            (fd, claimed_path) = claimed
+
+            try:
+                entries = {}
+                with os.fdopen(os.dup(fd), 'r') as file_obj:
+                    for line in file_obj:
+                        if not line.endswith('\n'):
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        entries[entry['id']] = entry
+
+                def deliver(entry):
+                    backend = destinations.get((entry['backend'], entry['destination']))
+                    if backend == None:
+                        return TRANSIENT_FAILURE
+                    try:
+                        return backend._send_batch(entry['records'], logger)
+                    except Exception as e:
+                        _log_error(logger, f"The following exception occurred while replaying spooled records to {entry['destination']}: {e}")
+                        return False
+
+                remaining = []
+                rejected = []
+                for (entry, delivered) in zip(entries.values(), executor.map(deliver, entries.values())):
+                    if delivered:
+                        num_delivered += 1
+                    elif delivered is TRANSIENT_FAILURE:
+                        remaining.append(entry)
+                    else:
+                        rejected.append(entry)
+
+                if remaining:
+                    _append_entries(_get_spool_path(spool_dir), remaining)
+                    num_remaining += len(remaining)
+                if rejected:
+                    rejected_path = _get_rejected_path(spool_dir)
+                    _append_entries(rejected_path, rejected)
+                    num_rejected += len(rejected)
+                    _log_error(logger, f"{len(rejected)} spooled writes were rejected. They were moved to {rejected_path}.")
+                os.remove(claimed_path)
+            finally:
+                os.close(fd)
+
+    return (num_delivered, num_remaining, num_rejected)
+
+def _make_entry(backend_name, destination, records):
+    return {'id': uuid.uuid4().hex,
+            'time': datetime.datetime.now().isoformat(),
+            'backend': backend_name,
+            'destination': destination,
+            'records': records}
+
+def _get_spool_path(spool_dir):
+    return os.path.join(spool_dir, SPOOL_FILENAME_FORMAT.format(socket.gethostname(), os.getpid()))
+
+def _get_rejected_path(spool_dir):
+    return os.path.join(spool_dir, REJECTED_FILENAME_FORMAT.format(socket.gethostname(), os.getpid()))
+
+def _append_entries(path, entries):
+    """Appends entries to a spool file, durably.
+
+    If the file is claimed by a replay while waiting for the lock, the
+    entries are appended to a new file at the same path instead.
+    """
+    data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode()
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                os.write(fd, data)
+                os.fsync(fd)
+                return
+        finally:
+            os.close(fd)
+
+def _claim_spool_file(path):
+    """Locks a spool file and renames it so that writers and other replays leave it alone.
+
+    Returns
+    -------
+    tuple
+        The locked file descriptor and the claimed path, or None if the file
+        is locked or gone.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if os.fstat(fd).st_ino != os.stat(path).st_ino:
+            raise FileNotFoundError(path)
+        claimed_path = path
+        if not path.endswith(CLAIMED_SUFFIX):
+            # A spool file left claimed by an interrupted replay is taken as is.
+            claimed_path = path + CLAIMED_SUFFIX
+            os.rename(path, claimed_path)
+    except OSError:
+        os.close(fd)
+        return None
+    return (fd, claimed_path)
+
+def _log_error(logger, message):
+    if logger:
+        logger.doErrorLogging(message)
+    else:
+        print(message)
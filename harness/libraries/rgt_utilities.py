@@ -93,3 +93,50 @@ def rgt_variable_name_modification(variable_name):
     new_var_name = "RGT_" + str.upper(variable_name)
     return new_var_name
 
+
+def read_file_tail(path, max_chars):
+    """Returns up to the last max_chars characters of a text file.
+
+    Only the end of the file is read, so memory and I/O are bounded by
+    max_chars however large the file is. The file is decoded as UTF-8 from
+    the first complete character read, with undecodable bytes replaced, and
+    newlines are translated as when reading the file in text mode.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    max_chars : int
+        The maximum number of characters to return.
+
+    Returns
+    -------
+    str:
+        The end of the file.
+    """
+    if max_chars <= 0:
+        return ''
+
+    with open(path, 'rb') as file_obj:
+        size = file_obj.seek(0, os.SEEK_END)
+
+        # A UTF-8 character is 1 to 4 bytes. Read one byte per character
+        # first, which is enough for ASCII output, and more only if needed.
+        for num_bytes in (max_chars, 4 * max_chars):
+            offset = max(0, size - num_bytes)
+            file_obj.seek(offset)
+            data = file_obj.read(size - offset)
+
+            # Skip the continuation bytes of a character cut by the offset.
+            start = 0
+            if offset > 0:
+                while start < 3 and start < len(data) and (data[start] & 0xC0) == 0x80:
+                    start += 1
+
+            text = data[start:].decode('utf-8', errors='replace')
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+            if len(text) >= max_chars or offset == 0:
+                break
+
+    return text[-max_chars:]
@@ -12,11 +12,16 @@ Copyright (C) 2016 Oak Ridge National Laboratory, UT-Battelle, LLC.
 import os
 import sys
 import re
+import json
+import time
+import concurrent.futures
 
 import sqlite3
 
 #from libraries import input_files
 from libraries.status_file import StatusFile
+from libraries.layout_of_apps_directory import apptest_layout
+from libraries import event_journal
 
 #------------------------------------------------------------------------------
 
@@ -25,10 +30,50 @@ class StatusDatabase:
 
     NO_VALUE = StatusFile.NO_VALUE #---Convenience variable.
 
+    CACHE_FILENAME = '.rgt_status_database.sqlite'
+    """str: The default name of the event cache, in the path to tests."""
+
+    INDEXES = {
+        'events': [('app', 'test', 'test_id'),
+                   ('test_id',),
+                   ('event_name',),
+                   ('event_time',),
+                   ('job_status',)],
+        'test_instances': [('app', 'test', 'test_id'),
+                           ('test_id',),
+                           ('check_end_job_status',),
+                           ('check_end_event_time',),
+                           ('check_end_job_status', 'check_end_event_time')]}
+    """dict: The indexed columns of each table. Indexes on columns a table
+       does not have are skipped."""
+
+    PERIOD_FORMATS = {
+        'hour': '%Y-%m-%dT%H:00:00',
+        'day': '%Y-%m-%d',
+        'week': '%Y-W%W',
+        'month': '%Y-%m'}
+    """dict: The strftime format of the start of each period of completion_counts."""
+
     #--------------------------------------------------------------------------
 
-    def __init__(self, rgt_input_file):
-        """Constructor - simple initializations."""
+    def __init__(self, rgt_input_file, path_to_cache=None, max_workers=None):
+        """Constructor - simple initializations.
+
+        Parameters
+        ----------
+        rgt_input_file : rgt_input_file
+            The input file listing the path to tests and the app/test list.
+
+        path_to_cache : str
+            (Optional) the path to the on-disk cache of ingested event files.
+            Defaults to RGT_STATUS_DATABASE_CACHE if set, otherwise to
+            CACHE_FILENAME in the path to tests. 'none' disables the cache.
+
+        max_workers : int
+            (Optional) the number of threads scanning the status directories
+            and reading event files. Defaults to RGT_STATUS_DATABASE_WORKERS
+            if set, otherwise to the ThreadPoolExecutor default.
+        """
 
         #---Get some locations from harness.
 
@@ -36,13 +81,16 @@ class StatusDatabase:
         self.__input_file = rgt_input_file
         self.__path_to_tests = self.__input_file.get_path_to_tests()
 
-        self.__event_data = None
-        self.__test_instance_data = None
+        if path_to_cache == None:
+            path_to_cache = os.getenv('RGT_STATUS_DATABASE_CACHE',
+                                      os.path.join(self.__path_to_tests, StatusDatabase.CACHE_FILENAME))
+        self.__path_to_cache = path_to_cache
 
-        self.__event_names = None
-        self.__event_fields = None
-
-        self.__test_instance_fields = None
+        if max_workers == None:
+            value = os.getenv('RGT_STATUS_DATABASE_WORKERS', '')
+            if value.isdigit() and int(value) > 0:
+                max_workers = int(value)
+        self.__max_workers = max_workers
 
         self.__db = None
         self.__db_cursor = None
@@ -50,256 +98,1010 @@ class StatusDatabase:
     #--------------------------------------------------------------------------
 
     def load(self):
-        """Take a snapshot of the harness data and build database from this."""
+        """Take a snapshot of the harness data and build database from this.
 
-        #---Initializations.
+        The events and test_instances tables are kept in the event cache
+        with the event files. Only the rows of the test instances whose
+        event files changed since the last load are rebuilt. The tables are
+        rebuilt from all cached events when their columns change, e.g. when
+        an event of a new kind is logged, or when the app/test list changes.
+        """
 
-        stf = StatusFile #---Convenience variable.
-        no_value = StatusDatabase.NO_VALUE #---Convenience variable.
+        #---List the status directories of the app/tests.
+
+        app_tests = {}
+        for test_info in self.__input_file.get_tests():
+            (app, test) = tuple(test_info[0:2])
+            status_dir = os.path.join(self.__path_to_tests, app, test, apptest_layout.test_status_dirname)
+            app_tests.setdefault(status_dir, (app, test))
+
+        #---Scan all status directories in parallel. Only event files that
+        #---changed since the last load are read.
+
+        event_cache = StatusEventCache(self.__path_to_cache, max_workers=self.__max_workers)
+        (changed, removed) = event_cache.update(list(app_tests))
+
+        #---Update the tables in the transaction that recorded the changes,
+        #---so they always match the cached event files.
+
+        self.__db = event_cache.connection
+        self.__db_cursor = self.__db.cursor()
+
+        try:
+            self.__create_tables()
+            tables_app_tests, tables_schema = self.__read_tables_info()
+            app_tests_json = json.dumps([[status_dir, app, test]
+                                         for status_dir, (app, test) in app_tests.items()])
+
+            rebuild = tables_app_tests != app_tests_json
+            if not rebuild:
+                for instance_dir in removed + [os.path.join(status_dir, test_id)
+                                               for status_dir, test_id in changed]:
+                    self.__forget_instance(instance_dir)
+                instances = [StatusDatabase.__make_instance(status_dir, app_tests[status_dir], test_id,
+                                                            _merge_events(file_events))
+                             for (status_dir, test_id), file_events in changed.items()]
+                self.__count_names(instances, 1)
+                rebuild = self.__read_schema() != tables_schema
+
+            if rebuild:
+                self.__rebuild_tables(app_tests, app_tests_json, event_cache)
+            else:
+                self.__insert_instances(instances, tables_schema)
+        except BaseException:
+            self.__db.rollback()
+            raise
+
+        self.__db.commit()
+
+        return self #---for chaining.
+
+    #--------------------------------------------------------------------------
+
+    def __create_tables(self):
+        """Create the tables that record what the events and test_instances tables hold.
+
+        status_database_tables holds the app/test list and the event names
+        and per event fields the tables were built with.
+        status_database_instances holds the rows of each test instance, and
+        the event names and per event fields it contributes.
+        status_database_names counts the test instances contributing each
+        event name and per event field.
+        """
+
+        self.__db_cursor.execute(
+            'CREATE TABLE IF NOT EXISTS status_database_tables('
+            'app_tests TEXT, event_names TEXT, per_event_fields TEXT)')
+        self.__db_cursor.execute(
+            'CREATE TABLE IF NOT EXISTS status_database_instances('
+            'instance_dir TEXT PRIMARY KEY, first_event_id INTEGER, last_event_id INTEGER, '
+            'test_instance_id INTEGER, event_names TEXT, per_event_fields TEXT)')
+        self.__db_cursor.execute(
+            'CREATE TABLE IF NOT EXISTS status_database_names('
+            'kind TEXT, name TEXT, count INTEGER, PRIMARY KEY(kind, name))')
+
+    #--------------------------------------------------------------------------
+
+    def __read_tables_info(self):
+        """Return the app/test list and the (event names, per event fields) the tables were built with."""
 
-        #---Two python dicts that will be converted to sql databases.
+        for (app_tests, event_names, per_event_fields) in self.__db_cursor.execute(
+                'SELECT app_tests, event_names, per_event_fields FROM status_database_tables'):
+            return app_tests, (set(json.loads(event_names)), set(json.loads(per_event_fields)))
 
-        self.__event_data = {}
-        self.__test_instance_data = {}
+        return None, None
+
+    #--------------------------------------------------------------------------
 
-        self.__event_names = set(
-            ['_'.join(stf.EVENT_DICT[event][1:3]) for event in stf.EVENT_LIST])
+    def __read_schema(self):
+        """Return the (event names, per event fields) of the test instances in the tables.
 
-        self.__event_fields = set()
+        The event names are those of the harness events plus any other
+        event logged. The per event fields are the fields of
+        StatusFile.FIELDS_PER_EVENT plus any field whose value differs
+        between the events of a test instance.
+        """
 
-        self.__event_fields = set(stf.FIELDS_PER_TEST_INSTANCE +
-                                  stf.FIELDS_PER_EVENT)
+        stf = StatusFile #---Convenience variable.
 
+        event_names = set(['_'.join(stf.EVENT_DICT[event][1:3]) for event in stf.EVENT_LIST])
         per_event_fields = set(stf.FIELDS_PER_EVENT)
 
-        #---PASS 1: loop to ingest information from disk files and compute
-        #---some information.
+        for (kind, name) in self.__db_cursor.execute(
+                'SELECT kind, name FROM status_database_names WHERE count > 0'):
+            (event_names if kind == 'event_name' else per_event_fields).add(name)
 
-        for test_info in self.__input_file.get_tests():
-            app, test = test_info[0:2]
+        return event_names, per_event_fields
 
-            self.__event_data.setdefault(app, {}).setdefault(test, {})
+    #--------------------------------------------------------------------------
 
-            status_dir = os.path.join(self.__path_to_tests, app, test, apptest_layout.test_status_dirname)
-            test_ids = ([d for d in os.listdir(status_dir)
-                         if re.search(r'^[0-9.]+$', d)
-                         and os.path.isdir(os.path.join(status_dir, d))]
-                        if os.path.exists(status_dir) else [])
+    @staticmethod
+    def __make_instance(status_dir, app_test, test_id, event_dicts):
+        """Collect the events of a test instance, and the fields whose values differ between them."""
+
+        events = {}
+
+        #---For every field of every event in the test instance,
+        #---collect the values it can take.
+
+        fields_values = {}
+
+        #---Process events that were recorded for this test instance.
+
+        for event_dict in event_dicts:
+
+            #---Record all field/value pairs for this event.
+
+            for field, value in event_dict.items():
+                fields_values.setdefault(field, set()).add(value)
 
-            #---Loop over test instances for this app and test.
+            #---ISSUE: should we check app, test,
+            #---test_id etc. for consistency.
 
-            for test_id in test_ids:
-                self.__event_data[app][test][test_id] = {}
+            #---ISSUE: should we extract event name from event filename
 
-                test_id_dir = os.path.join(status_dir, test_id)
-                event_filenames = [f for f in os.listdir(test_id_dir) if
-                                   os.path.isfile(os.path.join(test_id_dir, f))
-                                   and re.search(r'^Event_.*\.txt$', f)]
+            assert 'event_name' in event_dict, (
+                'Event file does not contain event name')
 
-                #---For every field of every event in the test instance,
-                #---collect the values it can take.
+            events[event_dict['event_name']] = event_dict
 
-                fields_values = {}
+        #---Find fields that can have nonuniform values across
+        #---the events of a test instance.
+
+        per_event_fields = set(field for field, values in fields_values.items()
+                               if len(values) > 1)
+
+        return {'instance_dir': os.path.join(status_dir, test_id),
+                'app': app_test[0], 'test': app_test[1], 'test_id': test_id,
+                'events': events, 'per_event_fields': per_event_fields}
+
+    #--------------------------------------------------------------------------
+
+    def __count_names(self, instances, increment):
+        """Add increment to the counts of the event names and per event fields of some test instances."""
+
+        self.__db_cursor.executemany(
+            'INSERT INTO status_database_names(kind, name, count) VALUES(?, ?, ?) '
+            'ON CONFLICT(kind, name) DO UPDATE SET count = count + excluded.count',
+            [(kind, name, increment)
+             for instance in instances
+             for kind, names in (('event_name', instance['events']),
+                                 ('per_event_field', instance['per_event_fields']))
+             for name in names])
+
+    #--------------------------------------------------------------------------
+
+    def __forget_instance(self, instance_dir):
+        """Delete the rows of a test instance, and its event names and per event fields."""
+
+        row = self.__db_cursor.execute(
+            'SELECT first_event_id, last_event_id, test_instance_id, event_names, per_event_fields '
+            'FROM status_database_instances WHERE instance_dir = ?', (instance_dir,)).fetchone()
+        if row == None:
+            return
+
+        (first_event_id, last_event_id, test_instance_id, event_names, per_event_fields) = row
+
+        self.__db_cursor.execute('DELETE FROM events WHERE id BETWEEN ? AND ?',
+                                 (first_event_id, last_event_id))
+        self.__db_cursor.execute('DELETE FROM test_instances WHERE id = ?', (test_instance_id,))
+        self.__count_names([{'events': json.loads(event_names),
+                             'per_event_fields': json.loads(per_event_fields)}], -1)
+        self.__db_cursor.execute('DELETE FROM status_database_names WHERE count <= 0')
+        self.__db_cursor.execute('DELETE FROM status_database_instances WHERE instance_dir = ?',
+                                 (instance_dir,))
+
+    #--------------------------------------------------------------------------
 
-                #---Process events that were recorded for this test instance.
+    def __rebuild_tables(self, app_tests, app_tests_json, event_cache):
+        """Rebuild the events and test_instances tables from all cached events."""
 
-                for event_filename in event_filenames:
+        for table in ('events', 'test_instances', 'status_database_tables',
+                      'status_database_instances', 'status_database_names'):
+            self.__db_cursor.execute('DROP TABLE IF EXISTS ' + table)
+        self.__create_tables()
 
-                    file_ = open(os.path.join(test_id_dir, event_filename), 'r')
-                    line = file_.read()
-                    file_.close()
+        status_dir_events = event_cache.read_events(list(app_tests))
 
-                    line = re.sub('\n', '', line)
-                    f_vs = [f_v.split('=') for f_v in line.split('\t')
-                            if len(f_v.split('=')) == 2]
+        instances = [StatusDatabase.__make_instance(status_dir, app_tests[status_dir], test_id, event_dicts)
+                     for status_dir, test_id_events in status_dir_events.items()
+                     for test_id, event_dicts in test_id_events.items()]
+        self.__count_names(instances, 1)
+        schema = self.__read_schema()
 
-                    #---Record all field/value pairs for this event.
+        #---Initialize sqlite tables.
 
-                    event_dict = {}
-                    for f_v in f_vs:
-                        field, value = tuple(f_v)
-                        for field2 in stf.FIELDS_SPLUNK_SPECIAL:
-                            if re.search('_' + field2 + '$', field):
-                                continue
-                        event_dict[field] = value
-                        if field in fields_values:
-                            fields_values[field].add(value)
-                        else:
-                            fields_values[field] = set([value])
+        (event_fields, test_instance_fields) = StatusDatabase.__table_fields(schema)
 
-                    #---ISSUE: should we check app, test,
-                    #---test_id etc. for consistency.
+        self.__db_cursor.execute(
+            'CREATE TABLE events(id INTEGER PRIMARY KEY, ' +
+            ' TEXT, '.join(event_fields) + ' TEXT)')
+        self.__db_cursor.execute(
+            'CREATE TABLE test_instances(id INTEGER PRIMARY KEY, ' +
+            ' TEXT, '.join(test_instance_fields) + ' TEXT)')
 
-                    #---ISSUE: should we extract event name from event filename
+        #---Insert all rows, then index the tables.
 
-                    assert 'event_name' in event_dict, (
-                        'Event file does not contain event name')
+        self.__insert_instances(instances, schema)
+        self.__create_indexes('events', event_fields)
+        self.__create_indexes('test_instances', test_instance_fields)
 
-                    event_name = event_dict['event_name']
+        self.__db_cursor.execute(
+            'INSERT INTO status_database_tables(app_tests, event_names, per_event_fields) VALUES(?, ?, ?)',
+            (app_tests_json, json.dumps(sorted(schema[0])), json.dumps(sorted(schema[1]))))
 
-                    self.__event_data[app][test][test_id][event_name] = (
-                        event_dict)
+        #---Gather statistics for the query planner to choose indexes.
 
-                    self.__event_names.add(event_name)
+        self.__db_cursor.execute('ANALYZE')
 
-                    self.__event_fields.union(set(list(event_dict.keys())))
+    #--------------------------------------------------------------------------
 
-                #---Find fields that can have nonuniform values across
-                #---the events of a test instance.
+    @staticmethod
+    def __table_fields(schema):
+        """Return the columns of the events and test_instances tables, in order."""
 
-                for field, values in fields_values.items():
-                    if len(values) > 1:
-                        per_event_fields.add(field)
+        stf = StatusFile #---Convenience variable.
+        (event_names, per_event_fields) = schema
 
-        #---Finish building global field lists.
+        event_fields = set(stf.FIELDS_PER_TEST_INSTANCE + stf.FIELDS_PER_EVENT)
 
         #---Test instance fields are composed of fields that have
         #---invariant values across events of a test instance,
         #---plus the others which are replicated by event name.
 
-        self.__test_instance_fields = self.__event_fields.difference(
-            per_event_fields)
+        test_instance_fields = event_fields.difference(per_event_fields)
         for field in per_event_fields:
-            for event_name in self.__event_names:
+            for event_name in event_names:
                 #---For each event-specific field, give the field a name
                 #---that denotes the event name.
-                new_field = event_name + '_' + field
-                self.__test_instance_fields.add(new_field)
+                test_instance_fields.add(event_name + '_' + field)
 
-        #---Initialize sqlite database, tables.
+        #---Fix the column order used for creating and filling the tables.
 
-        self.__db = sqlite3.connect(':memory:')
-        self.__db_cursor = self.__db.cursor()
-        self.__db_cursor.execute(
-            'CREATE TABLE events(id INTEGER PRIMARY KEY, ' +
-            ' TEXT, '.join(list(self.__event_fields)) + ' TEXT)')
-        self.__db_cursor.execute(
-            'CREATE TABLE test_instances(id INTEGER PRIMARY KEY, ' +
-            ' TEXT, '.join(list(self.__test_instance_fields)) + ' TEXT)')
+        return sorted(event_fields), sorted(test_instance_fields)
 
-        #---PASS 2: form test_instance data; make all records consistent.
+    #--------------------------------------------------------------------------
 
-        for app in self.__event_data:
-            for test in self.__event_data[app]:
-                self.__test_instance_data.setdefault(
-                    app, {}).setdefault(test, {})
-                for test_id in self.__event_data[app][test]:
-                    test_instance_dict = {}
+    def __insert_instances(self, instances, schema):
+        """Insert the rows of some test instances; make all records consistent."""
 
-                    events = self.__event_data[app][test][test_id]
+        no_value = StatusDatabase.NO_VALUE #---Convenience variable.
+        (event_names, per_event_fields) = schema
+        (event_fields, test_instance_fields) = StatusDatabase.__table_fields(schema)
 
-                    #---Add events to event table in database.
+        #---Rows are collected here and inserted in bulk at the end.
 
-                    for event_name in events:
+        event_rows = []
+        test_instance_rows = []
+        instance_rows = []
 
-                        event_dict = events[event_name]
+        (event_id, test_instance_id) = self.__db_cursor.execute(
+            'SELECT (SELECT ifnull(max(id), 0) FROM events), '
+            '(SELECT ifnull(max(id), 0) FROM test_instances)').fetchone()
 
-                        for field in self.__event_fields.difference(
-                                set(list(event_dict.keys()))):
-                            #---Add missing fields (as empty).
-                            #---WARNING: dynamic update - should be ok.
-                            event_dict[field] = no_value
+        for instance in instances:
+            test_instance_dict = {}
+            first_event_id = event_id + 1
 
-                        #---Add to database.
+            events = dict(instance['events'])
 
-                        self.__insert_into_db('events',
-                                              self.__event_fields, event_dict)
+            #---Add events to event table in database.
 
-                    #---Add missing events (as having fields with (mostly)
-                    #---empty values) to event table in database.
+            for event_name in events:
 
-                    for event_name in self.__event_names.difference(
-                            set(list(events.keys()))):
-                        event_dict = {f: no_value for f in self.__event_fields}
-                        #---ISSUE: should we fill more fields here.
-                        event_dict['app'] = app
-                        event_dict['test'] = test
-                        event_dict['test_id'] = test_id
-                        event_dict['test_instance'] = ','.join([app, test,
-                                                                test_id])
-                        #---Add to database.
+                event_dict = dict(events[event_name])
 
-                        event_dict['event_name'] = event_name
-                        #---WARNING: dynamic update - should be ok.
-                        events[event_name] = event_dict
+                for field in set(event_fields).difference(event_dict.keys()):
+                    #---Add missing fields (as empty).
+                    event_dict[field] = no_value
 
-                        self.__insert_into_db('events',
-                                              self.__event_fields, event_dict)
+                events[event_name] = event_dict
 
-                    #---Get fields, values for test instance.
+                #---Add to database.
 
-                    for event_name, event_dict in events.items():
+                event_id += 1
+                event_rows.append(dict(event_dict, id=event_id))
 
-                        #---Add fields for current event.
+            #---Add missing events (as having fields with (mostly)
+            #---empty values) to event table in database.
 
-                        for field, value in event_dict.items():
+            for event_name in sorted(event_names.difference(events.keys())):
+                event_dict = {f: no_value for f in event_fields}
+                #---ISSUE: should we fill more fields here.
+                event_dict['app'] = instance['app']
+                event_dict['test'] = instance['test']
+                event_dict['test_id'] = instance['test_id']
+                event_dict['test_instance'] = ','.join([instance['app'], instance['test'],
+                                                        instance['test_id']])
+                #---Add to database.
 
-                            #---For each event-specific field, give the field a
-                            #---name that denotes the event name.
-                            new_field = (event_name + '_' + field
-                                     if field in per_event_fields else field)
+                event_dict['event_name'] = event_name
+                events[event_name] = event_dict
 
-                            #---Add to dict if not yet there or there but null.
-                            if not new_field in test_instance_dict:
-                                test_instance_dict[new_field] = value
-                            elif test_instance_dict[new_field] == no_value:
-                                test_instance_dict[new_field] = value
+                event_id += 1
+                event_rows.append(dict(event_dict, id=event_id))
 
-                    #---Add any missing fields (as having empty values).
+            #---Get fields, values for test instance.
 
-                    for field in self.__test_instance_fields:
-                        if not field in test_instance_dict:
-                            test_instance_dict[field] = no_value
+            for event_name, event_dict in events.items():
 
-                    #---Add test_instance data to database.
+                #---Add fields for current event.
 
-                    self.__test_instance_data[app][test][test_id] = (
-                        test_instance_dict)
+                for field, value in event_dict.items():
 
-                    #---Add to database.
+                    #---For each event-specific field, give the field a
+                    #---name that denotes the event name.
+                    new_field = (event_name + '_' + field
+                                 if field in per_event_fields else field)
 
-                    self.__insert_into_db('test_instances',
-                                          self.__test_instance_fields,
-                                          test_instance_dict)
+                    #---Add to dict if not yet there or there but null.
+                    if not new_field in test_instance_dict:
+                        test_instance_dict[new_field] = value
+                    elif test_instance_dict[new_field] == no_value:
+                        test_instance_dict[new_field] = value
 
-        return self #---for chaining.
+            #---Add any missing fields (as having empty values).
+
+            for field in test_instance_fields:
+                if not field in test_instance_dict:
+                    test_instance_dict[field] = no_value
+
+            #---Add to database.
+
+            test_instance_id += 1
+            test_instance_dict['id'] = test_instance_id
+            test_instance_rows.append(test_instance_dict)
+
+            instance_rows.append((instance['instance_dir'], first_event_id, event_id, test_instance_id,
+                                  json.dumps(sorted(instance['events'])),
+                                  json.dumps(sorted(instance['per_event_fields']))))
+
+        self.__insert_into_db('events', ['id'] + event_fields, event_rows)
+        self.__insert_into_db('test_instances', ['id'] + test_instance_fields,
+                              test_instance_rows)
+        self.__db_cursor.executemany(
+            'INSERT INTO status_database_instances(instance_dir, first_event_id, last_event_id, '
+            'test_instance_id, event_names, per_event_fields) VALUES(?, ?, ?, ?, ?, ?)',
+            instance_rows)
 
     #--------------------------------------------------------------------------
 
-    def __insert_into_db(self, table_name, fields, values_dict):
-        """Create a record in the sqlite database."""
+    def __insert_into_db(self, table_name, fields, values_dicts):
+        """Create records in the sqlite database.
 
-        self.__db_cursor.execute(
+        The caller is responsible for committing the transaction.
+        """
+
+        self.__db_cursor.executemany(
             'INSERT INTO ' + table_name + '(' +
-            ','.join(list(fields)) + ') ' +
+            ','.join(fields) + ') ' +
             'VALUES(:' +
-            ', :'.join(list(fields)) + ')',
-            values_dict)
-        self.__db.commit()
+            ', :'.join(fields) + ')',
+            values_dicts)
 
     #--------------------------------------------------------------------------
 
-    def query(self, query_string):
-        """Execute a query against the database, return result."""
+    def __create_indexes(self, table_name, fields):
+        """Create the indexes of a table listed in INDEXES.
+
+        Event times are ISO 8601 strings, so they sort and compare correctly
+        as text. Queries often wrap them in datetime(), so an index on that
+        expression is created for every indexed time column as well.
+        """
+
+        for columns in StatusDatabase.INDEXES[table_name]:
+            if not set(columns).issubset(fields):
+                continue
+            self.__db_cursor.execute(
+                'CREATE INDEX ' + table_name + '_' + '_'.join(columns) +
+                ' ON ' + table_name + '(' + ', '.join(columns) + ')')
+            if len(columns) == 1 and columns[0].endswith('_time'):
+                self.__db_cursor.execute(
+                    'CREATE INDEX ' + table_name + '_datetime_' + columns[0] +
+                    ' ON ' + table_name + '(datetime(' + columns[0] + '))')
+
+    #--------------------------------------------------------------------------
+
+    def iter_query(self, query_string, parameters=()):
+        """Execute a query against the database, yield the result rows.
+
+        Rows are fetched from sqlite as they are consumed, so a result of
+        any size is processed in constant memory.
+
+        Parameters
+        ----------
+        query_string : str
+            The query, with ? or :name placeholders for its parameters.
 
-        self.__db_cursor.execute(query_string)
+        parameters : sequence or dict
+            (Optional) the values bound to the placeholders.
 
-        result = ''
+        Yields
+        ------
+        sqlite3.Row
+            The result rows, whose values can be accessed by index or by
+            column name.
+        """
 
-        for row in self.__db_cursor.fetchall():
-            result += ' '.join([str(f) for f in row]) + '\n'
+        cursor = self.__db.cursor()
+        cursor.row_factory = sqlite3.Row
+        try:
+            yield from cursor.execute(query_string, parameters)
+        finally:
+            cursor.close()
 
-        return result
+    #--------------------------------------------------------------------------
+
+    def query(self, query_string, parameters=()):
+        """Execute a query against the database, return result."""
+
+        return ''.join(StatusDatabase.__format_row(row)
+                       for row in self.iter_query(query_string, parameters))
 
     #--------------------------------------------------------------------------
 
-    def print_query(self, query_string):
+    def print_query(self, query_string, parameters=()):
         """Execute a query and output the result."""
 
-        sys.stdout.write(self.query(query_string))
+        for row in self.iter_query(query_string, parameters):
+            sys.stdout.write(StatusDatabase.__format_row(row))
 
         return self  #---for chaining.
 
     #--------------------------------------------------------------------------
 
+    def count_completed(self, interval=None, job_status=None):
+        """Count the test instances that completed.
+
+        Parameters
+        ----------
+        interval : str
+            (Optional) only count the test instances that completed within
+            this period before now, given as an sqlite date modifier such as
+            '1 day' or '12 hours'.
+
+        job_status : str
+            (Optional) only count the test instances whose check returned
+            this job status, e.g. '0' for passed.
+
+        Returns
+        -------
+        int
+        """
+
+        where, parameters = StatusDatabase.__completed_where(interval)
+        if job_status != None:
+            where += ' AND check_end_job_status = ?'
+            parameters.append(str(job_status))
+
+        for row in self.iter_query(
+                'SELECT count(*) FROM test_instances WHERE ' + where, parameters):
+            return row[0]
+
+    #--------------------------------------------------------------------------
+
+    def pass_rate(self, interval=None):
+        """Return the fraction of completed test instances that passed.
+
+        Parameters
+        ----------
+        interval : str
+            (Optional) only consider the test instances that completed
+            within this period before now, as in count_completed.
+
+        Returns
+        -------
+        float
+            The pass rate, or None if no test instance completed.
+        """
+
+        where, parameters = StatusDatabase.__completed_where(interval)
+
+        for (completed, passed) in self.iter_query(
+                'SELECT count(*), total(check_end_job_status = \'0\') '
+                'FROM test_instances WHERE ' + where, parameters):
+            return passed / completed if completed else None
+
+    #--------------------------------------------------------------------------
+
+    def completion_counts(self, period='day', interval=None):
+        """Yield the number of completed and passed test instances per period.
+
+        Parameters
+        ----------
+        period : str
+            The length of the periods, one of PERIOD_FORMATS.
+
+        interval : str
+            (Optional) only consider the test instances that completed
+            within this period before now, as in count_completed.
+
+        Yields
+        ------
+        tuple
+            (start of period, number completed, number passed), in time
+            order.
+        """
+
+        where, parameters = StatusDatabase.__completed_where(interval)
+        period_start = 'strftime(\'' + StatusDatabase.PERIOD_FORMATS[period] + '\', check_end_event_time)'
+
+        for row in self.iter_query(
+                'SELECT ' + period_start + ' AS period_start, count(*), '
+                'sum(check_end_job_status = \'0\') '
+                'FROM test_instances WHERE ' + where + ' '
+                'GROUP BY period_start ORDER BY period_start', parameters):
+            yield tuple(row)
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def __completed_where(interval):
+        """Return the condition and parameters selecting completed test instances."""
+
+        where = 'check_end_job_status IS NOT ?'
+        parameters = [StatusDatabase.NO_VALUE]
+
+        if interval != None:
+            #---Event times are local times; the condition matches the
+            #---datetime() index on check_end_event_time.
+            where += (' AND datetime(check_end_event_time) BETWEEN '
+                      'datetime(\'now\', \'localtime\', ?) AND '
+                      'datetime(\'now\', \'localtime\')')
+            parameters.append('-' + interval)
+
+        return where, parameters
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def __format_row(row):
+        """Format a result row as a line of text."""
+
+        return ' '.join([str(f) for f in row]) + '\n'
+
+    #--------------------------------------------------------------------------
+
 #------------------------------------------------------------------------------
+
+class StatusEventCache:
+    """On-disk cache of the harness event files ingested by StatusDatabase.
+
+    The cache records the inode and modification time of every status
+    directory and test instance directory, and the inode, modification time,
+    size and parsed contents of every event file. Event files are written
+    to a temporary file then renamed, so a test instance directory whose
+    inode and modification time are unchanged holds the same event files
+    and is not listed again. Event journals are appended to in place, so
+    they are checked by their own signature.
+
+    Some file systems (e.g. Lustre and NFS) keep modification times to the
+    second, so a directory changed in the second of a scan may keep its
+    modification time. A directory modified less than RECENT_MTIME_NS
+    before a scan is therefore cached without its modification time, and
+    listed again by every scan until it is older.
+
+    The directories are scanned and the event files parsed by a pool of
+    threads; only the calling thread accesses the cache database. The
+    cache database also holds the tables of StatusDatabase.
+    """
+
+    SCHEMA_VERSION = 3
+
+    RECENT_MTIME_NS = 2 * 1000 * 1000 * 1000
+    """int: The age in nanoseconds under which a directory modification time is not trusted."""
+
+    #--------------------------------------------------------------------------
+
+    def __init__(self, path_to_cache=':memory:', max_workers=None):
+        """Constructor - opens, and if needed creates, the cache.
+
+        Parameters
+        ----------
+        path_to_cache : str
+            The path to the sqlite cache file. 'none' or ':memory:' keep the
+            cache in memory only. If the file cannot be opened, a warning is
+            printed and an in-memory cache is used.
+
+        max_workers : int
+            (Optional) the number of threads scanning the file system.
+            Defaults to the ThreadPoolExecutor default.
+        """
+
+        if path_to_cache.lower() == 'none':
+            path_to_cache = ':memory:'
+
+        self.__max_workers = max_workers
+
+        try:
+            self.__db = sqlite3.connect(path_to_cache, timeout=60)
+            self.__create_tables()
+        except sqlite3.Error as e:
+            print('Warning: unable to use status database cache ' + path_to_cache + ': ' + str(e))
+            self.__db = sqlite3.connect(':memory:')
+            self.__create_tables()
+
+    #--------------------------------------------------------------------------
+
+    def update(self, status_dirs):
+        """Bring the cache up to date with some status directories.
+
+        The status directories are scanned without locking the cache. The
+        changes are then recorded in a transaction that is left open, so
+        that the caller can update its own tables in the cache in the same
+        transaction, then commit it. Concurrent updates of the cache are
+        serialized by this transaction.
+
+        Parameters
+        ----------
+        status_dirs : list
+            The Status directories of the app/tests.
+
+        Returns
+        -------
+        tuple
+            The event files of the test instances that are new or were
+            scanned again, keyed by (status directory, test id), to be
+            passed to _merge_events, and the list of the test instance
+            directories that were removed.
+        """
+
+        cached = {status_dir: self.__read_status_dir(status_dir)
+                  for status_dir in status_dirs}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+
+            #---List the status directories and stat their test instances.
+
+            scan_time_ns = time.time_ns()
+            listings = dict(zip(status_dirs, executor.map(
+                lambda status_dir: _scan_status_dir(status_dir, cached[status_dir], scan_time_ns),
+                status_dirs)))
+
+            #---Scan the test instance directories that changed.
+
+            changed_instance_dirs = [
+                (status_dir, test_id_dir, dir_signature)
+                for status_dir, listing in listings.items() if listing != None
+                for test_id_dir, dir_signature in listing[2].items()
+                if cached[status_dir]['instance_dirs'].get(test_id_dir) != dir_signature
+                or dir_signature[1] == None or test_id_dir in listing[3]]
+
+            cached_events = {test_id_dir: self.__read_instance_dir(test_id_dir)
+                             for status_dir, test_id_dir, dir_signature in changed_instance_dirs}
+
+            scans = list(executor.map(
+                lambda job: _scan_instance_dir(job[1], cached_events[job[1]]),
+                changed_instance_dirs))
+
+        self.__db.execute('BEGIN IMMEDIATE')
+
+        #---Record the test instance directories that were scanned. They are
+        #---all reported as changed: another process may have recorded their
+        #---event files since they were read from the cache above.
+
+        changed = {}
+
+        for (status_dir, test_id_dir, dir_signature), events in zip(
+                changed_instance_dirs, scans):
+            self.__update_instance_dir(status_dir, test_id_dir, dir_signature,
+                                       cached_events[test_id_dir], events)
+            changed[(status_dir, os.path.basename(test_id_dir))] = events
+
+        #---Record the status directories and forget the test instances
+        #---that no longer exist.
+
+        removed = []
+
+        for status_dir, listing in listings.items():
+            if listing == None:
+                removed.extend(cached[status_dir]['instance_dirs'])
+                self.__forget_status_dir(status_dir)
+                continue
+
+            signature, test_ids, instance_dirs, changed_journals = listing
+
+            if cached[status_dir]['signature'] != signature or signature[1] == None:
+                self.__db.execute(
+                    'INSERT OR REPLACE INTO status_dirs(path, inode, mtime_ns, test_ids) VALUES(?, ?, ?, ?)',
+                    (status_dir,) + signature + (json.dumps(test_ids),))
+
+            for test_id_dir in set(cached[status_dir]['instance_dirs']).difference(instance_dirs):
+                self.__db.execute('DELETE FROM instance_dirs WHERE path = ?', (test_id_dir,))
+                self.__db.execute('DELETE FROM event_files WHERE instance_dir = ?', (test_id_dir,))
+                removed.append(test_id_dir)
+
+        return changed, removed
+
+    #--------------------------------------------------------------------------
+
+    def read_events(self, status_dirs):
+        """Return the cached events of all test instances of some status directories.
+
+        Parameters
+        ----------
+        status_dirs : list
+            The Status directories of the app/tests.
+
+        Returns
+        -------
+        dict
+            For each status directory, the event dicts of each test id,
+            in event file name order.
+        """
+
+        status_dir_events = {}
+
+        for status_dir in status_dirs:
+            cached = self.__read_status_dir(status_dir, all_events=True)
+            status_dir_events[status_dir] = {
+                test_id: _merge_events(cached['event_files'].get(os.path.join(status_dir, test_id), {}))
+                for test_id in cached['test_ids']
+                if os.path.join(status_dir, test_id) in cached['instance_dirs']}
+
+        return status_dir_events
+
+    #--------------------------------------------------------------------------
+
+    @property
+    def connection(self):
+        """sqlite3.Connection: The connection to the cache."""
+
+        return self.__db
+
+    #--------------------------------------------------------------------------
+
+    def close(self):
+        """Close the cache."""
+
+        self.__db.close()
+
+    #--------------------------------------------------------------------------
+
+    def __create_tables(self):
+        """Create the cache tables, discarding a cache of another schema version."""
+
+        version = self.__db.execute('PRAGMA user_version').fetchone()[0]
+        if version != StatusEventCache.SCHEMA_VERSION:
+            tables = [row[0] for row in self.__db.execute(
+                'SELECT name FROM sqlite_master WHERE type = \'table\' AND name NOT LIKE \'sqlite_%\'')]
+            for table in tables:
+                self.__db.execute('DROP TABLE IF EXISTS ' + table)
+
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS status_dirs('
+            'path TEXT PRIMARY KEY, inode INTEGER, mtime_ns INTEGER, test_ids TEXT)')
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS instance_dirs('
+            'path TEXT PRIMARY KEY, status_dir TEXT, inode INTEGER, mtime_ns INTEGER)')
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS event_files('
+            'path TEXT PRIMARY KEY, instance_dir TEXT, status_dir TEXT, '
+            'inode INTEGER, mtime_ns INTEGER, size INTEGER, events_json TEXT)')
+        self.__db.execute(
+            'CREATE INDEX IF NOT EXISTS instance_dirs_status_dir ON instance_dirs(status_dir)')
+        self.__db.execute(
+            'CREATE INDEX IF NOT EXISTS event_files_status_dir ON event_files(status_dir)')
+        self.__db.execute(
+            'CREATE INDEX IF NOT EXISTS event_files_instance_dir ON event_files(instance_dir)')
+        self.__db.execute('PRAGMA user_version = ' + str(StatusEventCache.SCHEMA_VERSION))
+        self.__db.commit()
+
+    #--------------------------------------------------------------------------
+
+    def __read_status_dir(self, status_dir, all_events=False):
+        """Return what is cached for a status directory.
+
+        Unless all_events is set, only the signatures of the event journals
+        are read, which is all that scanning the directory needs.
+        """
+
+        cached = {'signature': None, 'test_ids': [],
+                  'instance_dirs': {}, 'event_files': {}}
+
+        row = self.__db.execute(
+            'SELECT inode, mtime_ns, test_ids FROM status_dirs WHERE path = ?',
+            (status_dir,)).fetchone()
+        if row != None:
+            cached['signature'] = row[0:2]
+            cached['test_ids'] = json.loads(row[2])
+
+        for (path, inode, mtime_ns) in self.__db.execute(
+                'SELECT path, inode, mtime_ns FROM instance_dirs WHERE status_dir = ?',
+                (status_dir,)):
+            cached['instance_dirs'][path] = (inode, mtime_ns)
+
+        if all_events:
+            rows = self.__db.execute(
+                'SELECT instance_dir, path, inode, mtime_ns, size, events_json FROM event_files '
+                'WHERE status_dir = ?', (status_dir,))
+        else:
+            rows = self.__db.execute(
+                'SELECT instance_dir, path, inode, mtime_ns, size, NULL FROM event_files '
+                'WHERE status_dir = ? AND path LIKE ?',
+                (status_dir, '%/' + apptest_layout.event_journal_filename))
+
+        for (instance_dir, path, inode, mtime_ns, size, events_json) in rows:
+            cached['event_files'].setdefault(instance_dir, {})[path] = (
+                (inode, mtime_ns, size), events_json)
+
+        return cached
+
+    #--------------------------------------------------------------------------
+
+    def __read_instance_dir(self, test_id_dir):
+        """Return the cached (signature, events JSON) of each event file of a test instance."""
+
+        return {path: ((inode, mtime_ns, size), events_json)
+                for (path, inode, mtime_ns, size, events_json) in self.__db.execute(
+                    'SELECT path, inode, mtime_ns, size, events_json FROM event_files '
+                    'WHERE instance_dir = ?', (test_id_dir,))}
+
+    #--------------------------------------------------------------------------
+
+    def __update_instance_dir(self, status_dir, test_id_dir, dir_signature,
+                              cached_events, events):
+        """Record the new, changed and removed event files of a test instance directory."""
+
+        self.__db.executemany(
+            'INSERT OR REPLACE INTO event_files'
+            '(path, instance_dir, status_dir, inode, mtime_ns, size, events_json) '
+            'VALUES(?, ?, ?, ?, ?, ?, ?)',
+            [(path, test_id_dir, status_dir) + signature + (events_json,)
+             for path, (signature, events_json) in events.items()
+             if cached_events.get(path) != (signature, events_json)])
+
+        self.__db.executemany(
+            'DELETE FROM event_files WHERE path = ?',
+            [(path,) for path in set(cached_events).difference(events)])
+
+        self.__db.execute(
+            'INSERT OR REPLACE INTO instance_dirs(path, status_dir, inode, mtime_ns) VALUES(?, ?, ?, ?)',
+            (test_id_dir, status_dir) + dir_signature)
+
+    #--------------------------------------------------------------------------
+
+    def __forget_status_dir(self, status_dir):
+        """Remove everything cached for a status directory."""
+
+        for table in ('instance_dirs', 'event_files'):
+            self.__db.execute('DELETE FROM ' + table + ' WHERE status_dir = ?', (status_dir,))
+        self.__db.execute('DELETE FROM status_dirs WHERE path = ?', (status_dir,))
+
+    #--------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+
+def _dir_signature(stat, scan_time_ns):
+    """Return the (inode, modification time) signature of a directory.
+
+    The modification time is None if it is within
+    StatusEventCache.RECENT_MTIME_NS of scan_time_ns, as the directory may
+    still change without its modification time changing.
+    """
+
+    if stat.st_mtime_ns > scan_time_ns - StatusEventCache.RECENT_MTIME_NS:
+        return (stat.st_ino, None)
+    return (stat.st_ino, stat.st_mtime_ns)
+
+#------------------------------------------------------------------------------
+
+def _scan_status_dir(status_dir, cached, scan_time_ns):
+    """List the test instances of a status directory.
+
+    The directory is only listed again if its signature changed, or has no
+    modification time. Returns None if the directory does not exist,
+    otherwise the signature of the directory, its test ids, the signature
+    of each test instance directory and the set of test instance
+    directories whose cached event journal changed.
+    """
+
+    try:
+        stat = os.stat(status_dir)
+    except FileNotFoundError:
+        return None
+
+    signature = _dir_signature(stat, scan_time_ns)
+
+    instance_dirs = {}
+
+    if cached['signature'] == signature and signature[1] != None:
+        test_ids = cached['test_ids']
+        for test_id in test_ids:
+            test_id_dir = os.path.join(status_dir, test_id)
+            try:
+                stat = os.stat(test_id_dir)
+            except FileNotFoundError:
+                continue
+            instance_dirs[test_id_dir] = _dir_signature(stat, scan_time_ns)
+    else:
+        test_ids = []
+        with os.scandir(status_dir) as entries:
+            for entry in entries:
+                if not re.search(r'^[0-9.]+$', entry.name) or not entry.is_dir():
+                    continue
+                test_ids.append(entry.name)
+                stat = entry.stat()
+                instance_dirs[entry.path] = _dir_signature(stat, scan_time_ns)
+
+    #---Appending to a journal does not change the directory, so check
+    #---the journals themselves.
+
+    changed_journals = set()
+    for test_id_dir in instance_dirs:
+        journal_path = os.path.join(test_id_dir, apptest_layout.event_journal_filename)
+        cached_events = cached['event_files'].get(test_id_dir, {})
+        if not journal_path in cached_events:
+            continue
+        try:
+            stat = os.stat(journal_path)
+        except FileNotFoundError:
+            changed_journals.add(test_id_dir)
+            continue
+        if cached_events[journal_path][0] != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            changed_journals.add(test_id_dir)
+
+    return (signature, test_ids, instance_dirs, changed_journals)
+
+#------------------------------------------------------------------------------
+
+def _scan_instance_dir(test_id_dir, cached_events):
+    """Return the (signature, events JSON) of each event file of a test instance.
+
+    The event files are the Event_*.txt files and the event journal. Only
+    the event files that are not in cached_events with the same signature
+    are read.
+    """
+
+    events = {}
+
+    try:
+        entries = list(os.scandir(test_id_dir))
+    except FileNotFoundError:
+        return events
+
+    for entry in entries:
+        is_journal = entry.name == apptest_layout.event_journal_filename
+        if not is_journal and not event_journal.EVENT_FILENAME_REGEX.search(entry.name):
+            continue
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if entry.path in cached_events and cached_events[entry.path][0] == signature:
+            events[entry.path] = cached_events[entry.path]
+        elif is_journal:
+            events[entry.path] = (signature, json.dumps(event_journal.read_journal(entry.path)))
+        else:
+            events[entry.path] = (signature, json.dumps([event_journal.read_event_file(entry.path)]))
+
+    return events
+
+#------------------------------------------------------------------------------
+
+def _merge_events(file_events):
+    """Return the events of a test instance, in event file name order.
+
+    An event recorded in the journal is taken from there rather than from
+    its Event_*.txt file.
+    """
+
+    events = {}
+
+    for path, (signature, events_json) in file_events.items():
+        if os.path.basename(path) == apptest_layout.event_journal_filename:
+            for event in json.loads(events_json):
+                events[event.get('event_filename')] = event
+
+    for path, (signature, events_json) in file_events.items():
+        if os.path.basename(path) != apptest_layout.event_journal_filename:
+            events.setdefault(os.path.basename(path), json.loads(events_json)[0])
+
+    return [events[name] for name in sorted(events)]
+
+#------------------------------------------------------------------------------
+
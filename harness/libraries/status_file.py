@@ -19,9 +19,32 @@ import abc
 import urllib
 import dateutil.parser
 import subprocess
+import fcntl
+import threading
+import json
+import uuid
 
 from libraries.layout_of_apps_directory import apptest_layout
 from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
+from libraries.event_pipeline import get_event_pipeline
+from libraries.system_log import get_system_log_writer
+from libraries import event_journal
+
+# fcntl locks only exclude other processes, so writers within this process,
+# e.g. concurrently launched tests, also take this lock. Moreover a process
+# loses all of its fcntl locks on a file as soon as it closes any descriptor
+# of the file, so threads that open a status file for reading take it too:
+# otherwise a reader could release the record lock of a writer.
+_STATUS_FILE_LOCK = threading.RLock()
+
+def _column_spans(line_format):
+    """Returns the (start, width) in characters of each column of a fixed width line format."""
+    spans = []
+    start = 0
+    for width in re.findall(r'%-(\d+)s', line_format):
+        spans.append((start, int(width)))
+        start += int(width) + 1
+    return spans
 
 class StatusFile:
     """Perform operations pertaining to logging the status of jobs."""
@@ -54,6 +77,8 @@ class StatusFile:
 
 
     __LINE_FORMAT = "%-28s %-50s %-20s %-10s %-20s %-15s %-15s %-15s\n"
+    __COLUMN_SPANS = _column_spans(__LINE_FORMAT)
+
     spaces_header = __LINE_FORMAT % (' ', ' ', ' ', ' ', ' ', ' ', ' ', ' ')
     hashes_header = str.replace(spaces_header, ' ', '#')
     column_header = __LINE_FORMAT % (f'# {STATUS_COLUMN_START}', STATUS_COLUMN_LAUNCH,
@@ -72,6 +97,27 @@ class StatusFile:
     COMMENT_LINE_INDICATOR = '#'
     """str: The comment character for the subtest status file."""
 
+    INDEX_FILENAME_FORMAT = '.{}.index'
+    """str: The format of the sidecar index filename, keyed on the status filename.
+
+    Each line of the index holds a unique id and the byte offset of its
+    record in the status file.
+    """
+
+    CHANGES_FILENAME_FORMAT = '.{}.changes'
+    """str: The format of the sidecar change log filename, keyed on the status filename.
+
+    Each in place update of a record appends a line with the byte offset of
+    the record and its summary class (see classify_status_record) before and
+    after the update. The first line, 'generation <id>', identifies the
+    change log: a rewrite of the status file starts a new, empty generation,
+    and so does StatusFileCursor.summary once the saved cursor has applied
+    every change, so the change log does not grow without bound.
+    """
+
+    CURSOR_FILENAME_FORMAT = '.{}.cursor'
+    """str: The format of the sidecar summary cursor filename, see StatusFileCursor."""
+
     #---Event identifiers.
 
     EVENT_LOGGING_START = 'LOGGING_START'
@@ -172,6 +218,17 @@ class StatusFile:
     #                                                    -
     #-----------------------------------------------------
 
+    # The status file column updated by each status file result mode.
+    __RESULT_MODE_COLUMNS = {
+        'Add_Job_ID' : STATUS_COLUMN_BATCH,
+        'Add_Build_Result' : STATUS_COLUMN_BUILD,
+        'Add_Run_Count' : STATUS_COLUMN_COUNT,
+        'Add_Submit_Result' : STATUS_COLUMN_SUBMIT,
+        'Add_Run_Result' : STATUS_COLUMN_CHECK,
+        'Add_Binary_Running' : STATUS_COLUMN_CHECK,
+        'Add_Run_Aborning' : STATUS_COLUMN_CHECK
+    }
+
     #-----------------------------------------------------
     #                                                    -
     # Standard values for test results of the status file-
@@ -281,10 +338,28 @@ class StatusFile:
         self.__logger = logger
         self.__test_id = test_id
         self.__db_logger = create_rgt_db_logger(logger=logger)
+        self.__event_pipeline = get_event_pipeline(logger=logger)
+
+        # The invariant fields of the current test instance, and the side
+        # files of the test instance as last read or written.
+        self.__test_instance_info = None
+        self.__side_file_cache = {}
 
         # The first task is set the path to status file.
         self.__status_file_path = path_to_status_file
 
+        # The index of unique id to byte offset of its record in the status
+        # file, and the unique id of the last record. The stamp is the
+        # (size, mtime) of the status file when the index was last validated.
+        # The offsets are loaded lazily.
+        (status_dir, status_filename) = os.path.split(path_to_status_file)
+        self.__index_path = os.path.join(status_dir, StatusFile.INDEX_FILENAME_FORMAT.format(status_filename))
+        self.__index_offsets = None
+        self.__index_last_id = None
+        self.__index_stamp = None
+        self.__index_lock = threading.RLock()
+        self.__changes_path = os.path.join(status_dir, StatusFile.CHANGES_FILENAME_FORMAT.format(status_filename))
+
         # The second task is to create the status file.
         self.__create_status_file(path_to_status_file)
 
@@ -324,16 +399,9 @@ class StatusFile:
         str
             The harness id of the latest entry in the subtest status file.
         """
-        with open(self.__status_file_path, "r") as file_obj:
-            records = file_obj.readlines()
-
-        line = records[-1]
-        words = line.rstrip().split()
-        unique_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]
-        if len(words) > unique_col:
-            subtest_harness_id = words[unique_col]
-        else:
-            subtest_harness_id = None
+        with self.__index_lock:
+            self.__refresh_index()
+            subtest_harness_id = self.__index_last_id
         return subtest_harness_id
 
     def log_event(self, event_id, event_value=NO_VALUE):
@@ -426,7 +494,7 @@ class StatusFile:
         """
         ret_value = True
 
-        with open(self.__status_file_path, 'r') as status_file_obj:
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, 'r') as status_file_obj:
             records = status_file_obj.readlines()
 
         verify_test_passed = lambda a_list : True if a_list.count(StatusFile.PASS) == 3 else False
@@ -448,62 +516,145 @@ class StatusFile:
     # Private methods #
     ###################
     def _subtest_already_initialized(self, unique_id):
-        found_instance = False
-
-        with open(self.__status_file_path, 'r') as status_file_obj:
-            records = status_file_obj.readlines()
+        return self.__get_harness_id_record(unique_id) != None
 
-        unique_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]
+    def __get_harness_id_record(self, harness_id):
+        record = None
 
-        for index, line in enumerate(records):
-            words = line.rstrip().split()
+        with self.__index_lock:
+            self.__refresh_index()
+            if harness_id in self.__index_offsets:
+                record = self.__read_record(self.__index_offsets[harness_id], harness_id)
+                if record == None:
+                    # The record moved since the index was written, for example
+                    # the status file was edited by hand. Rebuild and try again.
+                    self.__rebuild_index()
+                    if harness_id in self.__index_offsets:
+                        record = self.__read_record(self.__index_offsets[harness_id], harness_id)
 
-            if self.ignore_line(line):
-                continue
+        return record
 
-            if len(words) > unique_col:
-                test_id = words[unique_col]
-                if test_id == unique_id:
-                    found_instance = True
-                    break
+    def __get_all_harness_id(self):
+        with self.__index_lock:
+            self.__refresh_index()
+            harness_ids = sorted(self.__index_offsets, key=self.__index_offsets.get)
+        return harness_ids
 
-        return found_instance
+    #----------
 
-    def __get_harness_id_record(self, harness_id):
-        record = None
-        with open(self.__status_file_path, 'r') as status_file_obj:
-            records = status_file_obj.readlines()
+    def __read_record(self, offset, harness_id):
+        """Returns the status file record at offset if it belongs to harness_id, otherwise None."""
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, 'rb') as status_file_obj:
+            status_file_obj.seek(offset)
+            line = status_file_obj.readline().decode()
 
+        words = line.rstrip().split()
         unique_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]
+        if self.ignore_line(line) or len(words) <= unique_col or words[unique_col] != harness_id:
+            line = None
 
-        for index, line in enumerate(records):
-            if self.ignore_line(line):
-                continue
-            words = line.rstrip().split()
-            if len(words) > unique_col:
-                test_id = words[unique_col]
-                if test_id == harness_id:
-                    record = line
-                    break
+        return line
 
-        return record
-
-    def __get_all_harness_id(self):
-        with open(self.__status_file_path, 'r') as status_file_obj:
-            records = status_file_obj.readlines()
+    def __refresh_index(self):
+        """Brings the sidecar index up to date with the status file.
 
+        The index is trusted as long as the size and modification time of the
+        status file are unchanged since it was last validated. Otherwise the
+        last indexed record is verified and only the records appended after it
+        are scanned. If the verification fails the index is rebuilt. The
+        caller must hold the index lock.
+        """
+        stat = os.stat(self.__status_file_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp == self.__index_stamp:
+            return
+
+        if self.__index_offsets == None:
+            self.__index_offsets = self.__read_index_file()
+            if self.__index_offsets:
+                self.__index_last_id = max(self.__index_offsets, key=self.__index_offsets.get)
+
+        # Find the end of the last indexed record.
+        scan_start = 0
+        if self.__index_last_id != None:
+            last_offset = self.__index_offsets[self.__index_last_id]
+            last_record = self.__read_record(last_offset, self.__index_last_id)
+            if last_record == None:
+                self.__rebuild_index()
+                return
+            scan_start = last_offset + len(last_record.encode())
+
+        new_entries = self.__scan_status_file(scan_start)
+        for (harness_id, offset) in new_entries.items():
+            self.__index_offsets.setdefault(harness_id, offset)
+        if new_entries:
+            self.__index_last_id = next(reversed(new_entries))
+        self.__append_index_file(new_entries)
+        self.__index_stamp = stamp
+
+    def __rebuild_index(self):
+        """Rebuilds the sidecar index from the full status file."""
+        stat = os.stat(self.__status_file_path)
+        self.__index_offsets = self.__scan_status_file(0)
+        self.__index_last_id = next(reversed(self.__index_offsets), None)
+        self.__write_index_file(self.__index_offsets)
+        self.__index_stamp = (stat.st_size, stat.st_mtime_ns)
+
+    def __scan_status_file(self, offset):
+        """Returns a dict of unique id to byte offset for the records at or after offset."""
+        entries = {}
         unique_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]
 
-        harness_ids = []
-        for index, line in enumerate(records):
-            if self.ignore_line(line):
-                continue
-            words = line.rstrip().split()
-            if len(words) > unique_col:
-                test_id = words[unique_col]
-                harness_ids.append(test_id)
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, 'rb') as status_file_obj:
+            status_file_obj.seek(offset)
+            for raw_line in status_file_obj:
+                # Only index complete records, a partially appended
+                # record is picked up on the next refresh.
+                if not raw_line.endswith(b'\n'):
+                    break
+                line = raw_line.decode()
+                if not self.ignore_line(line):
+                    words = line.split()
+                    if len(words) > unique_col:
+                        entries.setdefault(words[unique_col], offset)
+                offset += len(raw_line)
+
+        return entries
+
+    def __read_index_file(self):
+        """Reads the sidecar index, returning an empty dict if it is missing or unreadable."""
+        entries = {}
+        try:
+            with open(self.__index_path, 'r') as index_file_obj:
+                for line in index_file_obj:
+                    words = line.split()
+                    if len(words) == 2 and words[1].isdigit():
+                        entries[words[0]] = int(words[1])
+        except OSError:
+            pass
+        return entries
+
+    def __append_index_file(self, entries):
+        # The index is only an accelerator, so failing to write it (e.g. a
+        # read-only reporting account) is not an error.
+        if not entries:
+            return
+        try:
+            with open(self.__index_path, 'a') as index_file_obj:
+                index_file_obj.writelines(f"{key} {value}\n" for (key, value) in entries.items())
+        except OSError:
+            pass
 
-        return harness_ids
+    def __write_index_file(self, entries):
+        index_path_partial = self.__index_path + '.partial.' + str(os.getpid())
+        try:
+            with open(index_path_partial, 'w') as index_file_obj:
+                index_file_obj.writelines(f"{key} {value}\n" for (key, value) in entries.items())
+            os.replace(index_path_partial, self.__index_path)
+        except OSError:
+            pass
+
+    #----------
 
     def __log_event(self, event_id, event_filename, event_type, event_subtype,
                     event_value, event_time = None):
@@ -519,10 +670,17 @@ class StatusFile:
         event_time = event_time.isoformat()
 
 
+        # The fields of the test instance are computed once per instance.
+        if (self.__test_instance_info == None or
+            self.__test_instance_info['test_id'] != self.__test_id):
+            self.__test_instance_info = get_test_instance_info(self.__test_id)
+
         # THE FOLLOWING FORMS THE OFFICIAL TEXT DESCRIBING THE EVENT.
         status_info = get_status_info(self.__test_id, event_type,
                                       event_subtype, event_value,
-                                      event_time, event_filename)
+                                      event_time, event_filename,
+                                      test_instance_info=self.__test_instance_info,
+                                      side_file_cache=self.__side_file_cache)
         event_record_string = event_time + '\t' + event_value
         status_info_dict = {}
         for key_value in status_info:
@@ -531,52 +689,76 @@ class StatusFile:
             status_info_dict[key_value[0]] = key_value[1]
         event_record_string += '\n'
 
-        # Write a temporary file with the event info, then
-        # (atomically) rename it to the permanent file,
-        # to avoid possibility of a partially completed file.
+        dir_head = os.path.split(self.__test_instance_info['cwd'])[0]
+        test_status_dir = os.path.join(dir_head, apptest_layout.test_status_dirname, str(self.__test_id))
+        journal_mode = event_journal.get_journal_mode()
 
-        dir_head = os.path.split(os.getcwd())[0]
-        file_path = os.path.join(dir_head, apptest_layout.test_status_dirname, str(self.__test_id),
-                                 event_filename)
-        if os.path.exists(file_path):
-            self.__logger.doWarningLogging('Warning: event log file already exists. ' + file_path)
+        # THE FOLLOWING CREATES THE OFFICIAL MASTER INDICATOR DENOTING
+        # THAT THE EVENT OCCURRED: its record in the event journal, or its
+        # Event_*.txt file.
+        if journal_mode != event_journal.MODE_FILES:
+            event_journal.append_event(test_status_dir, status_info_dict)
 
-        file_path_partial = os.path.join(dir_head, apptest_layout.test_status_dirname,
-                                         str(self.__test_id),
-                                         'partial.' + event_filename)
+        if journal_mode != event_journal.MODE_JOURNAL:
+            # Write a temporary file with the event info, then
+            # (atomically) rename it to the permanent file,
+            # to avoid possibility of a partially completed file.
 
-        file_ = open(file_path_partial, 'w')
-        file_.write(event_record_string)
-        file_.close()
+            file_path = os.path.join(test_status_dir, event_filename)
+            if os.path.exists(file_path):
+                self.__logger.doWarningLogging('Warning: event log file already exists. ' + file_path)
 
-        # THE FOLLOWING CREATES THE OFFICIAL MASTER INDICATOR DENOTING
-        # THAT THE EVENT OCCURRED.
-        os.rename(file_path_partial, file_path)
+            file_path_partial = os.path.join(test_status_dir, 'partial.' + event_filename)
+
+            file_ = open(file_path_partial, 'w')
+            file_.write(event_record_string)
+            file_.close()
+
+            os.rename(file_path_partial, file_path)
+
+        # Record the job status of the test instance. It is read back when
+        # the following events are logged, so it is always written here.
+        if event_id == StatusFile.EVENT_JOB_QUEUED:
+            self.__write_job_status(self.__test_id, test_status_dir, '-1')
+        elif event_id == StatusFile.EVENT_BINARY_EXECUTE_START:
+            self.__write_job_status(self.__test_id, test_status_dir, event_value)
+
+        # The rest of the event is handled in the background when the event
+        # pipeline is enabled.
+        if self.__event_pipeline != None:
+            self.__event_pipeline.put(self.__finish_event, self.__test_id, event_id,
+                                      event_value, status_info, status_info_dict)
+        else:
+            self.__finish_event(self.__test_id, event_id, event_value,
+                                status_info, status_info_dict)
+
+        return event_time
+
+    def __finish_event(self, test_id, event_id, event_value, status_info, status_info_dict):
+        """Logs an event to the system log, the status file and the databases."""
 
         # Put the same event data on the system log.
 
-        write_system_log(self.__test_id, status_info)
+        write_system_log(test_id, status_info)
 
         # Update the status file appropriately.
         if event_id == StatusFile.EVENT_BUILD_END:
-            self.__status_file_add_result(event_value, mode="Add_Build_Result")
+            self.__status_file_add_result(test_id, event_value, mode="Add_Build_Result")
         elif event_id == StatusFile.EVENT_SUBMIT_START:
-            self.__status_file_add_result(event_value, mode="Add_Run_Count")
+            self.__status_file_add_result(test_id, event_value, mode="Add_Run_Count")
         elif event_id == StatusFile.EVENT_SUBMIT_END:
-            self.__status_file_add_result(event_value, mode="Add_Submit_Result")
+            self.__status_file_add_result(test_id, event_value, mode="Add_Submit_Result")
         elif event_id == StatusFile.EVENT_JOB_QUEUED:
-            self.__status_file_add_result(event_value, mode="Add_Job_ID")
-            self.__status_file_add_result('-1', mode="Add_Run_Aborning")
+            self.__status_file_add_result(test_id, event_value, mode="Add_Job_ID")
+            self.__status_file_add_result(test_id, '-1', mode="Add_Run_Aborning")
         elif event_id == StatusFile.EVENT_BINARY_EXECUTE_START:
-            self.__status_file_add_result(event_value,
+            self.__status_file_add_result(test_id, event_value,
                                           mode="Add_Binary_Running")
         elif event_id == StatusFile.EVENT_CHECK_END:
-            self.__status_file_add_result(event_value, mode="Add_Run_Result")
+            self.__status_file_add_result(test_id, event_value, mode="Add_Run_Result")
 
         self.__db_logger.log_event(status_info_dict)
 
-        return event_time
-
     #----------
 
     def __create_status_file(self,path_to_status_file):
@@ -587,114 +769,489 @@ class StatusFile:
 
     #----------
 
-    def __status_file_add_result(self, event_value, mode):
+    def __write_job_status(self, test_id, test_status_dir, job_status):
+        """Write the job status file of a test instance in the status file."""
+        if self.__get_harness_id_record(test_id) != None:
+            path2 = os.path.join(test_status_dir, apptest_layout.job_status_filename)
+            file_obj2 = open(path2, 'w')
+            file_obj2.write(job_status)
+            file_obj2.flush()
+            # Remember what was written so the next event need not re-read it.
+            stat = os.fstat(file_obj2.fileno())
+            self.__side_file_cache[path2] = ((stat.st_ino, stat.st_size, stat.st_mtime_ns),
+                                             job_status.split('\n')[0])
+            file_obj2.close()
+
+    #----------
+
+    def __status_file_add_result(self, test_id, event_value, mode):
         """Update the status file to reflect a new event."""
 
-        #---Read the status file.
-        status_file = open(self.__status_file_path, 'r')
-        records = status_file.readlines()
-        status_file.close()
-        #event_time = datetime.datetime.now().isoformat()
+        column = StatusFile.STATUS_COLUMNS[StatusFile.__RESULT_MODE_COLUMNS[mode]]
 
-        for index, line in enumerate(records):
+        #---Overwrite just the column of this test's record. If the record
+        #---is not in the fixed width layout, or the value does not fit in
+        #---the column, then fall back to rewriting the status file.
+        if not self.__status_file_update_column(test_id, column, event_value):
+            self.__status_file_rewrite_column(test_id, column, event_value)
 
-            # Get the uid for this run instance
+    #----------
 
-            words = line.rstrip().split()
+    def __status_file_update_column(self, test_id, column, event_value):
+        """Overwrites one column of a test's record in place.
 
-            if len(words) < len(StatusFile.STATUS_COLUMNS):
-                continue
+        The column is written with a single pwrite while holding an fcntl
+        lock on the byte range of the record, so concurrent instances of the
+        test updating their own records do not serialize on or clobber the
+        whole file.
 
-            test_id = words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]]
+        Returns
+        -------
+        bool
+            True if the column was updated, False if the record could not be
+            updated in place.
+        """
+        # Look up the offset with the record, the index may be rebuilt by
+        # another thread as soon as the index lock is released.
+        with self.__index_lock:
+            record = self.__get_harness_id_record(test_id)
+            offset = self.__index_offsets.get(test_id)
+        if record == None:
+            return False
 
-            if test_id != self.__test_id:
-                continue
+        (column_start, column_width) = StatusFile.__COLUMN_SPANS[column]
+        value = event_value.encode()
+        if not self.__is_fixed_width_record(record) or len(value) > column_width or len(value.split()) != 1:
+            return False
 
-            if mode == 'Add_Job_ID':
-                batch_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BATCH]
-                words[batch_col] = event_value
+        record = record.encode()
+        with _STATUS_FILE_LOCK:
+            fd = os.open(self.__status_file_path, os.O_RDWR)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, len(record), offset, os.SEEK_SET)
 
-            if mode == 'Add_Build_Result':
-                build_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BUILD]
-                words[build_col] = event_value
+                # A rewrite of the status file may have moved the record since it
+                # was looked up, so check it is still there now that it is locked.
+                if os.pread(fd, len(record), offset) != record:
+                    return False
 
-            if mode == 'Add_Run_Count':
-                count_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_COUNT]
-                words[count_col] = event_value
+                os.pwrite(fd, value.ljust(column_width), offset + column_start)
 
-            if mode == 'Add_Submit_Result':
-                submit_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_SUBMIT]
-                words[submit_col] = event_value
+                # Log the change while the record is still locked, so a
+                # StatusFileCursor sees either both or neither.
+                words = record.decode().split()
+                old_class = classify_status_record(words)
+                words[column] = event_value
+                new_class = classify_status_record(words)
+                self.__log_change(f"{offset} {old_class} {new_class}")
+            finally:
+                os.close(fd)
 
-            if mode == 'Add_Run_Result':
-                check_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]
-                words[check_col] = event_value
+        return True
 
-            if mode == 'Add_Binary_Running':
-                binary_running_value = event_value
+    def __is_fixed_width_record(self, record):
+        """Checks that every value of the record lies within its column."""
+        if len(record.encode()) != len(StatusFile.spaces_header):
+            return False
+        values = [record[start:start + width].strip() for (start, width) in StatusFile.__COLUMN_SPANS]
+        return values == record.split()
 
-                check_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]
-                words[check_col] = binary_running_value
+    def __status_file_rewrite_column(self, test_id, column, event_value):
+        """Rewrites the status file with one column of a test's records updated."""
 
-                dir_head = os.path.split(os.getcwd())[0]
-                path2 = os.path.join(dir_head, apptest_layout.test_status_dirname, test_id,
-                                     apptest_layout.job_status_filename)
-                file_obj2 = open(path2, 'w')
-                file_obj2.write(binary_running_value)
-                file_obj2.close()
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, 'r+') as status_file:
+            # Lock the whole file, including anything appended while we hold it.
+            fcntl.lockf(status_file, fcntl.LOCK_EX)
 
-            if mode == 'Add_Run_Aborning':
-                aborning_run_value = event_value
-                check_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]
-                words[check_col] = aborning_run_value
-
-                dir_head = os.path.split(os.getcwd())[0]
-                path2 = os.path.join(dir_head, apptest_layout.test_status_dirname, test_id,
-                                     apptest_layout.job_status_filename)
-                file_obj2 = open(path2, 'w')
-                file_obj2.write(aborning_run_value)
-                file_obj2.close()
-
-            records[index] = StatusFile.__LINE_FORMAT % (
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_START]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_LAUNCH]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_COUNT]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BATCH]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BUILD]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_SUBMIT]],
-                words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]])
-
-        #---Update the status file.
-        status_file = open(self.__status_file_path, 'w')
-        status_file.writelines(records)
-        status_file.close()
+            #---Read the status file.
+            records = status_file.readlines()
+
+            for index, line in enumerate(records):
+
+                # Get the uid for this run instance
+
+                words = line.rstrip().split()
+
+                if len(words) < len(StatusFile.STATUS_COLUMNS):
+                    continue
+
+                if words[StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE]] != test_id:
+                    continue
+
+                words[column] = event_value
+
+                records[index] = StatusFile.__LINE_FORMAT % tuple(words[:len(StatusFile.STATUS_COLUMNS)])
+
+            #---Update the status file.
+            status_file.seek(0)
+            status_file.writelines(records)
+            status_file.truncate()
+
+            # Records may have moved, so summaries must start over.
+            start_change_log(self.__changes_path)
+
+    def __log_change(self, change):
+        """Appends a line to the change log of the status file."""
+        with open(self.__changes_path, 'a') as changes_file:
+            changes_file.write(change + '\n')
 
     #----------
 
     def __status_file_add_test_instance(self, event_time, launch_id, unique_id):
         """Start new line in master status file for app/test."""
 
-        with open(self.__status_file_path, "a") as file_obj:
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, "a") as file_obj:
+            # Do not append in the middle of a rewrite of the status file.
+            fcntl.lockf(file_obj, fcntl.LOCK_EX)
             format_ = StatusFile.__LINE_FORMAT % (
                 event_time, launch_id, unique_id, StatusFile.PLACE_HOLDER,
                 StatusFile.PLACE_HOLDER, StatusFile.PLACE_HOLDER,
                 StatusFile.PLACE_HOLDER, StatusFile.PLACE_HOLDER)
             file_obj.write(format_)
 
+        # Index the new record. Only the records appended after the last
+        # indexed one are scanned.
+        with self.__index_lock:
+            self.__refresh_index()
+
+#------------------------------------------------------------------------------
+
+def start_change_log(changes_path):
+    """Replaces the change log of a status file with a new, empty generation.
+
+    The caller must hold the status file lock and an exclusive fcntl lock
+    on the status file, or a shared one that excludes the in place updates.
+
+    Parameters
+    ----------
+    changes_path : str
+        The path of the change log.
+
+    Returns
+    -------
+    tuple
+        The generation of the new change log and its size in bytes.
+    """
+    generation = uuid.uuid4().hex
+    header = f'generation {generation}\n'
+    changes_path_partial = changes_path + '.partial.' + str(os.getpid())
+    with open(changes_path_partial, 'w') as changes_file:
+        changes_file.write(header)
+    os.replace(changes_path_partial, changes_path)
+    return (generation, len(header.encode()))
+
+def read_change_log_generation(changes_file):
+    """Returns the generation of an open change log, '' for a change log without one.
+
+    Change logs are created without a generation by the first in place
+    update of a status file, and by versions that logged 'reset' instead.
+    """
+    changes_file.seek(0)
+    words = changes_file.readline().split()
+    if len(words) == 2 and words[0] == 'generation':
+        return words[1]
+    return ''
+
+#------------------------------------------------------------------------------
+
+def classify_status_record(words):
+    """Returns how a status file record counts in a status summary.
+
+    Parameters
+    ----------
+    words : list
+        The values of the record.
+
+    Returns
+    -------
+    str
+        'passed', 'failed' or 'inconclusive' for a record with build, submit
+        and check results, otherwise 'none' for a record that is not counted.
+    """
+    if len(words) < len(StatusFile.STATUS_COLUMNS):
+        return 'none'
+
+    build_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BUILD]
+    submit_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_SUBMIT]
+    check_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]
+
+    # Conservative check
+    if not (words[build_col].isdigit() and words[submit_col].isdigit() and words[check_col].isdigit()):
+        return 'none'
+
+    check_val = int(words[check_col])
+    if check_val == 0:
+        return 'passed'
+    elif check_val == 1:
+        return 'failed'
+    else:
+        return 'inconclusive'
+
+#------------------------------------------------------------------------------
+
+class StatusFileCursor:
+    """Keeps a running summary of a status file, parsing only what changed.
+
+    The cursor is saved next to the status file. It holds the byte offset
+    up to which the status file has been parsed, the last record parsed (whose
+    start time, launch ID and unique ID detect a rewritten file), the generation of the change log and the offset
+    reached in it, and the number of passed, failed and inconclusive records.
+    Updating the summary applies the changes logged by StatusFile since the
+    last update and parses the records appended since then. The applied
+    changes are then dropped from the change log.
+    """
+
+    CLASSES = ('passed', 'failed', 'inconclusive')
+
+    def __init__(self, path_to_status_file):
+        (status_dir, status_filename) = os.path.split(path_to_status_file)
+        self.__status_file_path = path_to_status_file
+        self.__changes_path = os.path.join(status_dir, StatusFile.CHANGES_FILENAME_FORMAT.format(status_filename))
+        self.__cursor_path = os.path.join(status_dir, StatusFile.CURSOR_FILENAME_FORMAT.format(status_filename))
+
+    def summary(self):
+        """Returns the number of passed, failed and inconclusive records of the status file.
+
+        Returns
+        -------
+        dict
+            The counts, keyed by the names of StatusFileCursor.CLASSES.
+        """
+        with _STATUS_FILE_LOCK, open(self.__status_file_path, 'rb') as status_file_obj:
+            # Hold off in place updates and appends while catching up.
+            fcntl.lockf(status_file_obj, fcntl.LOCK_SH)
+            cursor = self.__read_cursor(status_file_obj)
+            if cursor == None or not self.__apply_changes(cursor):
+                cursor = self.__new_cursor(status_file_obj)
+                self.__apply_changes(cursor)
+            self.__parse_appended_records(cursor, status_file_obj)
+            self.__compact_changes(cursor)
+
+        self.__write_cursor(cursor)
+        return dict(cursor['counts'])
+
+    def __new_cursor(self, status_file_obj):
+        (changes_generation, changes_size) = ('', 0)
+        if os.path.exists(self.__changes_path):
+            with open(self.__changes_path, 'r') as changes_file:
+                changes_generation = read_change_log_generation(changes_file)
+                changes_size = os.fstat(changes_file.fileno()).st_size
+        return {'inode' : os.fstat(status_file_obj.fileno()).st_ino,
+                'offset' : 0,
+                'last_record' : '',
+                'changes_generation' : changes_generation,
+                'changes_offset' : changes_size,
+                'counts' : {name : 0 for name in StatusFileCursor.CLASSES}}
+
+    def __read_cursor(self, status_file_obj):
+        """Returns the saved cursor, or None if there is none or it does not match the status file."""
+        try:
+            with open(self.__cursor_path, 'r') as cursor_file:
+                cursor = json.load(cursor_file)
+        except (OSError, ValueError):
+            return None
+
+        stat = os.fstat(status_file_obj.fileno())
+        try:
+            last_record = cursor['last_record'].encode()
+            if (cursor['inode'] != stat.st_ino or cursor['offset'] > stat.st_size or
+                len(last_record) > cursor['offset']):
+                return None
+        except (KeyError, TypeError, AttributeError):
+            return None
+        status_file_obj.seek(cursor['offset'] - len(last_record))
+        if not self.__is_same_record(status_file_obj.read(len(last_record)), last_record):
+            return None
+
+        return cursor
+
+    def __is_same_record(self, record, last_record):
+        """Checks that record is last_record, allowing for in place updates of its results.
+
+        The results of a record are updated in place while its test runs, and
+        those changes are applied from the change log, so only the columns
+        that never change identify the record.
+        """
+        if not record.endswith(b'\n'):
+            return False
+        last_words = last_record.split()
+        if len(last_words) < len(StatusFile.STATUS_COLUMNS):
+            return record == last_record
+        num_fixed_columns = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_UNIQUE] + 1
+        return record.split()[:num_fixed_columns] == last_words[:num_fixed_columns]
+
+    def __apply_changes(self, cursor):
+        """Applies the logged changes of parsed records, returns False if the cursor must start over."""
+        if not os.path.exists(self.__changes_path):
+            return cursor['changes_offset'] == 0 and cursor.get('changes_generation') == ''
+
+        with open(self.__changes_path, 'r') as changes_file:
+            # A new generation means the status file was rewritten, or the
+            # changes were compacted after this cursor was saved.
+            if read_change_log_generation(changes_file) != cursor.get('changes_generation'):
+                return False
+            changes_file.seek(0, os.SEEK_END)
+            if changes_file.tell() < cursor['changes_offset']:
+                return False
+            changes_file.seek(cursor['changes_offset'])
+            changes = changes_file.read()
+
+        # Only complete lines are applied.
+        changes = changes[:changes.rfind('\n') + 1]
+        cursor['changes_offset'] += len(changes.encode())
+
+        for change in changes.splitlines():
+            words = change.split()
+            if words == ['reset']:
+                return False
+            (offset, old_class, new_class) = (int(words[0]), words[1], words[2])
+            # Records not yet parsed are counted as they are when parsed.
+            if offset < cursor['offset']:
+                if old_class in cursor['counts']:
+                    cursor['counts'][old_class] -= 1
+                if new_class in cursor['counts']:
+                    cursor['counts'][new_class] += 1
+
+        return True
+
+    def __compact_changes(self, cursor):
+        """Drops the changes this cursor has applied from the change log."""
+        header_size = len(f"generation {cursor['changes_generation']}\n".encode()) if cursor['changes_generation'] else 0
+        if cursor['changes_offset'] <= header_size:
+            return
+        # Compact only if every logged change has been applied.
+        if os.path.getsize(self.__changes_path) != cursor['changes_offset']:
+            return
+        # Like the cursor, compacting is only an optimization.
+        try:
+            (cursor['changes_generation'], cursor['changes_offset']) = start_change_log(self.__changes_path)
+        except OSError:
+            pass
+
+    def __parse_appended_records(self, cursor, status_file_obj):
+        status_file_obj.seek(cursor['offset'])
+        for raw_line in status_file_obj:
+            # Stop at a partially appended record.
+            if not raw_line.endswith(b'\n'):
+                break
+            line = raw_line.decode()
+            if not StatusFile.ignore_line(line):
+                record_class = classify_status_record(line.split())
+                if record_class in cursor['counts']:
+                    cursor['counts'][record_class] += 1
+            cursor['offset'] += len(raw_line)
+            cursor['last_record'] = line
+
+    def __write_cursor(self, cursor):
+        # The cursor is only an accelerator, so failing to save it (e.g. a
+        # read-only reporting account) is not an error.
+        cursor_path_partial = self.__cursor_path + '.partial.' + str(os.getpid())
+        try:
+            with open(cursor_path_partial, 'w') as cursor_file:
+                json.dump(cursor, cursor_file)
+            os.replace(cursor_path_partial, self.__cursor_path)
+        except OSError:
+            pass
+
 #------------------------------------------------------------------------------
 
 def get_status_info(test_id, event_type, event_subtype,
-                    event_value, event_time, event_filename):
-    """Create a data structure with verbose info for an event."""
+                    event_value, event_time, event_filename,
+                    test_instance_info=None, side_file_cache=None):
+    """Create a data structure with verbose info for an event.
+
+    Parameters
+    ----------
+    test_instance_info : dict
+        (Optional) the fields of the test instance, as returned by
+        get_test_instance_info. They are computed if not provided.
+
+    side_file_cache : dict
+        (Optional) a cache of the side files of the test instance (job id,
+        job status and check alias), see read_side_file.
+    """
 
     no_value = StatusFile.NO_VALUE
 
     #---Set up dicts to capture info.
 
-    test_instance_info = {}
+    if test_instance_info == None:
+        test_instance_info = get_test_instance_info(test_id)
     event_info = {}
 
+    dir_head1 = os.path.split(test_instance_info['cwd'])[0]
+    dir_status = os.path.join(dir_head1, apptest_layout.test_status_dirname)
+    dir_status_this_test = os.path.join(dir_status, test_id)
+
+    #---
+
+    event_info['event_name'] = event_type + '_' + event_subtype
+    event_info['event_type'] = event_type
+    event_info['event_subtype'] = event_subtype
+    event_info['event_time'] = event_time
+    event_info['event_filename'] = event_filename
+    event_info['event_value'] = (
+        str(event_value) if event_value else no_value)
+
+    event_info['runtag'] = test_instance_info['rgt_system_log_tag']
+
+    file_check_alias = os.path.join(test_instance_info['run_archive'], 'check_alias.txt')
+    check_alias_ = read_side_file(file_check_alias, side_file_cache)
+    if check_alias_ != None:
+        event_info['check_alias'] = check_alias_
+    else:
+        event_info['check_alias'] = no_value
+
+    file_job_id = os.path.join(dir_status_this_test, apptest_layout.job_id_filename)
+    job_id_ = read_side_file(file_job_id, side_file_cache)
+    if job_id_ != None:
+        event_info['job_id'] = re.sub(' ', '', job_id_)
+    else:
+        event_info['job_id'] = no_value
+
+    file_job_status = os.path.join(dir_status_this_test, apptest_layout.job_status_filename)
+    job_status_ = read_side_file(file_job_status, side_file_cache)
+    if job_status_ != None:
+        event_info['job_status'] = re.sub(' ', '', job_status_)
+    else:
+        event_info['job_status'] = no_value
+
+    #---Construct status_info.
+
+    status_info = []
+
+    #---NOTE: order matters here.  It is assumed (by Splunk) that
+    #---all items strictly after test_instance will be invariant
+    #---across all events for a given test instance.
+    assert StatusFile.FIELDS_PER_TEST_INSTANCE[-1] == 'test_instance'
+
+    for field in StatusFile.FIELDS_PER_TEST_INSTANCE:
+        status_info.append([field, test_instance_info[field]])
+
+    for field in StatusFile.FIELDS_PER_EVENT:
+        status_info.append([field, event_info[field]])
+
+    for field in StatusFile.FIELDS_SPLUNK_SPECIAL:
+        #---Something extra to help Splunk:
+        status_info.append([event_info['event_name']+'_'+field,
+                            event_info[field]])
+
+    return status_info
+
+#------------------------------------------------------------------------------
+
+def get_test_instance_info(test_id):
+    """Create a dict with the fields of a test instance that are invariant across its events.
+
+    The fields are those of StatusFile.FIELDS_PER_TEST_INSTANCE. They are
+    derived from the environment and the current directory, which must be
+    the Scripts directory of the test.
+    """
+
+    no_value = StatusFile.NO_VALUE
+
+    test_instance_info = {}
+
     #---Construct fields to be used for log entry.
 
     test_instance_info['user'] = os.environ['USER']
@@ -713,9 +1270,6 @@ def get_status_info(test_id, event_type, event_subtype,
         test_instance_info['test'] + ',' +
         test_instance_info['test_id'])
 
-    dir_status = os.path.join(dir_head1, apptest_layout.test_status_dirname)
-    dir_status_this_test = os.path.join(dir_status, test_id)
-
     run_archive_all = os.path.join(dir_head1, apptest_layout.test_run_archive_dirname)
     test_instance_info['run_archive'] = os.path.join(run_archive_all, test_id)
 
@@ -750,66 +1304,49 @@ def get_status_info(test_id, event_type, event_subtype,
         os.environ['RGT_SYSTEM_LOG_TAG']
         if 'RGT_SYSTEM_LOG_TAG' in os.environ else no_value)
 
-    #---
+    return test_instance_info
 
-    event_info['event_name'] = event_type + '_' + event_subtype
-    event_info['event_type'] = event_type
-    event_info['event_subtype'] = event_subtype
-    event_info['event_time'] = event_time
-    event_info['event_filename'] = event_filename
-    event_info['event_value'] = (
-        str(event_value) if event_value else no_value)
-
-    event_info['runtag'] = test_instance_info['rgt_system_log_tag']
-
-    file_check_alias = os.path.join(run_archive_all, test_id, 'check_alias.txt')
-    if os.path.exists(file_check_alias):
-        file_ = open(file_check_alias, 'r')
-        check_alias_ = file_.read()
-        file_.close()
-        event_info['check_alias'] = check_alias_.split('\n')[0]
-    else:
-        event_info['check_alias'] = no_value
-
-    file_job_id = os.path.join(dir_status_this_test, apptest_layout.job_id_filename)
-    if os.path.exists(file_job_id):
-        file_ = open(file_job_id, 'r')
-        job_id_ = file_.read()
-        file_.close()
-        event_info['job_id'] = re.sub(' ', '', job_id_.split('\n')[0])
-    else:
-        event_info['job_id'] = no_value
-
-    file_job_status = os.path.join(dir_status_this_test, apptest_layout.job_status_filename)
-    if os.path.exists(file_job_status):
-        file_ = open(file_job_status, 'r')
-        job_status_ = file_.read()
-        file_.close()
-        event_info['job_status'] = re.sub(' ', '', job_status_.split('\n')[0])
-    else:
-        event_info['job_status'] = no_value
-
-    #---Construct status_info.
-
-    status_info = []
+#------------------------------------------------------------------------------
 
-    #---NOTE: order matters here.  It is assumed (by Splunk) that
-    #---all items strictly after test_instance will be invariant
-    #---across all events for a given test instance.
-    assert StatusFile.FIELDS_PER_TEST_INSTANCE[-1] == 'test_instance'
+def read_side_file(file_path, side_file_cache=None):
+    """Returns the first line of a side file of a test instance, or None if it doesn't exist.
 
-    for field in StatusFile.FIELDS_PER_TEST_INSTANCE:
-        status_info.append([field, test_instance_info[field]])
+    The side files (job id, job status, check alias) are written by the
+    harness processes of a test instance and by its check script. When a
+    cache dict is provided, the file is re-read only if it was written since
+    it was last read, as judged by a single stat of the file.
 
-    for field in StatusFile.FIELDS_PER_EVENT:
-        status_info.append([field, event_info[field]])
+    Parameters
+    ----------
+    file_path : str
+        The path to the side file.
 
-    for field in StatusFile.FIELDS_SPLUNK_SPECIAL:
-        #---Something extra to help Splunk:
-        status_info.append([event_info['event_name']+'_'+field,
-                            event_info[field]])
+    side_file_cache : dict
+        (Optional) maps the path of a side file to its stat signature and
+        first line when it was last read or written.
+    """
+    if side_file_cache == None:
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r') as file_:
+            return file_.read().split('\n')[0]
+
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        side_file_cache.pop(file_path, None)
+        return None
+
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if file_path in side_file_cache and side_file_cache[file_path][0] == signature:
+        return side_file_cache[file_path][1]
+
+    with open(file_path, 'r') as file_:
+        first_line = file_.read().split('\n')[0]
+    side_file_cache[file_path] = (signature, first_line)
+    return first_line
 
-    return status_info
+#------------------------------------------------------------------------------
 
 def get_status_info_from_file(event_filename):
     """
@@ -837,18 +1374,11 @@ def get_status_info_from_file(event_filename):
 #------------------------------------------------------------------------------
 
 def write_system_log(test_id, status_info):
-    """Write a system log entry for an event."""
+    """Write a system log entry for an event.
 
-    #---Use Unix logger command unless (valid) directory requested.
-
-    rgt_system_log_dir = (os.environ['RGT_SYSTEM_LOG_DIR']
-        if 'RGT_SYSTEM_LOG_DIR' in os.environ else '')
-
-    is_using_unix_logger = False
-    if rgt_system_log_dir == '':
-        is_using_unix_logger = True
-    elif not os.path.exists(rgt_system_log_dir):
-        is_using_unix_logger = True
+    The entry goes to the local syslog unless RGT_SYSTEM_LOG_DIR names an
+    existing directory, see system_log.py.
+    """
 
     rgt_system_log_tag = (os.environ['RGT_SYSTEM_LOG_TAG']
         if 'RGT_SYSTEM_LOG_TAG' in os.environ else '')
@@ -856,38 +1386,17 @@ def write_system_log(test_id, status_info):
     if rgt_system_log_tag == '':
         return
 
-    #---Construct log string.
-
-    #TODO: make quote a function ...
-
-    quote = '\\"' if is_using_unix_logger else '"'
-
-    log_string = ''
-
-    for key_value in status_info:
-        if log_string != '':
-            log_string += ' '
-        log_string += key_value[0] + '=' + quote + key_value[1] + quote
-
-    #---Write log.
-
-    if is_using_unix_logger:
-        os.system('logger -p local0.notice "' + log_string + '"')
+    writer = get_system_log_writer()
 
-    else:
-        dir_head1 = os.path.split(os.getcwd())[0]
-        (dir_head2, test) = os.path.split(dir_head1)
-        app = os.path.split(dir_head2)[1]
-
-        log_file = (app + '_#_' +
-                    test + '_#_' +
+    log_file = None
+    if not writer.uses_syslog:
+        status_info_dict = dict(status_info)
+        log_file = (status_info_dict['app'] + '_#_' +
+                    status_info_dict['test'] + '_#_' +
                     test_id + #---Alt: could use uuid.uuid1()
                     '.txt')
-        log_path = os.path.join(rgt_system_log_dir, log_file)
 
-        file_ = open(log_path, 'a')
-        file_.write(log_string + '\n')
-        file_.close()
+    writer.write(status_info, log_file=log_file)
 
 #------------------------------------------------------------------------------
 
@@ -912,9 +1421,10 @@ def parse_status_file(path_to_status_file, startdate, enddate,
     else:
         return shash
 
-    sfile_obj = open(path_to_status_file, 'r')
-    sfile_lines = sfile_obj.readlines()
-    sfile_obj.close()
+    with _STATUS_FILE_LOCK:
+        sfile_obj = open(path_to_status_file, 'r')
+        sfile_lines = sfile_obj.readlines()
+        sfile_obj.close()
 
     start_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_START]
     batch_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BATCH]
@@ -962,7 +1472,11 @@ def parse_status_file(path_to_status_file, startdate, enddate,
 #------------------------------------------------------------------------------
 
 def parse_status_file2(path_to_status_file):
-    """Function: parse_status_file2. Parser for rgt_status_file.txt"""
+    """Function: parse_status_file2. Parser for rgt_status_file.txt
+
+    Only the records appended or updated since the last call are parsed,
+    see StatusFileCursor.
+    """
 
     number_of_tests = 0
     number_of_passed_tests = 0
@@ -979,33 +1493,13 @@ def parse_status_file2(path_to_status_file):
     if not os.path.exists(path_to_status_file):
         return shash
 
-    sfile_obj = open(path_to_status_file, 'r')
-    sfile_lines = sfile_obj.readlines()
-    sfile_obj.close()
-
-    build_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_BUILD]
-    submit_col = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_SUBMIT]
-    check_col  = StatusFile.STATUS_COLUMNS[StatusFile.STATUS_COLUMN_CHECK]
-
     print('Parsing status file ' + path_to_status_file)
-    for line in sfile_lines:
-        tmpline = line.lstrip()
-        if not StatusFile.ignore_line(tmpline):
-            number_of_tests += 1
-            words = tmpline.split()
+    counts = StatusFileCursor(path_to_status_file).summary()
 
-            # Get the number of passed tests.
-            # Conservative check
-            if words[build_col].isdigit() and words[submit_col].isdigit() and words[check_col].isdigit():
-                check_val = int(words[check_col])
-                if check_val == 0:
-                    number_of_passed_tests += 1
-                elif check_val == 1:
-                    number_of_failed_tests += 1
-                elif check_val >= 2:
-                    number_of_inconclusive_tests += 1
-            else:
-                number_of_tests -= 1
+    number_of_passed_tests = counts['passed']
+    number_of_failed_tests = counts['failed']
+    number_of_inconclusive_tests = counts['inconclusive']
+    number_of_tests = number_of_passed_tests + number_of_failed_tests + number_of_inconclusive_tests
 
     shash = {'number_of_tests': number_of_tests,
              'number_of_passed_tests': number_of_passed_tests,
@@ -1024,9 +1518,10 @@ def parse_status_file2(path_to_status_file):
 def summarize_status_file(path_to_status_file, startdate, enddate,
                           mycomputer_with_events_record):
     """Parse, collect summary info from rgt_status.txt."""
-    sfile_obj = open(path_to_status_file, 'r')
-    sfile_lines = sfile_obj.readlines()
-    sfile_obj.close()
+    with _STATUS_FILE_LOCK:
+        sfile_obj = open(path_to_status_file, 'r')
+        sfile_lines = sfile_obj.readlines()
+        sfile_obj.close()
 
     number_of_tests = 0
     number_of_passed_tests = 0
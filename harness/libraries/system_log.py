@@ -0,0 +1,226 @@
+#! /usr/bin/env python3
+"""
+This module implements the system log of harness events.
+
+Each event is written as one structured record, either to the local syslog
+(facility local0, priority notice) or, when RGT_SYSTEM_LOG_DIR names an
+existing directory, appended to a per-test-instance file in that directory.
+Records may be buffered and written in batches.
+"""
+
+import atexit
+import json
+import os
+import sys
+import syslog
+import threading
+
+FORMAT_KEY_VALUE = 'keyvalue'
+"""str: Records are written as key="value" pairs separated by spaces."""
+
+FORMAT_JSON = 'json'
+"""str: Records are written as JSON objects."""
+
+PERMITTED_FORMATS = (FORMAT_KEY_VALUE, FORMAT_JSON)
+
+DEFAULT_BATCH_SIZE = 1
+"""int: The default number of buffered records that triggers a write."""
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+"""float: The default maximum number of seconds a record stays buffered."""
+
+_system_log_writer = None
+_system_log_writer_lock = threading.Lock()
+
+def get_system_log_writer():
+    """Returns the system log writer of this process.
+
+    The writer is configured from the environment the first time it is
+    requested, and is flushed when the process exits, after the event
+    pipeline is closed.
+
+    Returns
+    -------
+    SystemLogWriter
+    """
+    global _system_log_writer
+
+    with _system_log_writer_lock:
+        if _system_log_writer == None:
+            _system_log_writer = SystemLogWriter.from_environment()
+
+    return _system_log_writer
+
+def _flush_system_log_writer():
+    with _system_log_writer_lock:
+        writer = _system_log_writer
+    if writer != None:
+        writer.flush()
+
+# Registered when the module is imported, which is before the event pipeline
+# registers its own exit handler, so that the records the pipeline writes
+# while it is closed are still flushed.
+atexit.register(_flush_system_log_writer)
+
+def format_record(fields, format_=FORMAT_KEY_VALUE):
+    """Formats the fields of an event as a single line record.
+
+    Parameters
+    ----------
+    fields : list
+        The [key, value] pairs of the event, in order.
+
+    format_ : str
+        One of PERMITTED_FORMATS.
+
+    Returns
+    -------
+    str
+    """
+    if format_ == FORMAT_JSON:
+        return json.dumps(dict(fields))
+
+    return ' '.join(key + '="' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+                    for (key, value) in fields)
+
+class SystemLogWriter:
+    """Writes and batches system log records."""
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Class methods                                                   @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    @classmethod
+    def from_environment(cls):
+        """Returns a writer configured by the RGT_SYSTEM_LOG_* environment variables."""
+        log_dir = os.getenv('RGT_SYSTEM_LOG_DIR', '')
+        if log_dir != '' and not os.path.exists(log_dir):
+            log_dir = ''
+
+        format_ = os.getenv('RGT_SYSTEM_LOG_FORMAT', FORMAT_KEY_VALUE).lower()
+        if format_ not in PERMITTED_FORMATS:
+            format_ = FORMAT_KEY_VALUE
+
+        batch_size = DEFAULT_BATCH_SIZE
+        value = os.getenv('RGT_SYSTEM_LOG_BATCH_SIZE', '')
+        if value.isdigit() and int(value) > 0:
+            batch_size = int(value)
+
+        flush_interval = DEFAULT_FLUSH_INTERVAL
+        try:
+            flush_interval = float(os.getenv('RGT_SYSTEM_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+        except ValueError:
+            pass
+
+        return cls(log_dir=log_dir, format_=format_,
+                   batch_size=batch_size, flush_interval=flush_interval)
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Special methods                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __init__(self, log_dir='', format_=FORMAT_KEY_VALUE,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Constructor.
+
+        Parameters
+        ----------
+        log_dir : str
+            The directory of the per-test-instance log files. If empty, the
+            records are written to the local syslog.
+
+        format_ : str
+            The record format, one of PERMITTED_FORMATS.
+
+        batch_size : int
+            The number of buffered records that triggers a write. A batch
+            size of 1 writes every record immediately.
+
+        flush_interval : float
+            The maximum number of seconds a record stays buffered.
+        """
+        self.__log_dir = log_dir
+        self.__format = format_
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+
+        # The buffered records, grouped by log file path (None for syslog).
+        self.__buffer = {}
+        self.__num_buffered = 0
+        self.__lock = threading.Lock()
+        self.__timer = None
+
+        if self.__log_dir == '':
+            # Tag records like the logger command does, with the user name.
+            syslog.openlog(ident=os.getenv('USER', 'rgt'), facility=syslog.LOG_LOCAL0)
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Public methods.                                                 @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    @property
+    def uses_syslog(self):
+        return self.__log_dir == ''
+
+    def write(self, fields, log_file=None):
+        """Buffers a record, writing the buffer if it is full.
+
+        Parameters
+        ----------
+        fields : list
+            The [key, value] pairs of the event, in order.
+
+        log_file : str
+            The name of the log file in the log directory. Ignored when
+            writing to syslog.
+        """
+        record = format_record(fields, self.__format)
+        path = None if self.uses_syslog else os.path.join(self.__log_dir, log_file)
+
+        with self.__lock:
+            self.__buffer.setdefault(path, []).append(record)
+            self.__num_buffered += 1
+            if self.__num_buffered >= self.__batch_size:
+                self.__write_buffer()
+            elif self.__timer == None:
+                self.__timer = threading.Timer(self.__flush_interval, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+
+    def flush(self):
+        """Writes all buffered records."""
+        with self.__lock:
+            self.__write_buffer()
+
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+    #                                                                 @
+    # Private methods.                                                @
+    #                                                                 @
+    #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+
+    def __write_buffer(self):
+        """Writes the buffered records. The caller must hold the lock."""
+        if self.__timer != None:
+            self.__timer.cancel()
+            self.__timer = None
+
+        (buffer, self.__buffer, self.__num_buffered) = (self.__buffer, {}, 0)
+
+        for (path, records) in buffer.items():
+            if path == None:
+                for record in records:
+                    syslog.syslog(syslog.LOG_NOTICE, record)
+            else:
+                # A log file that cannot be written must not cost the
+                # records of the other log files.
+                try:
+                    with open(path, 'a') as file_:
+                        file_.write('\n'.join(records) + '\n')
+                except OSError as e:
+                    print(f"Failed to write {len(records)} system log records to {path}: {e}", file=sys.stderr)
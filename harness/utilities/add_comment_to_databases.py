@@ -106,9 +106,9 @@ def influxdb_get_results(db):
 
         return running_query
 
-    results = db.query(build_query())
+    results = db.iter_query(build_query())
     ret = []
-    # filter out unwanted/incomplete/irrelevant results
+    # filter out unwanted/incomplete/irrelevant results as they are received
     for r in results:
         missing_entries = []
         for e in InfluxDBLogger.INFLUX_TAGS:
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Purpose:
+#   Measure the database logging path of the harness against a local stand-in
+#   for an InfluxDB server. Synthetic events, metrics, node health results and
+#   queries are sent through RgtDatabaseLogger and InfluxDBLogger, and the
+#   throughput and latency of each are reported. The database settings of the
+#   environment (RGT_DATABASE_BATCH, RGT_INFLUXDB_COMPRESSION, ...) apply, so
+#   runs with different settings can be compared.
+################################################################################
+
+import argparse
+import concurrent.futures
+import datetime
+import gzip
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
+from libraries.rgt_loggers import rgt_logger_factory
+
+# The events of a test instance, in the order the harness logs them
+EVENT_NAMES = ['logging_start', 'build_start', 'build_end', 'submit_start', 'submit_end', 'job_queued',
+               'binary_execute_start', 'binary_execute_end', 'check_start', 'check_end']
+
+# The database settings of the environment that are replaced by the mock server
+ISOLATED_ENVVARS = ['RGT_INFLUXDB_URI', 'RGT_INFLUXDB_TOKEN', 'RGT_INFLUXDB_BUCKET', 'RGT_INFLUXDB_ORG',
+                    'RGT_INFLUXDB_DISABLE', 'RGT_INFLUXDB_DRY_RUN', 'RGT_SQLITE_URI', 'RGT_DATABASE_SPOOL_DIR']
+
+class MockInfluxDB:
+    """A local stand-in for the /api/v2/buckets, /api/v2/write and /api/v2/query endpoints of InfluxDB.
+
+    Every response is delayed by the given latency, and the given fraction
+    of writes is answered with an error status. The server runs on its own
+    threads until stop() is called.
+    """
+
+    def __init__(self, bucket='benchmark', org='benchmark', latency=0.0, error_rate=0.0,
+                 error_status=503, query_rows=1000):
+        self.bucket = bucket
+        self.org = org
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.query_rows = query_rows
+
+        self.__lock = threading.Lock()
+        self.stats = None
+        self.reset_stats()
+
+        mock = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and bodies are written separately, which Nagle's algorithm would
+            # delay by the client's delayed ACK (~40 ms) and mistake for server latency
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                return
+
+            def do_GET(self):
+                mock._handle(self, 'GET')
+
+            def do_POST(self):
+                mock._handle(self, 'POST')
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    @property
+    def uri(self):
+        return f'http://127.0.0.1:{self.__server.server_port}/?org={self.org}&bucket={self.bucket}'
+
+    def reset_stats(self):
+        """ Starts counting the requests anew. Returns the counts until now. """
+        with self.__lock:
+            (stats, self.stats) = (self.stats, {'requests': 0, 'writes': 0, 'bytes': 0, 'errors': 0})
+        return stats
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def _handle(self, handler, method):
+        body = b''
+        if 'Content-Length' in handler.headers:
+            body = handler.rfile.read(int(handler.headers['Content-Length']))
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        path = urlparse(handler.path).path
+        if method == 'GET' and path == '/api/v2/buckets':
+            self._count(requests=1)
+            self._reply(handler, 200, json.dumps({'buckets': [{'name': self.bucket}]}).encode(), 'application/json')
+        elif method == 'POST' and path == '/api/v2/write':
+            if self.error_rate > 0 and random.random() < self.error_rate:
+                self._count(requests=1, errors=1)
+                self._reply(handler, self.error_status, b'{"code":"unavailable","message":"injected error"}', 'application/json')
+                return
+            if handler.headers.get('Content-Encoding') == 'gzip':
+                # Decompressed as a real server would
+                gzip.decompress(body)
+            self._count(requests=1, writes=1, bytes=len(body))
+            self._reply(handler, 204)
+        elif method == 'POST' and path == '/api/v2/query':
+            self._count(requests=1)
+            self._reply(handler, 200, self._query_response(), 'text/csv; charset=utf-8')
+        else:
+            self._count(requests=1, errors=1)
+            self._reply(handler, 404, b'{"code":"not found"}', 'application/json')
+
+    def _count(self, **counts):
+        with self.__lock:
+            for (key, value) in counts.items():
+                self.stats[key] += value
+
+    def _reply(self, handler, status, body=b'', content_type=None):
+        handler.send_response(status)
+        if content_type:
+            handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _query_response(self):
+        """ Returns an annotated Flux CSV table of query_rows event records. """
+        lines = ['#datatype,string,long,dateTime:RFC3339,string,string,string,string',
+                 '#group,false,false,false,true,true,false,false',
+                 '#default,_result,,,,,,',
+                 ',result,table,_time,test_id,machine,event_name,event_value']
+        for i in range(self.query_rows):
+            lines.append(f',,0,2024-01-01T00:00:00Z,{i}.benchmark,benchmark,check_end,0')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+def percentile(sorted_values, p):
+    """ Returns the p-th percentile of sorted values, by the nearest-rank method. """
+    if len(sorted_values) == 0:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100.0 * len(sorted_values)) - 1)]
+
+def run_calls(name, calls, threads, db_logger, mock):
+    """
+    Makes the calls, timing each, then flushes the databases. Returns the results of the
+    benchmark: one for the calls and one, named {name}_flush, for the flush that follows.
+    """
+    mock.reset_stats()
+
+    def timed(call):
+        start = time.perf_counter()
+        ok = call()
+        return (time.perf_counter() - start, ok)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(timed, calls))
+    else:
+        results = [timed(call) for call in calls]
+    elapsed = time.perf_counter() - start
+    calls_stats = mock.reset_stats()
+
+    flush_result = timed(db_logger.flush)
+    flush_stats = mock.reset_stats()
+
+    return [make_result(name, results, elapsed, calls_stats),
+            make_result(f'{name}_flush', [flush_result], flush_result[0], flush_stats)]
+
+def make_result(name, results, elapsed, stats):
+    """ Returns the result of a benchmark from the (latency, ok) of each call and the server statistics. """
+    latencies = sorted([latency for (latency, ok) in results])
+    failures = len([ok for (latency, ok) in results if not ok])
+    return {'benchmark': name,
+            'calls': len(results),
+            'failures': failures,
+            'seconds': elapsed,
+            'calls_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'server': stats}
+
+def test_info(instance, run_archive):
+    return {'test_id': f'{instance}.benchmark',
+            'app': 'benchmark_app',
+            'test': f'benchmark_test_{instance % 10}',
+            'runtag': 'benchmark',
+            'machine': 'benchmark',
+            'event_time': (datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=instance)).isoformat(),
+            'run_archive': run_archive}
+
+def event_calls(args, logger, run_archive):
+    """ Returns the calls that log args.events events, making a database logger per test instance as StatusFile does. """
+    calls = []
+    instance_logger = {}
+    for i in range(args.events):
+        instance = i // len(EVENT_NAMES)
+        event = dict(test_info(instance, run_archive),
+                     event_name=EVENT_NAMES[i % len(EVENT_NAMES)],
+                     event_type=EVENT_NAMES[i % len(EVENT_NAMES)].rsplit('_', 1)[0],
+                     event_subtype=EVENT_NAMES[i % len(EVENT_NAMES)].rsplit('_', 1)[-1],
+                     event_value='0',
+                     event_filename=f'Event_{i % len(EVENT_NAMES)}.txt',
+                     build_directory=run_archive,
+                     job_id='1234',
+                     hostname='benchmark',
+                     user='benchmark')
+        event['event_time'] = (datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=i)).isoformat()
+
+        def call(event=event, instance=instance):
+            if not instance in instance_logger:
+                instance_logger[instance] = create_rgt_db_logger(logger=logger)
+            return instance_logger[instance].log_event(event)
+        calls.append(call)
+    return calls
+
+def metrics_calls(args, db_logger, run_archive):
+    calls = []
+    for instance in range(args.metrics_calls):
+        metrics = {f'benchmark_metric_{m}': str(random.random()) for m in range(args.metrics)}
+        calls.append(lambda info=test_info(instance, run_archive), metrics=metrics: db_logger.log_metrics(info, metrics))
+    return calls
+
+def node_health_calls(args, db_logger, run_archive):
+    node_health = {f'node{n:05d}': {'status': 'SUCCESS' if n % 100 else 'FAILED', 'message': '' if n % 100 else 'benchmark failure'}
+                   for n in range(args.nodes)}
+    return [lambda info=test_info(instance, run_archive): db_logger.log_node_health(info, node_health)
+            for instance in range(args.node_health_calls)]
+
+def query_calls(args, db_logger):
+    backend = db_logger.enabled_backends[0]
+    query = 'from(bucket: "benchmark") |> range(start: -1d)'
+    return [lambda: sum(1 for record in backend.iter_query(query)) == args.query_rows
+            for i in range(args.queries)]
+
+# Initialize argparse ##########################################################
+parser = argparse.ArgumentParser(description="Benchmark the database logging path of the harness against a local mock InfluxDB server")
+parser.add_argument('--benchmarks', default='events,metrics,node_health,query', type=str, action='store', help="Comma-separated benchmarks to run, of: events, metrics, node_health, query.")
+parser.add_argument('--events', default=2000, type=int, action='store', help="The number of events logged.")
+parser.add_argument('--metrics-calls', default=500, type=int, action='store', help="The number of times metrics are logged.")
+parser.add_argument('--metrics', default=20, type=int, action='store', help="The number of metrics logged each time.")
+parser.add_argument('--node-health-calls', default=5, type=int, action='store', help="The number of times node health results are logged.")
+parser.add_argument('--nodes', default=10000, type=int, action='store', help="The number of nodes in each node health result.")
+parser.add_argument('--queries', default=20, type=int, action='store', help="The number of queries made.")
+parser.add_argument('--query-rows', default=10000, type=int, action='store', help="The number of records in each query response.")
+parser.add_argument('--output-kb', default=256, type=int, action='store', help="The size of the output files read for output_txt, in kB.")
+parser.add_argument('--threads', default=1, type=int, action='store', help="The number of threads making the calls.")
+parser.add_argument('--latency', default=0.0, type=float, action='store', help="Seconds the mock server waits before each response.")
+parser.add_argument('--error-rate', default=0.0, type=float, action='store', help="The fraction of writes the mock server fails.")
+parser.add_argument('--error-status', default=503, type=int, action='store', help="The HTTP status of the failed writes.")
+parser.add_argument('--seed', default=0, type=int, action='store', help="The seed of the random metric values and errors.")
+parser.add_argument('--json', default=None, type=str, action='store', help="Also write the results as JSON to this file.")
+parser.add_argument('--loglevel', default='CRITICAL', choices=["NOTSET","DEBUG","INFO","WARNING", "ERROR", "CRITICAL"], type=str, action='store', help="Specify verbosity")
+
+# Parse command-line arguments #################################################
+args = parser.parse_args()
+random.seed(args.seed)
+
+benchmarks = args.benchmarks.split(',')
+for benchmark in benchmarks:
+    if not benchmark in ['events', 'metrics', 'node_health', 'query']:
+        parser.error(f"Unknown benchmark: {benchmark}")
+
+logger = rgt_logger_factory.create_rgt_logger(logger_name='benchmark_database_logging',
+                fh_filepath='/dev/null', logger_threshold_log_level=args.loglevel,
+                fh_threshold_log_level=args.loglevel, ch_threshold_log_level=args.loglevel)
+
+# Set up the mock server and the test files ####################################
+mock = MockInfluxDB(latency=args.latency, error_rate=args.error_rate,
+                    error_status=args.error_status, query_rows=args.query_rows)
+
+for envvar in ISOLATED_ENVVARS:
+    os.environ.pop(envvar, None)
+os.environ['RGT_INFLUXDB_URI'] = mock.uri
+os.environ['RGT_INFLUXDB_TOKEN'] = 'benchmark'
+
+work_dir = tempfile.mkdtemp(prefix='benchmark_database_logging.')
+run_archive = os.path.join(work_dir, 'Run_Archive')
+os.makedirs(run_archive)
+output_line = 'benchmark output line\n'
+output = output_line * (args.output_kb * 1024 // len(output_line))
+for file_name in ['output_build.txt', 'submit.err', 'benchmark.o1234', 'output_check.txt']:
+    with open(os.path.join(run_archive, file_name), 'w') as file_obj:
+        file_obj.write(output)
+
+node_location_file = os.path.join(work_dir, 'node_locations.json')
+with open(node_location_file, 'w') as file_obj:
+    json.dump({f'node{n:05d}': {'cabinet': f'c{n // 128}', 'slot': f's{n % 128}'} for n in range(args.nodes)}, file_obj)
+os.environ['RGT_NODE_LOCATION_FILE'] = node_location_file
+
+# Run the benchmarks ###########################################################
+results = []
+try:
+    db_logger = create_rgt_db_logger(logger=logger)
+    if len(db_logger.enabled_backends) == 0:
+        print("Failed to enable the InfluxDB backend for the mock server.", file=sys.stderr)
+        sys.exit(1)
+
+    for benchmark in benchmarks:
+        if benchmark == 'events':
+            calls = event_calls(args, logger, run_archive)
+        elif benchmark == 'metrics':
+            calls = metrics_calls(args, db_logger, run_archive)
+        elif benchmark == 'node_health':
+            calls = node_health_calls(args, db_logger, run_archive)
+        else:
+            calls = query_calls(args, db_logger)
+        results.extend(run_calls(benchmark, calls, args.threads, db_logger, mock))
+finally:
+    mock.stop()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+# Report #######################################################################
+settings = {envvar: os.environ[envvar] for envvar in sorted(os.environ)
+            if (envvar.startswith('RGT_DATABASE_') or envvar.startswith('RGT_INFLUXDB_')) and not envvar in ISOLATED_ENVVARS}
+print(f"Settings: {settings if settings else 'defaults'}, latency={args.latency}s, error rate={args.error_rate}, threads={args.threads}")
+print(f"{'benchmark':<18} {'calls':>7} {'failed':>7} {'seconds':>9} {'calls/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'requests':>9} {'writes':>9} {'errors':>7} {'MB sent':>8}")
+for result in results:
+    print(f"{result['benchmark']:<18} {result['calls']:>7} {result['failures']:>7} {result['seconds']:>9.3f} {result['calls_per_second']:>10.1f} "
+          f"{result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['max_ms']:>9.3f} {result['server']['requests']:>9} "
+          f"{result['server']['writes']:>9} {result['server']['errors']:>7} {result['server']['bytes'] / 1048576:>8.2f}")
+
+if args.json:
+    with open(args.json, 'w') as file_obj:
+        json.dump({'settings': settings, 'arguments': vars(args), 'results': results}, file_obj, indent=2)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Purpose:
+#   Deliver the database writes that were spooled to RGT_DATABASE_SPOOL_DIR
+#   because the databases could not be reached when they were logged.
+#   Safe to run repeatedly, e.g. from cron, and concurrently.
+################################################################################
+
+import argparse
+import glob
+import os
+import sys
+
+from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
+from libraries.rgt_database_loggers import write_spool
+from libraries.rgt_loggers import rgt_logger_factory
+
+# Initialize argparse ##########################################################
+parser = argparse.ArgumentParser(description="Deliver the database writes spooled to RGT_DATABASE_SPOOL_DIR")
+parser.add_argument('--max-workers', default=write_spool.DEFAULT_REPLAY_WORKERS, type=int, action='store', help="The number of spooled writes delivered at a time.")
+parser.add_argument('--loglevel', default='INFO', choices=["NOTSET","DEBUG","INFO","WARNING", "ERROR", "CRITICAL"], type=str, action='store', help="Specify verbosity")
+parser.add_argument('--dry-run', action='store_true', help="When set, list the spool files, but do not deliver them.")
+
+# Parse command-line arguments #################################################
+args = parser.parse_args()
+
+logger = rgt_logger_factory.create_rgt_logger(logger_name='replay_database_spool',
+                fh_filepath='/dev/null', logger_threshold_log_level=args.loglevel,
+                fh_threshold_log_level=args.loglevel, ch_threshold_log_level=args.loglevel)
+
+spool_dir = write_spool.get_spool_dir()
+if spool_dir == None:
+    logger.doCriticalLogging("RGT_DATABASE_SPOOL_DIR must be set to an existing directory.")
+    sys.exit(1)
+
+if args.dry_run:
+    for path in sorted(glob.glob(os.path.join(spool_dir, 'spool.*'))):
+        with open(path, 'r') as file_obj:
+            logger.doInfoLogging(f"{path}: {sum(1 for line in file_obj)} spooled writes")
+    sys.exit(0)
+
+db_logger = create_rgt_db_logger(logger=logger)
+
+logger.doInfoLogging(f"Enabled {len(db_logger.enabled_backends)} database backends")
+
+(delivered, remaining, rejected) = db_logger.replay_spool(max_workers=args.max_workers)
+
+logger.doInfoLogging(f"Delivered {delivered} spooled writes, {remaining} remain spooled, {rejected} were rejected.")
+if rejected > 0:
+    logger.doErrorLogging(f"The rejected writes were moved to the rejected.* files of {spool_dir}. They are not replayed.")
+sys.exit(0 if remaining == 0 and rejected == 0 else 1)
@@ -16,6 +16,7 @@ import re
 
 from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
 from libraries.rgt_database_loggers.db_backends.rgt_influxdb import InfluxDBLogger
+from libraries.rgt_database_loggers.db_backends import line_protocol
 from libraries.subtest_factory import SubtestFactory
 from libraries.status_file import StatusFile, get_status_info_from_file
 from libraries.config_file import rgt_config_file
@@ -106,13 +107,11 @@ for val in args.values.split(','):
     # We know it's properly formatted already
     val_splt = val.split('=')
     # We know quotes are balanced - if the starting quote is there, so is end
-    if not val_splt[1].startswith('"'):
-        if not number_regex.match(val_splt[1]):
-            val_splt[1] = '"' + val_splt[1] + '"'
-        # else, it's a valid decimal number
-    elif val_splt[1].startswith('"') and number_regex.match(val_splt[1][1:-1]):
-        # If it's a number, un-quote it (otherwise InfluxDB thinks it's a str)
+    if val_splt[1].startswith('"'):
         val_splt[1] = val_splt[1][1:-1]
+    # Numbers are not quoted (otherwise InfluxDB thinks it's a str)
+    if not number_regex.match(val_splt[1]):
+        val_splt[1] = line_protocol.string_field(val_splt[1])
     # Save as a string
     values_formatted[val_splt[0]] = f'{val_splt[1]}'
 
@@ -11,20 +11,24 @@
 #   events, then attempts to re-send each event not found, using the event files.
 #   If event files aren't found, queries SLURM to find out if the job crashed.
 #   POSTs the update back to each backend under 'check_end' status.
+#   The runs are processed concurrently, and the updates are written to the
+#   databases in batches unless RGT_DATABASE_BATCH is set to 0.
 ################################################################################
 
 from datetime import datetime
+import concurrent.futures
+import functools
 import os
-import glob
+import pwd
 import subprocess
 import argparse
-import csv
 import socket
 
 from libraries.rgt_database_loggers.rgt_database_logger_factory import create_rgt_db_logger
 from libraries.rgt_database_loggers.db_backends.rgt_influxdb import InfluxDBLogger
 from libraries.subtest_factory import SubtestFactory
-from libraries.status_file import StatusFile, get_status_info_from_file
+from libraries.status_file import StatusFile
+from libraries.event_journal import read_events
 from libraries.config_file import rgt_config_file
 from libraries.rgt_loggers import rgt_logger_factory
 
@@ -41,6 +45,7 @@ parser.add_argument('--runtag', type=str, action='store', help="Specifies the ru
 parser.add_argument('--loglevel', default='INFO', choices=["NOTSET","DEBUG","INFO","WARNING", "ERROR", "CRITICAL"], type=str, action='store', help="Specify verbosity")
 parser.add_argument('--dry-run', action='store_true', help="When set, prints messages to send to databases, but does not send them.")
 parser.add_argument('--build-timeout', type=float, default=6.0, action='store', help="Number of hours after a build_start event before logging a failed build_end event.")
+parser.add_argument('--max-workers', type=int, default=8, action='store', help="The number of runs processed, and of sacct queries made, at a time.")
 
 # Parse command-line arguments #################################################
 args = parser.parse_args()
@@ -52,6 +57,13 @@ logger = rgt_logger_factory.create_rgt_logger(logger_name='update_db',
                 fh_filepath='/dev/null', logger_threshold_log_level=args.loglevel,
                 fh_threshold_log_level=args.loglevel, ch_threshold_log_level=args.loglevel)
 
+if args.max_workers < 1:
+    logger.doErrorLogging(f"--max-workers must be at least 1.")
+    exit(1)
+
+# The updates are written in batches, flushed after each database is processed
+os.environ.setdefault('RGT_DATABASE_BATCH', '1')
+
 db_logger = create_rgt_db_logger(logger=logger)
 
 # db_logger is ready
@@ -60,8 +72,7 @@ logger.doInfoLogging(f"Enabled {len(db_logger.enabled_backends)} database backen
 
 for db in db_logger.enabled_backends:
     if not db.name == "influxdb":
-        self.doErrorLogging(f"Unsupported db backend: {db.name}")
-        exit(1)
+        logger.doWarningLogging(f"Unsupported db backend: {db.name}. Its runs will not be updated.")
 
 # Dictionaries with key-value pairs for global use #############################
 state_to_value = {
@@ -146,9 +157,9 @@ def influxdb_get_results(db):
 
         return running_query
 
-    results = db.query(build_query())
+    results = db.iter_query(build_query())
     ret = []
-    # filter out unwanted/incomplete/irrelevant results
+    # filter out unwanted/incomplete/irrelevant results as they are received
     for r in results:
         missing_entries = []
         for e in InfluxDBLogger.INFLUX_TAGS:
@@ -164,67 +175,74 @@ def influxdb_get_results(db):
 
 def check_job_status(slurm_jobid_lst):
     """
-        Checks if a Slurm job is running by querying sacct
-        Returns [False] (list length=1) or
-            [JobID, Elapsed, Start, End, State, ExitCode, Reason, Comment]
+        Queries sacct for the state of Slurm jobs, in batches of 100 jobs made concurrently
+        Returns a dictionary of the sacct fields of each job ID found:
+            {JobID: {jobid, elapsed, start, end, state, exitcode, reason, comment}}
+        A job that survived a node failure (RESIZING) has a field named `node-failed` = True
     """
-    result = {}  # a dictionary of dictionaries
-    low_limit = 0
-    high_limit = 0
     batch_size = 100
-    node_failed_jobids = []
-    # Batched into batches of 100
-    while low_limit < len(slurm_jobid_lst):
-        high_limit = min(low_limit + batch_size, len(slurm_jobid_lst))
-        sacct_format = 'JobID,Elapsed,Start,End,State%40,ExitCode,Reason%100,Comment%100'
-        cmd=f"sacct -j {','.join(slurm_jobid_lst[low_limit:high_limit])} --format {sacct_format} -X"
-        os.system(f'{cmd} 2>&1 > slurm.jobs.tmp.txt')
-        with open(f'slurm.jobs.tmp.txt', 'r') as f:
-            line = f.readline()
-            labels = line.split()
-            comment_line = f.readline()   # line of dashes
-            # use the spaces in the comment line to split the next line properly
-            for line in f:
-                fields = {}
-                search_pos = -1
-                for i in range(0, len(labels)):
-                    next_space = comment_line.find(' ', search_pos + 1)
-                    # No more spaces found, and it's the last label
-                    if next_space < 0 and i == len(labels) - 1:
-                        next_space = len(line)
-                    elif next_space < 0:
-                        logger.doErrorLogging(f"Sacct parse error: Couldn't find enough spaces to correctly parse the columns to fit the labels {','.join(labels)}")
-                    cur_field = line[search_pos+1:next_space].strip()
-                    search_pos = next_space
-                    fields[labels[i].lower()] = cur_field
-                if not 'jobid' in fields:
-                    logger.doErrorLogging(f"Couldn't find JobID in sacct record. Skipping")
-                    continue
-                elif fields['state'] == 'RESIZING':
-                    logger.doInfoLogging(f"Detected RESIZING for job {fields['jobid']}. RESIZING is from node failure + SLURM '--no-kill'. There should be another record in sacct for this job. Skipping")
-                    # Add a field to this job that shows it had/survived a node failure
-                    node_failed_jobids.append(fields['jobid'])
-                    continue
-                elif fields['jobid'] in node_failed_jobids:
-                    # Check if a previous step had come in with RESIZING
-                    logger.doDebugLogging(f"Found jobid in node failure list: {fields['jobid']}")
-                    fields['node-failed'] = True
-                result[fields['jobid']] = fields
-        os.remove(f"slurm.jobs.tmp.txt")
-        low_limit = high_limit  # prepare for next iteration
+    batches = [slurm_jobid_lst[i:i + batch_size] for i in range(0, len(slurm_jobid_lst), batch_size)]
+    result = {}  # a dictionary of dictionaries
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        # Each job ID is in one batch, so the batches are independent
+        for batch_result in executor.map(sacct_job_status, batches):
+            result.update(batch_result)
+    return result
+
+def sacct_job_status(slurm_jobids):
+    """
+        Runs sacct for a batch of Slurm job IDs
+        Returns a dictionary of the sacct fields of each job ID found
+    """
+    sacct_format = 'JobID,Elapsed,Start,End,State,ExitCode,Reason,Comment'
+    cmd = ['sacct', '-j', ','.join(slurm_jobids), '--format', sacct_format, '-X', '--parsable2']
+    result = {}
+    node_failed_jobids = set()
+    # Both outputs are read together, so that sacct cannot block on a full stderr pipe
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError as e:
+        logger.doErrorLogging(f"Failed to run sacct: {e}")
+        return result
+    if proc.returncode != 0:
+        logger.doErrorLogging(f"sacct exited with code {proc.returncode}: {proc.stderr.strip()}")
+    lines = proc.stdout.splitlines()
+    if len(lines) == 0:
+        return result
+    # --parsable2 separates the fields with '|', starting with a header line of labels
+    labels = [label.lower() for label in lines[0].split('|')]
+    for line in lines[1:]:
+        if len(line) == 0:
+            continue
+        # The Comment is last, so that a '|' in a comment stays in the comment
+        values = line.split('|', len(labels) - 1)
+        if len(values) < len(labels):
+            logger.doErrorLogging(f"Sacct parse error: Couldn't find enough fields to fit the labels {','.join(labels)} in: {line}")
+            continue
+        fields = dict(zip(labels, values))
+        if not 'jobid' in fields:
+            logger.doErrorLogging(f"Couldn't find JobID in sacct record. Skipping")
+            continue
+        elif fields['state'] == 'RESIZING':
+            logger.doInfoLogging(f"Detected RESIZING for job {fields['jobid']}. RESIZING is from node failure + SLURM '--no-kill'. There should be another record in sacct for this job. Skipping")
+            # Add a field to this job that shows it had/survived a node failure
+            node_failed_jobids.add(fields['jobid'])
+            continue
+        elif fields['jobid'] in node_failed_jobids:
+            # Check if a previous step had come in with RESIZING
+            logger.doDebugLogging(f"Found jobid in node failure list: {fields['jobid']}")
+            fields['node-failed'] = True
+        result[fields['jobid']] = fields
     return result
 
+@functools.lru_cache(maxsize=None)
 def get_user_from_id(user_id):
     """ Given a user ID, return the username """
-    # replace parenthesis with commas to make splitting easier
-    os.system(f"id {user_id} 2>&1 | tr '()' '??' | cut -d'?' -f2 > tmp.user.txt")
-    with open(f'tmp.user.txt', 'r') as f:
-        user_name = f.readline().strip()
-    if len(user_name) == 0:
+    try:
+        return pwd.getpwuid(int(user_id)).pw_name
+    except (KeyError, ValueError):
         logger.doErrorLogging(f"Couldn't find user name for {user_id}. Returning 'unknown'")
-        user_name = 'unknown'
-    os.remove(f"tmp.user.txt")
-    return user_name
+        return 'unknown'
 
 def slurm_time_to_harness_time(timecode):
     """
@@ -233,6 +251,154 @@ def slurm_time_to_harness_time(timecode):
     return f'{timecode}.000000'
 
 
+def set_check_end(entry, job, event_value, output_txt, event_filename=StatusFile.NO_VALUE):
+    """ Updates the fields of entry to those of a check_end event at the end time of the Slurm job """
+    entry['event_time'] = slurm_time_to_harness_time(job['end'])
+    entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][1]
+    entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][2]
+    entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
+    entry['event_filename'] = event_filename
+    entry['event_value'] = event_value
+    entry['hostname'] = socket.gethostname()
+    entry['user'] = os.environ['USER']
+    entry['output_txt'] = output_txt
+
+def log_event(event, single_db_logger):
+    """ Logs an event to the database of single_db_logger, or prints it if --dry-run is set """
+    if args.dry_run:
+        logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in event.items()])}")
+    else:
+        single_db_logger.log_event(event)
+
+def process_entry(entry, slurm_data, single_db_logger):
+    """
+    Sends the updates of one run that is missing events
+    Returns 'sent' or 'skipped', or None if the run could not be processed
+    """
+    # check to see if this entry should be parsed
+    logger.doDebugLogging(f"Processing {entry['test_id']}, SLURM id {entry['job_id']} ========================")
+
+    if entry['job_id'] == '[NO_VALUE]':
+        # Then this test never made it to the scheduler. Ignore it
+        logger.doDebugLogging(f"Test {entry['test_id']} has not made it to a scheduler.")
+        # if it's a build_start status that is older than args.build_timeout, then log a build_end status
+        if not entry['event_name'] == f"{StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_START][1]}_{StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_START][2]}":
+            return 'skipped'
+        timediff_dt = datetime.now() - datetime.strptime(entry['event_time'], "%Y-%m-%dT%H:%M:%S.%f")
+        timediff_hours = timediff_dt.total_seconds() / (60.0 * 60.0)
+        if timediff_hours < args.build_timeout:
+            return 'skipped'
+        # Update fields in entry
+        entry['event_time'] = datetime.now().isoformat()
+        entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][1]
+        entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][2]
+        entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
+        entry['event_filename'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][0]
+        entry['event_value'] = state_to_value['timeout']
+        entry['hostname'] = socket.gethostname()
+        entry['user'] = os.environ['USER']
+        entry['output_txt'] = f"Build timed out after {timediff_hours:.1f} hours."
+        log_event(entry, single_db_logger)
+        return 'sent'
+
+    if not entry['job_id'] in slurm_data:
+        logger.doWarningLogging(f"Job {entry['job_id']} of test {entry['test_id']} was not found by sacct. Skipping.")
+        return 'skipped'
+    job = slurm_data[entry['job_id']]
+    node_failed = 'node-failed' in job and job['node-failed']
+
+    if job['state'] in slurm_job_state_codes['pending']:
+        # Then this job is still running/waiting in queue, we can skip
+        logger.doDebugLogging(f"Job {entry['job_id']} is in state {job['state']}. Skipping.")
+        return 'skipped'
+    elif job['state'].startswith('CANCELLED'):
+        logger.doDebugLogging(f"Found cancelled job {entry['job_id']}. Sending status updates.")
+        if node_failed:
+            # Then we possibly had a user-cancelled job following a node failure
+            output_txt = 'NODE_FAIL detected. Job canceled'
+            event_value = state_to_value['node_fail']
+        else:
+            output_txt = 'Job canceled'
+            event_value = state_to_value['fail']
+        # Check if CANCELLED BY ...
+        job_status_long = job['state'].split(' ')
+        if len(job_status_long) > 2:
+            output_txt += f" at {job['end']} by {get_user_from_id(job_status_long[2])}"
+        else:
+            output_txt += f" at {job['end']}"
+        output_txt += f", after running for {job['elapsed']}."
+        output_txt += f" Exit code: {job['exitcode']}, reason: {job['reason']}."
+        set_check_end(entry, job, event_value, output_txt,
+                      event_filename=StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][0])
+        log_event(entry, single_db_logger)
+        return 'sent'
+    elif job['state'] in slurm_job_state_codes['node_fail']:
+        logger.doDebugLogging(f"Found node failure from: {entry['job_id']}")
+        set_check_end(entry, job, state_to_value['node_fail'],
+                      f"Node failure detected. Job exited in state {job['state']} at {job['end']}, after running for {job['elapsed']}.")
+        log_event(entry, single_db_logger)
+        return 'sent'
+    elif job['state'] in slurm_job_state_codes['timeout']:
+        if node_failed:
+            logger.doDebugLogging(f"Found node_fail + timed out job: {entry['job_id']}")
+            set_check_end(entry, job, state_to_value['node_fail'],
+                          f"NODE_FAIL followed by TIMEOUT detected. Job exited in state {job['state']} at {job['end']}, after running for {job['elapsed']}.")
+        else:
+            logger.doDebugLogging(f"Found timed out job: {entry['job_id']}")
+            set_check_end(entry, job, state_to_value['timeout'],
+                          f"TIMEOUT detected. Job exited in state {job['state']} at {job['end']}, after running for {job['elapsed']}.")
+        log_event(entry, single_db_logger)
+        return 'sent'
+    elif job['state'] in slurm_job_state_codes['success'] or \
+         job['state'] in slurm_job_state_codes['fail']:
+        # Then the job completed, but did not successfully log results (perhaps the compute node can't reach the db?)
+        # So we search for status files of events more recent than the one we have
+        logger.doDebugLogging(f"Found job {entry['job_id']} in state {job['state']}. Newest event state was {entry['event_name']}.")
+        # Annoyingly, status_dir is not stored in the status file, so we have to use Run_Archive
+        status_file_path = os.path.join(entry['run_archive'], '..', '..', 'Status', entry['test_id'])
+        current_event_num = int(entry['event_filename'].split('_')[1])
+        if not (os.path.exists(status_file_path) and os.path.exists(entry['run_archive'])):
+            logger.doDebugLogging(f"Status file and Run_Archive paths for test {entry['test_id']} do not exist ({entry['run_archive']}). Skipping.")
+            return None
+        found_checkend = False
+        # Reads the event journal and Event_*.txt files of the test instance
+        for event_info in read_events(status_file_path):
+            status_file_name = event_info.get('event_filename', '')
+            event_number = int(status_file_name.split('_')[1]) # used to sort if this is a newer event than current
+            if event_number > current_event_num:
+                # Then log the info of the event to the database, without the Splunk-only fields
+                for field in StatusFile.FIELDS_SPLUNK_SPECIAL:
+                    event_info.pop(event_info.get('event_name', '') + '_' + field, None)
+                # Re-posting an event to InfluxDB doesn't hurt
+                logger.doInfoLogging(f"Logging event {status_file_name} for test {entry['test_id']}")
+                log_event(event_info, single_db_logger)
+            if status_file_name == StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][0]:
+                found_checkend = True
+                # Then we initialize a subtest object to go look for metrics & node health results
+                subtest = SubtestFactory.make_subtest(name_of_application=entry['app'],
+                                                      name_of_subtest=entry['test'],
+                                                      local_path_to_tests=os.path.join(entry['run_archive'], '../../../..'),
+                                                      logger=logger,
+                                                      tag=entry['test_id'],
+                                                      db_logger=single_db_logger)
+                logger.doInfoLogging(f"Attempting to log metric and node health information {status_file_name} for test {entry['test_id']}")
+                if args.dry_run:
+                    logger.doCriticalLogging(f"DRY-RUN: would be calling subtest.run_db_extensions() for test_id {entry['test_id']}")
+                else:
+                    if not subtest.run_db_extensions():
+                        logger.doWarningLogging(f"Logging metric & node health data to databases failed for test_id {entry['test_id']} (job {entry['job_id']})")
+        if not found_checkend:
+            # If the test didn't log a check_end event, we simulate one here
+            logger.doInfoLogging(f"Job {entry['job_id']} in state {job['state']} did not complete a check_end event. Logging check_end with fail check code.")
+            set_check_end(entry, job, state_to_value['fail'],
+                          f"Job exited in state {job['state']} at {job['end']}, after running for {job['elapsed']}.")
+            log_event(entry, single_db_logger)
+        return 'sent'
+    else:
+        logger.doWarningLogging(f"Unrecognized job state: {job['state']}. No action is being taken for job {entry['job_id']}.")
+        return 'skipped'
+
+
 skipped = 0
 sent = 0
 
@@ -240,187 +406,39 @@ if args.dry_run:
     for db in db_logger.enabled_backends:
         os.environ[db.disable_envvar_name] = "1"
 
-# The calls to db_logger.log_event are for ALL enabled backends, so
-# the subsequent iterations in this loop will have fewer un-logged
-# results
+# Each database is reconciled against its own query results, so a run
+# missing from several databases is updated in each of them
 for db in db_logger.enabled_backends:
+    if not db.name == "influxdb":
+        continue
     # Create a local db_logger with ONLY the current database
     single_db_logger = create_rgt_db_logger(logger=logger, only=db.url)
-    results = []
-    if db.name == "influxdb":
-        results.extend(influxdb_get_results(db))
-    # now process results
+    results = influxdb_get_results(db)
     # Get all Slurm job IDs
-    slurm_job_ids = [ e['job_id'] for e in results if not e['job_id'] == '[NO_VALUE]' ]
+    slurm_job_ids = sorted(set(e['job_id'] for e in results if not e['job_id'] == '[NO_VALUE]'))
     # A job ID will have a field named `node-failed` = True if it survived a node failure via --no-kill
     slurm_data = check_job_status(slurm_job_ids)
 
-
-    for entry in results:
-        # check to see if this entry should be parsed
-        logger.doDebugLogging(f"Processing {entry['test_id']}, SLURM id {entry['job_id']} ========================")
-
-        if entry['job_id'] == '[NO_VALUE]':
-            # Then this test never made it to the scheduler. Ignore it
-            logger.doDebugLogging(f"Test {entry['test_id']} has not made it to a scheduler.")
-            # if it's a build_start status that is older than args.build_timeout, then log a build_end status
-            if not entry['event_name'] == f"{StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_START][1]}_{StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_START][2]}":
-                skipped += 1
+    # The runs are independent, and their updates are buffered for the database.
+    # process_entry may run in several threads at once: the subtests made by
+    # SubtestFactory.make_subtest() read their Run_Archive and Status files by
+    # path, without changing the working directory, and run_db_extensions()
+    # writes only through single_db_logger, whose write batcher holds a lock
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        futures = [executor.submit(process_entry, entry, slurm_data, single_db_logger) for entry in results]
+        for (entry, future) in zip(results, futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logger.doErrorLogging(f"Failed to process test {entry['test_id']} (job {entry['job_id']}): {e}")
                 continue
-            timediff_dt = datetime.now() - datetime.strptime(entry['event_time'], "%Y-%m-%dT%H:%M:%S.%f")
-            timediff_hours = timediff_dt.total_seconds() / (60.0 * 60.0)
-            if timediff_hours < args.build_timeout:
+            if outcome == 'sent':
+                sent += 1
+            elif outcome == 'skipped':
                 skipped += 1
-                continue
-            # Update fields in entry
-            entry['event_time'] = datetime.now().isoformat()
-            entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][1]
-            entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][2]
-            entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
-            entry['event_filename'] = StatusFile.EVENT_DICT[StatusFile.EVENT_BUILD_END][0]
-            entry['event_value'] = state_to_value['timeout']
-            entry['hostname'] = socket.gethostname()
-            entry['user'] = os.environ['USER']
-            sent += 1
-            entry['output_txt'] = f"Build timed out after {timediff_hours:.1f} hours."
-            if args.dry_run:
-                logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-            else:
-                single_db_logger.log_event(entry)
-        elif slurm_data[entry['job_id']]['state'] in slurm_job_state_codes['pending']:
-            # Then this job is still running/waiting in queue, we can skip
-            logger.doDebugLogging(f"Job {entry['job_id']} is in state {slurm_data[entry['job_id']]['state']}. Skipping.")
-            skipped += 1
-            continue
-        elif slurm_data[entry['job_id']]['state'].startswith('CANCELLED'):
-            logger.doDebugLogging(f"Found cancelled job {entry['job_id']}. Sending status updates.")
-            sent += 1
-            if 'node-failed' in slurm_data[entry['job_id']] and slurm_data[entry['job_id']]['node-failed']:
-                # Then we possibly had a user-cancelled job following a node failure
-                entry['output_txt'] = 'NODE_FAIL detected. Job canceled'
-                entry['event_value'] = state_to_value['node_fail']
-            else:
-                entry['output_txt'] = 'Job canceled'
-                entry['event_value'] = state_to_value['fail']
-            # Update fields in entry
-            entry['event_time'] = slurm_time_to_harness_time(slurm_data[entry['job_id']]['end'])
-            entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][1]
-            entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][2]
-            entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
-            entry['event_filename'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][0]
-            entry['hostname'] = socket.gethostname()
-            entry['user'] = os.environ['USER']
-            # Check if CANCELLED BY ...
-            job_status_long = slurm_data[entry['job_id']]['state'].split(' ')
-            if len(job_status_long) > 1:
-                cancel_user = get_user_from_id(job_status_long[2])
-                entry['output_txt'] += f" at {slurm_data[entry['job_id']]['end']} by {cancel_user}"
-            else:
-                entry['output_txt'] += f" at {slurm_data[entry['job_id']]['end']}"
-            entry['output_txt'] += f", after running for {slurm_data[entry['job_id']]['elapsed']}."
-            entry['output_txt'] += f" Exit code: {slurm_data[entry['job_id']]['exitcode']}, reason: {slurm_data[entry['job_id']]['reason']}."
-            if args.dry_run:
-                logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-            else:
-                single_db_logger.log_event(entry)
-        elif slurm_data[entry['job_id']]['state'] in slurm_job_state_codes['node_fail']:
-            logger.doDebugLogging(f"Found node failure from: {entry['job_id']}")
-            sent += 1
-            entry['event_time'] = slurm_time_to_harness_time(slurm_data[entry['job_id']]['end'])
-            entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][1]
-            entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][2]
-            entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
-            entry['event_filename'] = StatusFile.NO_VALUE
-            entry['event_value'] = state_to_value['node_fail']
-            entry['hostname'] = socket.gethostname()
-            entry['user'] = os.environ['USER']
-            entry['output_txt'] = f"Node failure detected. Job exited in state {slurm_data[entry['job_id']]['state']} at {slurm_data[entry['job_id']]['end']}, after running for {slurm_data[entry['job_id']]['elapsed']}."
-            if args.dry_run:
-                logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-            else:
-                single_db_logger.log_event(entry)
-        elif slurm_data[entry['job_id']]['state'] in slurm_job_state_codes['timeout']:
-            sent += 1
-            if 'node-failed' in slurm_data[entry['job_id']] and slurm_data[entry['job_id']]['node-failed']:
-                logger.doDebugLogging(f"Found node_fail + timed out job: {entry['job_id']}")
-                entry['output_txt'] = f"NODE_FAIL followed by TIMEOUT detected. Job exited in state {slurm_data[entry['job_id']]['state']} at {slurm_data[entry['job_id']]['end']}, after running for {slurm_data[entry['job_id']]['elapsed']}."
-                entry['event_value'] = state_to_value['node_fail']
-            else:
-                logger.doDebugLogging(f"Found timed out job: {entry['job_id']}")
-                entry['output_txt'] = f"TIMEOUT detected. Job exited in state {slurm_data[entry['job_id']]['state']} at {slurm_data[entry['job_id']]['end']}, after running for {slurm_data[entry['job_id']]['elapsed']}."
-                entry['event_value'] = state_to_value['timeout']
-            entry['event_time'] = slurm_time_to_harness_time(slurm_data[entry['job_id']]['end'])
-            entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][1]
-            entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][2]
-            entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
-            entry['event_filename'] = StatusFile.NO_VALUE
-            entry['hostname'] = socket.gethostname()
-            entry['user'] = os.environ['USER']
-            if args.dry_run:
-                logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-            else:
-                single_db_logger.log_event(entry)
-        elif slurm_data[entry['job_id']]['state'] in slurm_job_state_codes['success'] or \
-             slurm_data[entry['job_id']]['state'] in slurm_job_state_codes['fail']:
-            # Then the job completed, but did not successfully log results (perhaps the compute node can't reach the db?)
-            # So we search for status files of events more recent than the one we have
-            logger.doDebugLogging(f"Found job {entry['job_id']} in state {slurm_data[entry['job_id']]['state']}. Newest event state was {entry['event_name']}.")
-            # Annoyingly, status_dir is not stored in the status file, so we have to use Run_Archive
-            status_file_path = os.path.join(entry['run_archive'], '..', '..', 'Status', entry['test_id'])
-            current_event_num = int(entry['event_filename'].split('_')[1])
-            cur_dir = os.getcwd()
-            if not (os.path.exists(status_file_path) and os.path.exists(entry['run_archive'])):
-                logger.doDebugLogging(f"Status file and Run_Archive paths for test {entry['test_id']} do not exist ({entry['run_archive']}). Skipping.")
-                continue
-            sent += 1
-            os.chdir(status_file_path)
-            found_checkend = False
-            for status_file_name in glob.glob("Event_*.txt"):
-                event_number = int(status_file_name.split('_')[1]) # used to sort if this is a newer event than current
-                if event_number > current_event_num:
-                    # Then get the info from the status file & log it to the database
-                    event_info = get_status_info_from_file(status_file_name)
-                    # This is a global call for all enabled databases -- re-posting an event to InfluxDB doesn't hurt
-                    logger.doInfoLogging(f"Logging event {status_file_name} for test {entry['test_id']}")
-                    if args.dry_run:
-                        logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-                    else:
-                        single_db_logger.log_event(event_info)
-                if status_file_name == StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][0]:
-                    found_checkend = True
-                    # Then we initialize a subtest object to go look for metrics & node health results
-                    subtest = SubtestFactory.make_subtest(name_of_application=entry['app'],
-                                                          name_of_subtest=entry['test'],
-                                                          local_path_to_tests=os.path.join(entry['run_archive'], '../../../..'),
-                                                          logger=logger,
-                                                          tag=entry['test_id'],
-                                                          db_logger=single_db_logger)
-                    logger.doInfoLogging(f"Attempting to log metric and node health information {status_file_name} for test {entry['test_id']}")
-                    # This is also effectively a global call for all enabled databases
-                    if args.dry_run:
-                        logger.doCriticalLogging(f"DRY-RUN: would be calling subtest.run_db_extensions() for test_id {entry['test_id']}")
-                    else:
-                        if not subtest.run_db_extensions():
-                            logger.doWarningLogging(f"Logging metric & node health data to databases failed for test_id {entry['test_id']} (job {entry['job_id']})")
-            if not found_checkend:
-                # If the test didn't log a check_end event, we simulate one here
-                logger.doInfoLogging(f"Job {entry['job_id']} in state {slurm_data[entry['job_id']]['state']} did not complete a check_end event. Logging check_end with fail check code.")
-                entry['output_txt'] = f"Job exited in state {slurm_data[entry['job_id']]['state']} at {slurm_data[entry['job_id']]['end']}, after running for {slurm_data[entry['job_id']]['elapsed']}."
-                entry['event_time'] = slurm_time_to_harness_time(slurm_data[entry['job_id']]['end'])
-                entry['event_type'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][1]
-                entry['event_subtype'] = StatusFile.EVENT_DICT[StatusFile.EVENT_CHECK_END][2]
-                entry['event_name'] = entry['event_type'] + '_' + entry['event_subtype']
-                entry['event_filename'] = StatusFile.NO_VALUE
-                entry['event_value'] = state_to_value['fail']
-                entry['hostname'] = socket.gethostname()
-                entry['user'] = os.environ['USER']
-                if args.dry_run:
-                    logger.doCriticalLogging(f"DRY-RUN: {','.join([ f'{key}={value}' for key, value in entry.items()])}")
-                else:
-                    single_db_logger.log_event(entry)
-            os.chdir(cur_dir)
-        else:
-            logger.doWarningLogging(f"Unrecognized job state: {slurm_data[entry['job_id']]['state']}. No action is being taken for job {entry['job_id']}.")
-            skipped += 1
+
+    # Write anything still batched for this database
+    if not single_db_logger.flush():
+        logger.doErrorLogging(f"Some batched writes to {db.url} failed. Please see log files for more details.")
 
 logger.doCriticalLogging(f"Attempted to log {sent} jobs to databases. Skipped {skipped}.")